@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the ArduPilot bin to CSV converter on synthetic logs.
+
+Synthetic logs are generated with src.synthetic, then each case (parsing,
+single-file, separate-by-type and batch conversion) is run for each engine in
+a fresh process, measuring messages per second, MB per second of input and
+peak resident memory. The results are saved as JSON and can be compared with
+the results of another version.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import click
+
+# Add the parent directory to the path so we can import the src module
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.converter import BinToCsvConverter
+from src.parser import ENGINES
+from src.synthetic import generate_log, DEFAULT_RATES
+from src.stats import peak_rss
+
+
+CASES = ('parse', 'single', 'separate', 'batch')
+
+RESULTS_VERSION = 1
+
+
+def parse_rates(ctx, param, values: tuple) -> Optional[Dict[str, float]]:
+    """Parse --rate TYPE=HZ values into a dictionary of rates."""
+    rates = {}
+    for value in values:
+        msg_type, _, rate = value.partition('=')
+        try:
+            rates[msg_type.strip()] = float(rate)
+        except ValueError:
+            raise click.BadParameter(f"'{value}' is not TYPE=HZ (e.g. IMU=400)")
+    return rates or None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process and its finished children, in MB."""
+    peak = peak_rss()
+    return round(peak / (1024 * 1024), 1) if peak is not None else None
+
+
+def run_case(case: str, engine: str, log_files: List[str], work_dir: str, jobs: int) -> Dict[str, Any]:
+    """
+    Run one benchmark case in this process.
+
+    Args:
+        case: One of CASES
+        engine: Decode engine
+        log_files: Synthetic logs; cases other than batch use the first one
+        work_dir: Directory receiving the outputs
+        jobs: Worker processes of the batch case
+
+    Returns:
+        Dictionary with the elapsed seconds, messages processed, input bytes
+        and the resident memory before and after the run
+    """
+    baseline = peak_rss_mb()
+    converter = BinToCsvConverter(logging.WARNING, engine)
+    input_file = log_files[0]
+    output_dir = os.path.join(work_dir, f'{case}-{engine}')
+    os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    if case == 'parse':
+        messages = sum(1 for _ in converter.parser.parse_messages(input_file))
+        success = messages > 0
+    elif case == 'single':
+        success = converter.convert(input_file, os.path.join(output_dir, 'output.csv'))
+        messages = sum(converter.last_summary.message_counts.values()) if success else 0
+    elif case == 'separate':
+        success = converter.convert(input_file, output_dir, separate_by_type=True)
+        messages = sum(converter.last_summary.message_counts.values()) if success else 0
+    elif case == 'batch':
+        results = converter.batch_convert(log_files, output_dir, jobs=jobs)
+        success = all(results.values())
+        messages = None
+    else:
+        raise ValueError(f"Unknown benchmark case '{case}', expected one of: {', '.join(CASES)}")
+    seconds = time.perf_counter() - start
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    files = log_files if case == 'batch' else [input_file]
+    return {
+        'success': success,
+        'seconds': seconds,
+        'messages': messages,
+        'bytes': sum(os.path.getsize(path) for path in files),
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(case: str, engine: str, log_files: List[str], work_dir: str, jobs: int) -> Dict[str, Any]:
+    """Run one benchmark case in a fresh process, so its peak memory is its own."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, case, engine, log_files, work_dir, jobs).result()
+
+
+def git_commit() -> Optional[str]:
+    """Commit of the benchmarked tree, if it is a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str):
+    """Print the change of each result against a results file of another version."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(result['case'], result['engine']): result for result in baseline['results']}
+    click.echo(f"\nCompared with {baseline_path} ({baseline.get('commit') or 'unknown commit'}):")
+    for result in results:
+        old = previous.get((result['case'], result['engine']))
+        if old is None or not old['mb_per_sec']:
+            continue
+        speed = result['mb_per_sec'] / old['mb_per_sec']
+        line = f"  {result['case']:<9} {result['engine']:<10} {speed:6.2f}x MB/s"
+        if result['peak_rss_mb'] and old.get('peak_rss_mb'):
+            line += f"  {result['peak_rss_mb'] / old['peak_rss_mb']:6.2f}x peak memory"
+        click.echo(line)
+
+
+@click.command()
+@click.option('--size', type=click.FloatRange(min=0, min_open=True), default=50, show_default=True,
+              help='Size of each synthetic log in MB')
+@click.option('--files', type=click.IntRange(min=1), default=4, show_default=True,
+              help='Number of logs converted by the batch case')
+@click.option('--rate', 'rates', multiple=True, callback=parse_rates,
+              help='Messages per second of a generated type, e.g. IMU=400; the types given '
+                   'choose the mix (default: ' + ', '.join(f'{name}={rate:g}' for name, rate in DEFAULT_RATES.items()) + ')')
+@click.option('--case', 'cases', multiple=True, type=click.Choice(CASES),
+              help='Case to run (can be specified multiple times; default: all)')
+@click.option('--engine', 'engines', multiple=True, type=click.Choice(ENGINES),
+              help='Engine to benchmark (can be specified multiple times; default: all)')
+@click.option('--repeat', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Runs of each case; the fastest is kept')
+@click.option('--jobs', '-j', type=click.IntRange(min=0), default=1, show_default=True,
+              help='Worker processes of the batch case (0 = one per CPU)')
+@click.option('--seed', type=int, default=0, show_default=True,
+              help='Seed of the synthetic values')
+@click.option('--log-dir', type=click.Path(file_okay=False),
+              help='Keep the synthetic logs in this directory (reused if already there)')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default='benchmark_results.json',
+              show_default=True,
+              help='JSON file receiving the results')
+@click.option('--compare', 'compare_path', type=click.Path(exists=True, dir_okay=False),
+              help='Results file of another version to compare with')
+def main(size: float, files: int, rates: Optional[Dict[str, float]], cases: tuple, engines: tuple,
+         repeat: int, jobs: int, seed: int, log_dir: Optional[str], output: str,
+         compare_path: Optional[str]):
+    """
+    Benchmark parsing and conversion on synthetic DataFlash logs.
+
+    Examples:
+    \\b
+        # All cases and engines on 50 MB logs
+        python benchmarks/run_benchmarks.py
+
+        # Quick numpy-only run, compared with the results of the last release
+        python benchmarks/run_benchmarks.py --size 10 --engine numpy -o new.json --compare old.json
+    """
+    cases = cases or CASES
+    engines = engines or ENGINES
+    work_dir = tempfile.mkdtemp(prefix='bin2csv-benchmark-')
+    try:
+        log_dir = log_dir or work_dir
+        os.makedirs(log_dir, exist_ok=True)
+        log_files = []
+        log_info = None
+        for k in range(files if 'batch' in cases else 1):
+            path = os.path.join(log_dir, f'synthetic-{size:g}mb-{k}.bin')
+            info_path = path + '.json'
+            if os.path.exists(path) and os.path.exists(info_path):
+                with open(info_path) as f:
+                    info = json.load(f)
+            else:
+                click.echo(f"Generating {path}...")
+                info = generate_log(path, int(size * 1024 * 1024), rates, seed=seed + k)
+                with open(info_path, 'w') as f:
+                    json.dump(info, f, indent=2)
+            log_files.append(path)
+            log_info = log_info or info
+
+        results = []
+        for case in cases:
+            for engine in engines:
+                runs = [run_isolated(case, engine, log_files, work_dir, jobs) for _ in range(repeat)]
+                best = min(runs, key=lambda run: run['seconds'])
+                messages = best['messages']
+                if messages is None:
+                    messages = sum(log_info['message_counts'].values()) * len(log_files)
+                result = {
+                    'case': case,
+                    'engine': engine,
+                    'success': best['success'],
+                    'seconds': round(best['seconds'], 3),
+                    'messages': messages,
+                    'bytes': best['bytes'],
+                    'msgs_per_sec': round(messages / best['seconds'], 1),
+                    'mb_per_sec': round(best['bytes'] / (1024 * 1024) / best['seconds'], 3),
+                    'baseline_rss_mb': best['baseline_rss_mb'],
+                    'peak_rss_mb': max((run['peak_rss_mb'] or 0) for run in runs) or None,
+                }
+                results.append(result)
+                click.echo(f"{case:<9} {engine:<10} {result['seconds']:9.2f} s "
+                           f"{result['msgs_per_sec']:12,.0f} msgs/s {result['mb_per_sec']:8.2f} MB/s "
+                           f"{result['peak_rss_mb'] or 0:8.1f} MB peak"
+                           + ('' if result['success'] else '  FAILED'))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'log': dict(log_info, files=len(log_files), rates=rates or DEFAULT_RATES),
+        'jobs': jobs,
+        'repeat': repeat,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    click.echo(f"Saved results to {output}")
+
+    if compare_path:
+        compare(results, compare_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,38 +8,237 @@ log files (.bin) to CSV format.
 
 import os
 import sys
+import asyncio
 import glob
 import logging
 import click
-from typing import List, Optional
-from src.converter import BinToCsvConverter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from src.converter import BinToCsvConverter, DEFAULT_CHUNK_SIZE
+from src.writers import (DEFAULT_TYPE_BUFFER_SIZE, DEFAULT_MAX_OPEN_FILES,
+                         OUTPUT_FORMATS, output_extension)
+from src.compression import COMPRESSIONS, DEFAULT_COMPRESS_LEVELS, log_patterns, log_stem
+from src.csvformat import ALL_FLOAT_FIELDS
+from src.parser import ENGINES
+from src.decimate import AGGREGATES
+from src.align import ALIGN_DIRECTIONS
+from src.cache import CACHE_DIR_NAME
+from src.follow import DEFAULT_FOLLOW_INTERVAL
+from src.stats import profile_to
+from src.progress import Progress
+from src.watch import (FolderWatcher, DEFAULT_POLL_INTERVAL, DEFAULT_SETTLE_TIME,
+                       DEFAULT_QUEUE_SIZE, DEFAULT_STATS_INTERVAL)
+
+# Help of --compress-level listing the default level of each compression
+COMPRESS_LEVELS_HELP = 'Compression level (default: {})'.format(
+    ', '.join(f'{name} {level}' for name, level in DEFAULT_COMPRESS_LEVELS.items()))
+
+
+def parse_time(ctx, param, value: Optional[str]) -> Optional[float]:
+    """Parse a --start/--end value: seconds since boot, or TimeUS with a 'us' suffix."""
+    if value is None:
+        return None
+    text = value.strip().lower()
+    try:
+        if text.endswith('us'):
+            return int(text[:-2]) / 1000000
+        return float(text[:-1] if text.endswith('s') else text)
+    except ValueError:
+        raise click.BadParameter(f"'{value}' is not seconds (e.g. 120.5) or TimeUS (e.g. 120500000us)")
+
+
+def parse_rates(ctx, param, values: tuple) -> Optional[Dict[str, float]]:
+    """Parse --rate TYPE=HZ values into a dictionary of rates."""
+    rates = {}
+    for value in values:
+        msg_type, _, rate = value.partition('=')
+        try:
+            rates[msg_type.strip()] = float(rate)
+        except ValueError:
+            raise click.BadParameter(f"'{value}' is not TYPE=HZ (e.g. IMU=10)")
+        if not msg_type.strip() or rates[msg_type.strip()] <= 0:
+            raise click.BadParameter(f"'{value}' is not TYPE=HZ with a positive rate")
+    return rates or None
+
+
+def parse_float_precision(ctx, param, values: tuple) -> Optional[Dict[str, int]]:
+    """Parse --float-precision DIGITS and FIELD=DIGITS values into a dictionary of precisions."""
+    precision = {}
+    for value in values:
+        field, _, digits = value.rpartition('=')
+        field = field.strip() or ALL_FLOAT_FIELDS
+        try:
+            precision[field] = int(digits)
+        except ValueError:
+            raise click.BadParameter(f"'{value}' is not DIGITS or FIELD=DIGITS (e.g. 3 or GPS.Lat=7)")
+        if precision[field] < 0:
+            raise click.BadParameter(f"'{value}' needs a number of decimals >= 0")
+    return precision or None
+
+
+def describe_progress(progress: Optional[Progress]) -> Optional[str]:
+    """Text shown after the progress bar."""
+    if progress is None:
+        return None
+    parts = []
+    if progress.messages:
+        # Files converted in worker processes only report when they are done
+        parts.append(f"{progress.messages:,} messages")
+    if progress.files_total > 1:
+        parts.append(f"{progress.files_done}/{progress.files_total} files")
+    return ', '.join(parts) or None
+
+
+@contextmanager
+def progress_bar(enabled: bool, input_files: List[str], label: str):
+    """
+    Show a progress bar on stderr while converting.
+    
+    Args:
+        enabled: If False, show nothing
+        input_files: Files converted, whose sizes make up the length of the bar
+        label: Text shown before the bar
+        
+    Yields:
+        Progress callback for convert() or batch_convert(), or None if disabled
+    """
+    if not enabled:
+        yield None
+        return
+    total = sum(os.path.getsize(path) for path in input_files if os.path.isfile(path))
+    # Reports are already throttled; render each one, even if only the file count changed
+    with click.progressbar(length=max(total, 1), label=label, file=sys.stderr,
+                           item_show_func=describe_progress, update_min_steps=0) as bar:
+        def update(progress: Progress):
+            bar.update(progress.bytes_done - bar.pos, progress)
+        yield update
+
+
+def report_stats(converter: BinToCsvConverter, stats_json: Optional[str]):
+    """Print the statistics of the last conversion, and save them if stats_json is given."""
+    stats = converter.last_stats
+    if stats is None:
+        return
+    click.echo(stats.format())
+    if stats_json:
+        try:
+            stats.save(stats_json)
+        except OSError as e:
+            click.echo(f"Warning: Could not write statistics to {stats_json}: {e}", err=True)
 
 
 @click.command()
-@click.argument('input_files', nargs=-1, required=True, type=click.Path(exists=True))
+@click.argument('input_files', nargs=-1, required=True, type=click.Path())
 @click.option('--output', '-o', 
               help='Output CSV file path (for single input) or directory (for multiple inputs)')
 @click.option('--output-dir', '-d', 
               help='Output directory for CSV files (alternative to --output)')
 @click.option('--message-types', '-m', multiple=True,
-              help='Message types to include (can be specified multiple times)')
+              help='Message types to include, or TYPE.Field to include single fields '
+                   '(can be specified multiple times)')
+@click.option('--columns', '-c', multiple=True,
+              help='Comma-separated TYPE.Field columns to include, e.g. GPS.Lat,GPS.Lng,ATT.Roll')
 @click.option('--separate-by-type', '-s', is_flag=True,
               help='Create separate CSV files for each message type')
+@click.option('--format', 'output_format', type=click.Choice(OUTPUT_FORMATS), default='csv',
+              show_default=True,
+              help='Output file format (columnar formats are always written in chunks)')
+@click.option('--compress', 'compression', type=click.Choice(COMPRESSIONS),
+              help='Compress CSV output as it is written, on background threads (adds .gz, .zst or .xz '
+                   'to derived file names; zstd needs the zstandard package)')
+@click.option('--compress-level', type=click.IntRange(min=0, max=22),
+              help=COMPRESS_LEVELS_HELP)
+@click.option('--float-precision', multiple=True, callback=parse_float_precision,
+              help='Round CSV float columns to DIGITS decimals: DIGITS for all of them, or Field=DIGITS / '
+                   'TYPE.Field=DIGITS (can be specified multiple times; default: no rounding)')
+@click.option('--manifest', is_flag=True,
+              help='Write a JSON manifest with message counts, time range and sizes next to each output')
+@click.option('--start', callback=parse_time,
+              help='Start of the time window: seconds since boot, or TimeUS with a "us" suffix')
+@click.option('--end', callback=parse_time,
+              help='End of the time window: seconds since boot, or TimeUS with a "us" suffix')
+@click.option('--rate', 'rates', multiple=True, callback=parse_rates,
+              help='Keep each instance of TYPE (e.g. IMU I=0 and I=1) at most at HZ messages per second, '
+                   'e.g. IMU=10 (can be specified multiple times)')
+@click.option('--aggregate', type=click.Choice(AGGREGATES),
+              help='With --rate, write the mean, min or max of each 1/HZ interval instead of its first message')
+@click.option('--aligned', is_flag=True,
+              help='Write one dense table of the selected types resampled onto a common time base')
+@click.option('--align-rate', type=click.FloatRange(min=0, min_open=True),
+              help='Samples per second of the --aligned time base')
+@click.option('--align-to', metavar='TYPE',
+              help='Use the timestamps of this message type as the --aligned time base')
+@click.option('--align-direction', type=click.Choice(ALIGN_DIRECTIONS), default='nearest', show_default=True,
+              help='Which message of each type is matched to a sample of the --aligned time base')
+@click.option('--align-tolerance', type=click.FloatRange(min=0),
+              help='Largest distance in seconds of an --aligned match (further samples stay empty)')
+@click.option('--stream', is_flag=True,
+              help='Write messages in chunks as they are parsed (constant memory)')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Messages per chunk when streaming')
+@click.option('--type-buffer-size', type=click.IntRange(min=1), default=DEFAULT_TYPE_BUFFER_SIZE,
+              show_default=True,
+              help='Messages buffered per message type when streaming with --separate-by-type')
+@click.option('--max-open-files', type=click.IntRange(min=1), default=DEFAULT_MAX_OPEN_FILES,
+              show_default=True,
+              help='Maximum output files kept open when streaming with --separate-by-type')
+@click.option('--follow', '-f', is_flag=True,
+              help='Keep converting a log that is still being written, appending new messages to the CSV output')
+@click.option('--follow-interval', type=click.FloatRange(min=0, min_open=True), default=DEFAULT_FOLLOW_INTERVAL,
+              show_default=True,
+              help='Seconds between two checks of a followed log')
+@click.option('--follow-timeout', type=click.FloatRange(min=0),
+              help='Stop following once the log has not grown for this many seconds (0 = catch up and exit)')
+@click.option('--jobs', '-j', type=click.IntRange(min=0), default=1, show_default=True,
+              help='Files converted in parallel worker processes (0 = one per CPU)')
+@click.option('--decode-jobs', type=click.IntRange(min=0), default=1, show_default=True,
+              help='Worker processes decoding byte ranges of each file (0 = one per CPU)')
+@click.option('--cache/--no-cache', default=True, show_default=True,
+              help='Reuse the outputs of logs already converted with the same options (batch conversions)')
+@click.option('--cache-dir', type=click.Path(file_okay=False),
+              help=f'Conversion cache directory (default: {CACHE_DIR_NAME} in the output directory)')
+@click.option('--cache-verify', is_flag=True,
+              help='Hash every log again instead of trusting an unchanged size and modification time')
+@click.option('--cache-max-age', type=click.FloatRange(min=0), metavar='DAYS',
+              help='Evict cache entries not used for this many days')
+@click.option('--cache-max-size', type=click.FloatRange(min=0), metavar='MB',
+              help='Evict least recently used cache entries beyond this total size')
+@click.option('--progress/--no-progress', 'show_progress', default=True, show_default=True,
+              help='Show a progress bar on stderr while converting (hidden with --quiet)')
+@click.option('--stats', 'show_stats', is_flag=True,
+              help='Print the time spent in each conversion stage, throughput and peak memory')
+@click.option('--stats-json', type=click.Path(dir_okay=False),
+              help='Write the conversion statistics to this JSON file (implies --stats)')
+@click.option('--profile', type=click.Path(dir_okay=False),
+              help='Run the conversion of a single input file under cProfile and save the profile here')
 @click.option('--list-types', '-l', is_flag=True,
               help='List available message types and exit')
 @click.option('--info', '-i', is_flag=True,
               help='Show file information and exit')
+@click.option('--engine', type=click.Choice(ENGINES), default='pymavlink', show_default=True,
+              help='Decode engine (numpy decodes each message type in bulk)')
+@click.option('--index', 'use_index', is_flag=True,
+              help='Use a .binidx sidecar index next to each log, creating it on first scan')
 @click.option('--verbose', '-v', is_flag=True,
               help='Enable verbose logging')
 @click.option('--quiet', '-q', is_flag=True,
               help='Suppress all output except errors')
 def main(input_files: tuple, output: Optional[str], output_dir: Optional[str],
-         message_types: tuple, separate_by_type: bool, list_types: bool,
-         info: bool, verbose: bool, quiet: bool):
+         message_types: tuple, columns: tuple, separate_by_type: bool, output_format: str,
+         compression: Optional[str], compress_level: Optional[int], float_precision: Optional[Dict[str, int]],
+         manifest: bool, start: Optional[float], end: Optional[float],
+         rates: Optional[Dict[str, float]], aggregate: Optional[str],
+         aligned: bool, align_rate: Optional[float], align_to: Optional[str],
+         align_direction: str, align_tolerance: Optional[float], stream: bool, chunk_size: int,
+         type_buffer_size: int, max_open_files: int, follow: bool, follow_interval: float,
+         follow_timeout: Optional[float], jobs: int, decode_jobs: int, cache: bool, cache_dir: Optional[str], cache_verify: bool,
+         cache_max_age: Optional[float], cache_max_size: Optional[float], show_progress: bool, show_stats: bool,
+         stats_json: Optional[str], profile: Optional[str], list_types: bool, info: bool, engine: str, use_index: bool, verbose: bool, quiet: bool):
     """
     Convert ArduPilot binary log files (.bin) to CSV format.
     
-    INPUT_FILES: One or more .bin files to convert. Supports glob patterns.
+    INPUT_FILES: One or more .bin files to convert, plain or compressed
+    (.bin.gz, .bin.zst, .bin.xz). Supports glob patterns.
     
     Examples:
     \\b
@@ -52,11 +251,64 @@ def main(input_files: tuple, output: Optional[str], output_dir: Optional[str],
         # Convert with specific message types
         python bin2csv.py flight.bin -o flight.csv -m GPS -m IMU
         
+        # Convert only some fields
+        python bin2csv.py flight.bin -o track.csv --columns GPS.Lat,GPS.Lng,ATT.Roll
+        
         # Create separate files for each message type
         python bin2csv.py flight.bin -d ./output/ --separate-by-type
         
         # List available message types
         python bin2csv.py flight.bin --list-types
+        
+        # Convert a batch of files with 8 worker processes
+        python bin2csv.py *.bin -d ./csv_output/ --jobs 8
+        
+        # Reconvert every log, ignoring the conversion cache
+        python bin2csv.py *.bin -d ./csv_output/ --no-cache
+        
+        # Decode one large log in 8 parallel byte ranges
+        python bin2csv.py flight.bin -o flight.csv --decode-jobs 8
+        
+        # Stream a large log with constant memory
+        python bin2csv.py flight.bin -o flight.csv --stream
+        
+        # Convert compressed logs without decompressing them to disk (*.bin also matches *.bin.gz)
+        python bin2csv.py "archive/*.bin" -d ./csv_output/
+        
+        # Write gzip-compressed CSV files, one per message type (GPS.csv.gz, ...)
+        python bin2csv.py flight.bin -d ./output/ -s --compress gzip
+        
+        # Round floats to 3 decimals, timestamps to 6 and GPS positions to 7
+        python bin2csv.py flight.bin -o flight.csv --float-precision 3 \\
+            --float-precision timestamp=6 --float-precision GPS.Lat=7 --float-precision GPS.Lng=7
+        
+        # Write one Parquet file per message type
+        python bin2csv.py flight.bin -d ./output/ -s --format parquet
+        
+        # Convert and write flight.manifest.json with the file summary
+        python bin2csv.py flight.bin -o flight.csv --manifest
+        
+        # Convert only 30 seconds around an incident
+        python bin2csv.py flight.bin -o incident.csv --start 1200 --end 1230
+        
+        # Reduce IMU to 10 Hz averages
+        python bin2csv.py flight.bin -o flight.csv --rate IMU=10 --aggregate mean
+        
+        # One 50 Hz table of attitude, GPS position and IMU acceleration
+        python bin2csv.py flight.bin -o aligned.csv --aligned --align-rate 50 \\
+            -m ATT --columns GPS.Lat,GPS.Lng,IMU.AccX,IMU.AccY,IMU.AccZ
+        
+        # Decode with the NumPy engine
+        python bin2csv.py flight.bin -o flight.csv --engine numpy
+        
+        # Show where the conversion time goes, and save a cProfile profile
+        python bin2csv.py flight.bin -o flight.csv --stats --profile flight.prof
+        
+        # Append new messages of a log that is still being written
+        python bin2csv.py flight.bin -o flight.csv --follow
+        
+        # Convert logs as they are copied into a directory
+        python bin2csv.py watch ./incoming -d ./csv_output/ --workers 4
     """
     # Set up logging
     if quiet:
@@ -71,34 +323,39 @@ def main(input_files: tuple, output: Optional[str], output_dir: Optional[str],
         format='%(levelname)s: %(message)s'
     )
     
-    # Expand glob patterns in input files
+    # Expand glob patterns in input files; *.bin also matches *.bin.gz, *.bin.zst and *.bin.xz
     expanded_files = []
     for pattern in input_files:
         if '*' in pattern or '?' in pattern:
-            matches = glob.glob(pattern)
+            matches = list(dict.fromkeys(path for log_pattern in log_patterns(pattern)
+                                         for path in glob.glob(log_pattern)))
             if matches:
                 expanded_files.extend(matches)
             else:
                 click.echo(f"Warning: No files match pattern '{pattern}'", err=True)
-        else:
+        elif os.path.exists(pattern):
             expanded_files.append(pattern)
+        else:
+            click.echo(f"Error: Path '{pattern}' does not exist", err=True)
+            sys.exit(1)
     
     if not expanded_files:
         click.echo("Error: No input files found", err=True)
         sys.exit(1)
     
     # Initialize converter
-    converter = BinToCsvConverter(log_level)
+    show_stats = show_stats or stats_json is not None
+    converter = BinToCsvConverter(log_level, engine, use_index, collect_stats=show_stats)
     
     # Handle list-types option
     if list_types:
         for input_file in expanded_files:
             click.echo(f"\nMessage types in {input_file}:")
             try:
-                msg_types = converter.get_available_message_types(input_file)
-                if msg_types:
-                    for msg_type in msg_types:
-                        click.echo(f"  - {msg_type}")
+                msg_counts = converter.get_message_counts(input_file)
+                if msg_counts:
+                    for msg_type, count in msg_counts.items():
+                        click.echo(f"  - {msg_type} ({count})")
                 else:
                     click.echo("  No message types found")
             except Exception as e:
@@ -135,25 +392,91 @@ def main(input_files: tuple, output: Optional[str], output_dir: Optional[str],
                 click.echo(f"Error reading {input_file}: {e}", err=True)
         return
     
+    if aligned and align_rate is None and align_to is None:
+        click.echo("Error: --aligned needs --align-rate or --align-to", err=True)
+        sys.exit(1)
+    
+    if compression and output_format != 'csv':
+        click.echo("Error: --compress applies to CSV output", err=True)
+        sys.exit(1)
+    if compress_level is not None and not compression:
+        click.echo("Error: --compress-level needs --compress", err=True)
+        sys.exit(1)
+    if float_precision and output_format != 'csv':
+        click.echo("Error: --float-precision applies to CSV output", err=True)
+        sys.exit(1)
+    
+    if follow:
+        if len(expanded_files) != 1:
+            click.echo("Error: --follow takes a single input file", err=True)
+            sys.exit(1)
+        if output_format != 'csv' or aligned or rates or manifest or decode_jobs != 1 or compression or float_precision:
+            click.echo("Error: --follow writes CSV and cannot be combined with --aligned, "
+                       "--rate, --manifest, --decode-jobs, --compress or --float-precision", err=True)
+            sys.exit(1)
+        if show_stats or profile:
+            click.echo("Error: --stats and --profile do not apply to --follow", err=True)
+            sys.exit(1)
+    
+    if profile and len(expanded_files) != 1:
+        click.echo("Error: --profile takes a single input file", err=True)
+        sys.exit(1)
+    
     # Determine output configuration
     if not output and not output_dir:
         if len(expanded_files) == 1:
             # Single file: generate output filename
             input_file = expanded_files[0]
-            base_name = os.path.splitext(os.path.basename(input_file))[0]
-            output = f"{base_name}.csv"
+            base_name = log_stem(input_file)
+            output = f"{base_name}{output_extension(output_format, compression)}"
         else:
             # Multiple files: use current directory
             output_dir = "./csv_output"
     
-    # Convert message_types tuple to list
-    msg_types_list = list(message_types) if message_types else None
+    # Convert message_types tuple to list, adding the --columns fields
+    msg_types_list = list(message_types)
+    for column_list in columns:
+        msg_types_list.extend(column.strip() for column in column_list.split(',') if column.strip())
+    msg_types_list = msg_types_list or None
     
     try:
-        if len(expanded_files) == 1 and output and not output_dir:
+        if follow:
+            input_file = expanded_files[0]
+            if separate_by_type:
+                target = output_dir or output
+            else:
+                base_name = log_stem(input_file)
+                target = output or os.path.join(output_dir, f"{base_name}.csv")
+            success = converter.follow(input_file, target, msg_types_list, separate_by_type,
+                                       poll_interval=follow_interval, idle_timeout=follow_timeout,
+                                       chunk_size=chunk_size, type_buffer_size=type_buffer_size,
+                                       max_open_files=max_open_files, start=start, end=end)
+            if not success:
+                click.echo(f"Failed to follow {input_file}", err=True)
+                sys.exit(1)
+        
+        elif len(expanded_files) == 1 and output and not output_dir:
             # Single file conversion
             input_file = expanded_files[0]
-            success = converter.convert(input_file, output, msg_types_list, separate_by_type)
+            with profile_to(profile), progress_bar(show_progress and not quiet, expanded_files,
+                                                   os.path.basename(input_file)) as progress:
+                success = converter.convert(input_file, output, msg_types_list, separate_by_type,
+                                            stream=stream, chunk_size=chunk_size,
+                                            type_buffer_size=type_buffer_size,
+                                            max_open_files=max_open_files,
+                                            decode_jobs=decode_jobs,
+                                            output_format=output_format, manifest=manifest,
+                                            start=start, end=end, rates=rates,
+                                            aggregate=aggregate, aligned=aligned,
+                                            align_rate=align_rate, align_to=align_to,
+                                            align_direction=align_direction,
+                                            align_tolerance=align_tolerance,
+                                            compression=compression,
+                                            compress_level=compress_level,
+                                            float_precision=float_precision,
+                                            progress=progress)
+            if show_stats:
+                report_stats(converter, stats_json)
             
             if success:
                 if not quiet:
@@ -169,8 +492,37 @@ def main(input_files: tuple, output: Optional[str], output_dir: Optional[str],
             if not quiet:
                 click.echo(f"Converting {len(expanded_files)} files to {target_dir}...")
             
-            results = converter.batch_convert(expanded_files, target_dir, 
-                                            msg_types_list, separate_by_type)
+            if cache:
+                cache_dir = cache_dir or os.path.join(target_dir, CACHE_DIR_NAME)
+            else:
+                cache_dir = None
+            
+            with profile_to(profile), progress_bar(show_progress and not quiet, expanded_files,
+                                                   f"{len(expanded_files)} files") as progress:
+                results = converter.batch_convert(expanded_files, target_dir, 
+                                                msg_types_list, separate_by_type,
+                                                stream=stream, chunk_size=chunk_size,
+                                                type_buffer_size=type_buffer_size,
+                                                max_open_files=max_open_files,
+                                                jobs=jobs, decode_jobs=decode_jobs,
+                                                output_format=output_format, manifest=manifest,
+                                                start=start, end=end, rates=rates,
+                                                aggregate=aggregate, aligned=aligned,
+                                                align_rate=align_rate, align_to=align_to,
+                                                align_direction=align_direction,
+                                                align_tolerance=align_tolerance,
+                                                cache_dir=cache_dir, cache_verify=cache_verify,
+                                                cache_max_age=(cache_max_age * 86400
+                                                               if cache_max_age is not None else None),
+                                                cache_max_size=(int(cache_max_size * 1024 * 1024)
+                                                                if cache_max_size is not None else None),
+                                                compression=compression,
+                                                compress_level=compress_level,
+                                                float_precision=float_precision,
+                                                progress=progress)
+            
+            if show_stats:
+                report_stats(converter, stats_json)
             
             successful = sum(1 for success in results.values() if success)
             failed = len(results) - successful
@@ -194,5 +546,137 @@ def main(input_files: tuple, output: Optional[str], output_dir: Optional[str],
         sys.exit(1)
 
 
+@click.command()
+@click.argument('watch_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('--output-dir', '-d', default='./csv_output', show_default=True,
+              help='Output directory for converted files')
+@click.option('--message-types', '-m', multiple=True,
+              help='Message types to include, or TYPE.Field to include single fields '
+                   '(can be specified multiple times)')
+@click.option('--columns', '-c', multiple=True,
+              help='Comma-separated TYPE.Field columns to include, e.g. GPS.Lat,GPS.Lng,ATT.Roll')
+@click.option('--separate-by-type', '-s', is_flag=True,
+              help='Create separate CSV files for each message type')
+@click.option('--format', 'output_format', type=click.Choice(OUTPUT_FORMATS), default='csv',
+              show_default=True,
+              help='Output file format')
+@click.option('--float-precision', multiple=True, callback=parse_float_precision,
+              help='Round CSV float columns to DIGITS decimals: DIGITS for all of them, or Field=DIGITS / '
+                   'TYPE.Field=DIGITS (can be specified multiple times; default: no rounding)')
+@click.option('--manifest', is_flag=True,
+              help='Write a JSON manifest with message counts, time range and sizes next to each output')
+@click.option('--rate', 'rates', multiple=True, callback=parse_rates,
+              help='Keep each instance of TYPE (e.g. IMU I=0 and I=1) at most at HZ messages per second, '
+                   'e.g. IMU=10 (can be specified multiple times)')
+@click.option('--aggregate', type=click.Choice(AGGREGATES),
+              help='With --rate, write the mean, min or max of each 1/HZ interval instead of its first message')
+@click.option('--stream', is_flag=True,
+              help='Write messages in chunks as they are parsed (constant memory)')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Messages per chunk when streaming')
+@click.option('--workers', '-j', type=click.IntRange(min=0), default=1, show_default=True,
+              help='Files converted in parallel worker processes (0 = one per CPU)')
+@click.option('--poll-interval', type=click.FloatRange(min=0, min_open=True), default=DEFAULT_POLL_INTERVAL,
+              show_default=True,
+              help='Seconds between two scans of the directory')
+@click.option('--settle', 'settle_time', type=click.FloatRange(min=0), default=DEFAULT_SETTLE_TIME,
+              show_default=True,
+              help='Seconds a file\'s size must stay unchanged before it is converted')
+@click.option('--queue-size', type=click.IntRange(min=1), default=DEFAULT_QUEUE_SIZE, show_default=True,
+              help='Largest number of finished files waiting for a worker')
+@click.option('--recursive', '-r', is_flag=True,
+              help='Also watch subdirectories, mirroring them in the output directory')
+@click.option('--status-file', type=click.Path(dir_okay=False),
+              help='JSON file rewritten with the queue depth and throughput at every report')
+@click.option('--stats-interval', type=click.FloatRange(min=0, min_open=True), default=DEFAULT_STATS_INTERVAL,
+              show_default=True,
+              help='Seconds between two reports of the queue depth and throughput')
+@click.option('--once', is_flag=True,
+              help='Convert the files already in the directory, then exit')
+@click.option('--engine', type=click.Choice(ENGINES), default='pymavlink', show_default=True,
+              help='Decode engine (numpy decodes each message type in bulk)')
+@click.option('--index', 'use_index', is_flag=True,
+              help='Use a .binidx sidecar index next to each log, creating it on first scan')
+@click.option('--verbose', '-v', is_flag=True,
+              help='Enable verbose logging')
+@click.option('--quiet', '-q', is_flag=True,
+              help='Suppress all output except errors')
+def watch(watch_dir: str, output_dir: str, message_types: tuple, columns: tuple,
+          separate_by_type: bool, output_format: str, float_precision: Optional[Dict[str, int]],
+          manifest: bool, rates: Optional[Dict[str, float]], aggregate: Optional[str], stream: bool,
+          chunk_size: int, workers: int, poll_interval: float, settle_time: float,
+          queue_size: int, recursive: bool, status_file: Optional[str],
+          stats_interval: float, once: bool, engine: str, use_index: bool,
+          verbose: bool, quiet: bool):
+    """
+    Watch a directory and convert .bin files once they are completely written.
+    
+    A file is converted when its size and modification time have not changed
+    for --settle seconds. Finished files wait in a bounded queue for one of
+    the --workers processes; while the queue is full the directory is not
+    scanned. Stop with Ctrl+C: files already queued are still converted.
+    
+    Examples:
+    \\b
+        # Convert logs copied into ./incoming with 4 worker processes
+        python bin2csv.py watch ./incoming -d ./csv_output/ --workers 4
+        
+        # Convert what is there now and exit
+        python bin2csv.py watch ./incoming -d ./csv_output/ --once --settle 0
+    """
+    if quiet:
+        log_level = logging.ERROR
+    elif verbose:
+        log_level = logging.DEBUG
+    else:
+        log_level = logging.INFO
+    
+    logging.basicConfig(
+        level=log_level,
+        format='%(levelname)s: %(message)s'
+    )
+    
+    if float_precision and output_format != 'csv':
+        click.echo("Error: --float-precision applies to CSV output", err=True)
+        sys.exit(1)
+    
+    msg_types_list = list(message_types)
+    for column_list in columns:
+        msg_types_list.extend(column.strip() for column in column_list.split(',') if column.strip())
+    
+    converter = BinToCsvConverter(log_level, engine, use_index)
+    options = {
+        'message_types': msg_types_list or None,
+        'separate_by_type': separate_by_type,
+        'output_format': output_format,
+        'float_precision': float_precision,
+        'manifest': manifest,
+        'rates': rates,
+        'aggregate': aggregate,
+        'stream': stream,
+        'chunk_size': chunk_size,
+    }
+    watcher = FolderWatcher(converter, watch_dir, output_dir, options, workers=workers or os.cpu_count() or 1,
+                            poll_interval=poll_interval, settle_time=settle_time,
+                            queue_size=queue_size, recursive=recursive,
+                            status_file=status_file, stats_interval=stats_interval)
+    try:
+        asyncio.run(watcher.run(once=once))
+    except KeyboardInterrupt:
+        click.echo("\nWatch cancelled by user", err=True)
+        sys.exit(1)
+    
+    if once and watcher.failed:
+        sys.exit(1)
+
+
+def cli():
+    """Run the watch command if it is the first argument, else convert."""
+    if len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        watch(sys.argv[2:], prog_name=f"{os.path.basename(sys.argv[0])} watch")
+    else:
+        main()
+
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    cli()
\ No newline at end of file
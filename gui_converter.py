@@ -3,7 +3,9 @@
 GUI interface for ArduPilot bin to CSV converter using TKinter.
 
 This script provides a graphical user interface for converting ArduPilot binary 
-log files (.bin) to CSV format.
+log files (.bin) to CSV format. Conversions run on a worker thread; log records
+and progress reports reach the Tk main thread through queues polled with
+root.after, so the window stays responsive.
 """
 
 import tkinter as tk
@@ -12,25 +14,62 @@ from tkinter import scrolledtext
 import logging
 import os
 import sys
+import queue
+import threading
 from pathlib import Path
 from src.converter import BinToCsvConverter
+from src.progress import ConversionCancelled
+from src.compression import log_stem
+
+
+# Milliseconds between two polls of the log and task queues
+POLL_INTERVAL_MS = 100
+
+# Most log records inserted in the log window per poll
+MAX_RECORDS_PER_POLL = 500
+
+# Lines kept in the log window; older lines are dropped
+MAX_LOG_LINES = 5000
 
 
 class LogHandler(logging.Handler):
-    """Custom logging handler to redirect logs to TKinter text widget."""
+    """Logging handler queueing formatted records for the TKinter log window.
     
-    def __init__(self, text_widget):
+    emit may be called from any thread; the records are inserted in the text
+    widget by the main thread, in batches, with drain.
+    """
+    
+    def __init__(self, text_widget, max_lines=MAX_LOG_LINES):
         super().__init__()
         self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.records = queue.Queue()
     
     def emit(self, record):
-        """Emit a log record to the text widget."""
-        log_message = self.format(record)
+        """Queue a log record for the text widget."""
+        try:
+            self.records.put(self.format(record))
+        except Exception:
+            self.handleError(record)
+    
+    def drain(self, limit=MAX_RECORDS_PER_POLL):
+        """Insert up to limit queued records in the text widget, keeping max_lines lines."""
+        lines = []
+        while len(lines) < limit:
+            try:
+                lines.append(self.records.get_nowait())
+            except queue.Empty:
+                break
+        if not lines:
+            return
         self.text_widget.config(state='normal')
-        self.text_widget.insert('end', log_message + '\n')
+        self.text_widget.insert('end', '\n'.join(lines) + '\n')
+        # The text always ends with an empty line after the last newline
+        excess = int(self.text_widget.index('end-1c').split('.')[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.text_widget.delete('1.0', f'{excess + 1}.0')
         self.text_widget.see('end')
         self.text_widget.config(state='disabled')
-        self.text_widget.update()
 
 
 class BinToCsvGUI:
@@ -44,11 +83,21 @@ class BinToCsvGUI:
         # Initialize converter
         self.converter = BinToCsvConverter(logging.INFO)
         
+        # Background task state: the worker thread, the results it posts for
+        # the main thread, the cancel request and the latest progress report
+        self.worker = None
+        self.results = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.latest_progress = None
+        
         # Setup logging
         self.setup_logging()
         
         # Create GUI elements
         self.create_widgets()
+        
+        # Start polling the log and task queues
+        self.poll()
     
     def setup_logging(self):
         """Configure logging to display in the log window."""
@@ -150,6 +199,7 @@ class BinToCsvGUI:
         button_frame.columnconfigure(0, weight=1)
         button_frame.columnconfigure(1, weight=1)
         button_frame.columnconfigure(2, weight=1)
+        button_frame.columnconfigure(3, weight=1)
         
         # Convert button
         self.convert_btn = ttk.Button(button_frame, text='Convert', command=self.convert)
@@ -159,26 +209,37 @@ class BinToCsvGUI:
         self.info_btn = ttk.Button(button_frame, text='File Info', command=self.show_info)
         self.info_btn.grid(row=0, column=1, padx=5, sticky=(tk.W, tk.E))
         
+        # Cancel button, enabled while a conversion runs
+        self.cancel_btn = ttk.Button(button_frame, text='Cancel', command=self.cancel,
+                                     state='disabled')
+        self.cancel_btn.grid(row=0, column=2, padx=5, sticky=(tk.W, tk.E))
+        
         # Clear log button
         self.clear_btn = ttk.Button(button_frame, text='Clear Log', command=self.clear_log)
-        self.clear_btn.grid(row=0, column=2, padx=5, sticky=(tk.W, tk.E))
+        self.clear_btn.grid(row=0, column=3, padx=5, sticky=(tk.W, tk.E))
+        
+        # Progress bar, filled with the bytes of the input parsed
+        self.progress_var = tk.DoubleVar(value=0)
+        self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var,
+                                            maximum=100, mode='determinate')
+        self.progress_bar.grid(row=7, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
         
         # Status bar
         self.status_var = tk.StringVar(value='Ready')
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, 
                               relief='sunken', anchor=tk.W)
-        status_bar.grid(row=7, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        status_bar.grid(row=8, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
     
     def browse_input(self):
         """Browse for input .bin file."""
         file_path = filedialog.askopenfilename(
             title='Select input .bin file',
-            filetypes=[('Binary files', '*.bin'), ('All files', '*.*')]
+            filetypes=[('Binary files', '*.bin *.bin.gz *.bin.zst *.bin.xz'), ('All files', '*.*')]
         )
         if file_path:
             self.input_var.set(file_path)
             # Auto-generate output directory based on input file location
-            base_name = os.path.splitext(os.path.basename(file_path))[0]
+            base_name = log_stem(file_path)
             parent_dir = os.path.dirname(file_path)
             output_dir = os.path.join(parent_dir, f'{base_name}_csv_output')
             self.output_var.set(output_dir)
@@ -194,6 +255,83 @@ class BinToCsvGUI:
             self.output_var.set(dir_path)
             logging.info(f'Selected output directory: {dir_path}')
     
+    def poll(self):
+        """Drain the log and task queues on the main thread, then poll again later."""
+        self.log_handler.drain()
+        progress, self.latest_progress = self.latest_progress, None
+        if progress is not None:
+            self.show_progress(progress)
+        while True:
+            try:
+                done, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.worker = None
+            self.set_busy(False)
+            done(result, error)
+        self.root.after(POLL_INTERVAL_MS, self.poll)
+    
+    def run_in_background(self, task, done, cancellable=True):
+        """
+        Run task on a worker thread, then call done(result, error) on the main thread.
+        
+        Args:
+            task: Function run on the worker thread; it must not touch widgets
+            done: Function called with the result of task, or None and the
+                exception it raised
+            cancellable: True if task reports progress through report_progress,
+                so the Cancel button can stop it
+        """
+        self.cancel_event.clear()
+        self.latest_progress = None
+        self.set_busy(True, cancellable)
+        
+        def run():
+            try:
+                self.results.put((done, task(), None))
+            except BaseException as e:
+                self.results.put((done, None, e))
+        
+        self.worker = threading.Thread(target=run, name='bin2csv-worker', daemon=True)
+        self.worker.start()
+    
+    def set_busy(self, busy, cancellable=True):
+        """
+        Enable the buttons that apply while a task runs, and disable the others.
+        
+        Args:
+            busy: True while a task runs on the worker thread
+            cancellable: True if the running task can be cancelled
+        """
+        self.convert_btn.config(state='disabled' if busy else 'normal')
+        self.info_btn.config(state='disabled' if busy else 'normal')
+        self.cancel_btn.config(state='normal' if busy and cancellable else 'disabled')
+    
+    def cancel(self):
+        """Ask the running conversion to stop at its next progress report."""
+        if self.worker is not None:
+            self.cancel_event.set()
+            self.cancel_btn.config(state='disabled')
+            self.status_var.set('Cancelling...')
+            logging.info('Cancelling conversion...')
+    
+    def report_progress(self, progress):
+        """Progress callback of the converter, called on the worker thread."""
+        if self.cancel_event.is_set():
+            raise ConversionCancelled()
+        # Only the latest report is shown; poll picks it up on the main thread
+        self.latest_progress = progress
+    
+    def show_progress(self, progress):
+        """Show a progress report of the converter in the progress bar and status bar."""
+        if self.cancel_event.is_set():
+            return
+        self.progress_var.set(progress.fraction * 100)
+        status = f'Converting... {progress.fraction:.0%}, {progress.messages:,} messages'
+        if progress.eta is not None:
+            status += f', {progress.eta:.0f} s left'
+        self.status_var.set(status)
+    
     def convert(self):
         """Perform the conversion."""
         input_file = self.input_var.get()
@@ -214,25 +352,35 @@ class BinToCsvGUI:
         
         # Update status
         self.status_var.set('Converting...')
-        self.convert_btn.config(state='disabled')
+        self.progress_var.set(0)
         logging.info(f'Starting conversion...')
         logging.info(f'Input: {input_file}')
         logging.info(f'Output Directory: {output_dir}')
         
-        try:
+        # Options are read here: Tk variables belong to the main thread
+        message_types = None
+        separate_by_type = self.separate_var.get()
+        
+        def task():
             # Create output directory if needed
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            # Perform conversion
-            message_types = None
-            separate_by_type = self.separate_var.get()
-            
-            success = self.converter.convert(input_file, output_dir, 
-                                           message_types, separate_by_type)
-            
-            if success:
+            return self.converter.convert(input_file, output_dir, 
+                                          message_types, separate_by_type,
+                                          progress=self.report_progress)
+        
+        def done(success, error):
+            if isinstance(error, ConversionCancelled):
+                logging.warning(f'Conversion of {input_file} cancelled; output in {output_dir} is incomplete')
+                self.status_var.set('Conversion cancelled')
+            elif error is not None:
+                logging.error(f'Error during conversion: {error}')
+                self.status_var.set('Error occurred')
+                messagebox.showerror('Error', f'An error occurred:\n{str(error)}')
+            elif success:
                 logging.info(f'Successfully converted {input_file} to {output_dir}')
+                self.progress_var.set(100)
                 self.status_var.set('Conversion complete')
                 messagebox.showinfo('Success', f'File converted successfully!\nOutput files are in:\n{output_dir}')
             else:
@@ -240,13 +388,7 @@ class BinToCsvGUI:
                 self.status_var.set('Conversion failed')
                 messagebox.showerror('Error', 'Conversion failed. Check the log for details.')
         
-        except Exception as e:
-            logging.error(f'Error during conversion: {e}')
-            self.status_var.set('Error occurred')
-            messagebox.showerror('Error', f'An error occurred:\n{str(e)}')
-        
-        finally:
-            self.convert_btn.config(state='normal')
+        self.run_in_background(task, done)
     
     def show_info(self):
         """Show file information."""
@@ -261,13 +403,13 @@ class BinToCsvGUI:
             return
         
         self.status_var.set('Reading file information...')
-        self.info_btn.config(state='disabled')
+        logging.info(f'Reading information from {input_file}...')
         
-        try:
-            logging.info(f'Reading information from {input_file}...')
-            summary = self.converter.get_file_summary(input_file)
-            
-            if summary:
+        def done(summary, error):
+            if error is not None:
+                logging.error(f'Error reading file information: {error}')
+                self.status_var.set('Error occurred')
+            elif summary:
                 logging.info(f'File information:')
                 logging.info(f'  Size: {summary.get("file_size", 0)} bytes')
                 if 'file_size_mb' in summary:
@@ -292,12 +434,9 @@ class BinToCsvGUI:
                 logging.error('Unable to read file information')
                 self.status_var.set('Error reading file')
         
-        except Exception as e:
-            logging.error(f'Error reading file information: {e}')
-            self.status_var.set('Error occurred')
-        
-        finally:
-            self.info_btn.config(state='normal')
+        # get_file_summary reports no progress, so it cannot be cancelled
+        self.run_in_background(lambda: self.converter.get_file_summary(input_file), done,
+                               cancellable=False)
     
     def clear_log(self):
         """Clear the log window."""
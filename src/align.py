@@ -0,0 +1,139 @@
+"""
+Time-aligned output for ArduPilot bin to CSV conversion.
+
+The messages of several types are resampled onto one time base, either a
+fixed rate or the TimeUS of a reference type, with as-of joins on TimeUS.
+The result is a dense table with one column per field of each type, named
+TYPE.Field, instead of one sparse row per message.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Iterable
+
+
+# Directions of the as-of join, as in pandas.merge_asof
+ALIGN_DIRECTIONS = ('nearest', 'backward', 'forward')
+
+# Fields holding the instance number of multi-instance message types
+INSTANCE_FIELDS = ('I', 'Instance', 'Inst')
+
+
+def instance_field(fields: Iterable[str]) -> Optional[str]:
+    """
+    Get the field holding the instance number of a message type.
+
+    Args:
+        fields: Field names of the type
+
+    Returns:
+        One of INSTANCE_FIELDS, or None for a single-instance type
+    """
+    fields = set(fields)
+    return next((field for field in INSTANCE_FIELDS if field in fields), None)
+
+def time_base(frames: Dict[str, pd.DataFrame], rate: float) -> np.ndarray:
+    """
+    Build a fixed-rate time base covering all messages.
+
+    Args:
+        frames: Dictionary mapping message type to its messages
+        rate: Samples per second
+
+    Returns:
+        TimeUS of each sample, on multiples of the sample interval
+    """
+    step = max(int(round(1000000 / rate)), 1)
+    starts = [frame['TimeUS'].iloc[0] for frame in frames.values() if len(frame)]
+    ends = [frame['TimeUS'].iloc[-1] for frame in frames.values() if len(frame)]
+    if not starts:
+        return np.zeros(0, dtype=np.int64)
+    first = -(-int(min(starts)) // step) * step
+    return np.arange(first, int(max(ends)) + 1, step, dtype=np.int64)
+
+
+def instance_frames(msg_type: str, frame: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Split the messages of a type by instance, prefixing their columns.
+
+    Args:
+        msg_type: Message type
+        frame: Messages of the type with a TimeUS column
+
+    Returns:
+        Dictionary mapping 'TYPE' or 'TYPE[instance]' to a frame with TimeUS
+        and 'TYPE.Field' or 'TYPE[instance].Field' columns
+    """
+    fields = [column for column in frame.columns if column not in ('timestamp', 'message_type', 'TimeUS')]
+    instance = instance_field(fields)
+    if instance is None:
+        groups = [(msg_type, frame)]
+    else:
+        fields.remove(instance)
+        groups = [(f'{msg_type}[{value}]', group) for value, group in frame.groupby(instance, sort=True)]
+
+    result = {}
+    for prefix, group in groups:
+        group = group[['TimeUS'] + fields].rename(columns={field: f'{prefix}.{field}' for field in fields})
+        group = group.astype({'TimeUS': np.int64})
+        if not group['TimeUS'].is_monotonic_increasing:
+            group = group.sort_values('TimeUS', kind='stable')
+        result[prefix] = group.reset_index(drop=True)
+    return result
+
+
+def align_frames(frames: Dict[str, pd.DataFrame], rate: Optional[float] = None,
+                 reference: Optional[str] = None, direction: str = 'nearest',
+                 tolerance: Optional[int] = None, order: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Join the messages of several types into one table on a common time base.
+
+    Each type is matched to the time base with pandas.merge_asof on TimeUS,
+    so every row holds the values of the matching message of each type.
+    Types with an instance field (e.g. IMU.I) get one set of columns per
+    instance.
+
+    Args:
+        frames: Dictionary mapping message type to its messages, with a
+            timestamp and a TimeUS column
+        rate: Samples per second of a fixed-rate time base
+        reference: Message type whose TimeUS values are the time base; used
+            if rate is None
+        direction: One of ALIGN_DIRECTIONS
+        tolerance: Largest TimeUS distance of a match; values further away
+            are left empty
+        order: Message types in column order (default: order of frames)
+
+    Returns:
+        DataFrame with timestamp, TimeUS and TYPE.Field columns
+
+    Raises:
+        ValueError: If neither rate nor a reference type present in frames is given
+    """
+    if direction not in ALIGN_DIRECTIONS:
+        raise ValueError(f"Unknown direction '{direction}', expected one of: {', '.join(ALIGN_DIRECTIONS)}")
+    frames = {msg_type: frame for msg_type, frame in frames.items() if len(frame)}
+    order = [msg_type for msg_type in (order or list(frames)) if msg_type in frames]
+
+    if rate is not None:
+        aligned = pd.DataFrame({'TimeUS': time_base(frames, rate)})
+        joined = order
+    elif reference is not None and reference in frames:
+        reference_frames = instance_frames(reference, frames[reference])
+        if len(reference_frames) > 1:
+            raise ValueError(f"Reference type {reference} has several instances")
+        aligned = next(iter(reference_frames.values()))
+        joined = [msg_type for msg_type in order if msg_type != reference]
+    else:
+        raise ValueError("Aligned output needs a rate or a reference message type present in the log")
+
+    # Timestamps follow TimeUS with the time base of the log
+    offsets = [frame['timestamp'].iloc[0] - frame['TimeUS'].iloc[0] * 0.000001 for frame in frames.values()]
+    timestamps = (offsets[0] if offsets else 0) + aligned['TimeUS'].to_numpy(np.float64) * 0.000001
+    aligned.insert(0, 'timestamp', timestamps)
+
+    for msg_type in joined:
+        for frame in instance_frames(msg_type, frames[msg_type]).values():
+            aligned = pd.merge_asof(aligned, frame, on='TimeUS', direction=direction,
+                                    tolerance=tolerance, allow_exact_matches=True)
+    return aligned
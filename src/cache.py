@@ -0,0 +1,291 @@
+"""
+Conversion cache for batch conversions of ArduPilot binary logs.
+
+Converted outputs are kept in a content-addressed store: the key of a
+conversion is a hash of the input's content and the conversion options, so
+an unchanged log converted with the same options is not converted again.
+Its outputs are hard-linked (or copied across file systems) from the
+store. A JSON manifest lists the entries with their sizes and last use,
+and remembers the size and modification time of hashed inputs so unchanged
+files are not read again unless verification is requested.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+from typing import Dict, Any, Optional, List
+
+from .summary import manifest_path
+
+
+CACHE_VERSION = 1
+
+# Default cache directory, created inside the batch output directory so
+# outputs can be hard-linked
+CACHE_DIR_NAME = '.bin2csv-cache'
+
+CACHE_MANIFEST_NAME = 'manifest.json'
+
+# Block size used when hashing input files
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Cached name of the output of a single-file conversion
+OUTPUT_NAME = 'output'
+
+
+def file_digest(file_path: str) -> str:
+    """
+    Hash the content of a file.
+
+    Args:
+        file_path: File to hash
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _place(source: str, target: str):
+    """Hard-link source to target, copying if linking is not possible."""
+    if os.path.lexists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def release(path: str):
+    """
+    Remove outputs that share their data with the cache.
+
+    Writers truncate existing files, which would change a cached copy that
+    is hard-linked to them, so linked outputs are removed before converting.
+
+    Args:
+        path: Output file, or output directory of separate files
+    """
+    paths = [path]
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in os.listdir(path)]
+    for file_path in paths:
+        if os.path.isfile(file_path) and os.stat(file_path).st_nlink > 1:
+            os.remove(file_path)
+
+
+class ConversionCache:
+    """Content-addressed store of conversion outputs."""
+
+    def __init__(self, cache_dir: str, verify: bool = False):
+        """
+        Initialize the cache, loading its manifest.
+
+        Args:
+            cache_dir: Directory holding the manifest and the cached outputs
+            verify: If True, hash every input again instead of trusting an
+                unchanged size and modification time
+        """
+        self.cache_dir = cache_dir
+        self.verify = verify
+        self.hits = 0
+        self.misses = 0
+        self.manifest = {'version': CACHE_VERSION, 'inputs': {}, 'entries': {}}
+        path = os.path.join(cache_dir, CACHE_MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') == CACHE_VERSION:
+                self.manifest = manifest
+        except (OSError, ValueError):
+            pass
+
+    def input_digest(self, input_path: str) -> str:
+        """
+        Get the content hash of an input, reusing it while the file is unchanged.
+
+        Args:
+            input_path: Input .bin file
+
+        Returns:
+            Hex SHA-256 digest
+        """
+        stat = os.stat(input_path)
+        path = os.path.abspath(input_path)
+        known = self.manifest['inputs'].get(path)
+        if (not self.verify and known is not None and known['size'] == stat.st_size
+                and known['mtime_ns'] == stat.st_mtime_ns):
+            return known['digest']
+        digest = file_digest(input_path)
+        self.manifest['inputs'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                         'digest': digest}
+        return digest
+
+    def key(self, input_path: str, options: Dict[str, Any]) -> str:
+        """
+        Get the cache key of converting an input with the given options.
+
+        Args:
+            input_path: Input .bin file
+            options: Everything that changes the output, JSON-serialisable
+
+        Returns:
+            Hex cache key
+        """
+        data = {'version': CACHE_VERSION, 'input': self.input_digest(input_path), 'options': options}
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _object_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, 'objects', key[:2], key)
+
+    def restore(self, key: str, output_path: str, input_path: str, separate: bool,
+                manifest: bool = False) -> bool:
+        """
+        Place the cached outputs of a conversion at output_path.
+
+        Args:
+            key: Cache key from key()
+            output_path: Output file, or output directory of separate files
+            input_path: Input .bin file, recorded in a restored manifest
+            separate: True if output_path is a directory of per-type files
+            manifest: If True, also write the conversion manifest
+
+        Returns:
+            True if the conversion was cached and its outputs were placed
+        """
+        entry = self.manifest['entries'].get(key)
+        object_dir = self._object_dir(key)
+        if entry is None or not all(os.path.isfile(os.path.join(object_dir, name))
+                                    for name in entry['files']):
+            self.misses += 1
+            return False
+
+        targets = self._targets(entry['files'], output_path, separate)
+        if separate:
+            os.makedirs(output_path, exist_ok=True)
+        elif os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        for name, target in targets.items():
+            _place(os.path.join(object_dir, name), target)
+
+        summary = entry.get('summary')
+        if manifest and summary is not None:
+            summary = dict(summary, file_path=input_path,
+                           outputs=[{'path': targets[name], 'size': entry['sizes'][name]}
+                                    for name in entry['files']])
+            with open(manifest_path(output_path, separate), 'w') as f:
+                json.dump(summary, f, indent=2)
+                f.write('\n')
+
+        entry['last_used'] = time.time()
+        self.hits += 1
+        return True
+
+    def store(self, key: str, output_path: str, separate: bool,
+              summary: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Add the outputs of a finished conversion to the cache.
+
+        Args:
+            key: Cache key from key()
+            output_path: Output file, or output directory of separate files
+            separate: True if output_path is a directory of per-type files
+            summary: Conversion summary (ConversionSummary.to_dict) restored
+                as the manifest of later hits
+
+        Returns:
+            True if the outputs were stored
+        """
+        if separate:
+            if not os.path.isdir(output_path):
+                return False
+            skip = os.path.basename(manifest_path(output_path, True))
+            files = sorted(name for name in os.listdir(output_path)
+                           if name != skip and os.path.isfile(os.path.join(output_path, name)))
+        else:
+            if not os.path.isfile(output_path):
+                return False
+            files = [OUTPUT_NAME]
+        if not files:
+            return False
+
+        object_dir = self._object_dir(key)
+        shutil.rmtree(object_dir, ignore_errors=True)
+        os.makedirs(object_dir)
+        sizes = {}
+        for name, source in self._targets(files, output_path, separate).items():
+            _place(source, os.path.join(object_dir, name))
+            sizes[name] = os.path.getsize(source)
+
+        now = time.time()
+        self.manifest['entries'][key] = {
+            'files': files,
+            'sizes': sizes,
+            'size': sum(sizes.values()),
+            'created': now,
+            'last_used': now,
+            'summary': summary,
+        }
+        return True
+
+    def _targets(self, files: List[str], output_path: str, separate: bool) -> Dict[str, str]:
+        """Map cached file names to their paths in an output."""
+        if separate:
+            return {name: os.path.join(output_path, name) for name in files}
+        return {OUTPUT_NAME: output_path}
+
+    def evict(self, max_age: Optional[float] = None, max_size: Optional[int] = None) -> int:
+        """
+        Remove old entries, then the least recently used ones over a size limit.
+
+        Entries whose files have disappeared are always removed.
+
+        Args:
+            max_age: Largest time in seconds since an entry was last used
+            max_size: Largest total size in bytes of the cached outputs
+
+        Returns:
+            Number of removed entries
+        """
+        entries = self.manifest['entries']
+        now = time.time()
+        removed = []
+        for key, entry in entries.items():
+            missing = not all(os.path.isfile(os.path.join(self._object_dir(key), name))
+                              for name in entry['files'])
+            if missing or (max_age is not None and now - entry['last_used'] > max_age):
+                removed.append(key)
+        if max_size is not None:
+            kept = sorted((key for key in entries if key not in removed),
+                          key=lambda key: entries[key]['last_used'], reverse=True)
+            total = 0
+            for key in kept:
+                total += entries[key]['size']
+                if total > max_size:
+                    removed.append(key)
+
+        for key in removed:
+            shutil.rmtree(self._object_dir(key), ignore_errors=True)
+            del entries[key]
+        return len(removed)
+
+    @property
+    def size(self) -> int:
+        """Total size in bytes of the cached outputs."""
+        return sum(entry['size'] for entry in self.manifest['entries'].values())
+
+    def save(self):
+        """Write the cache manifest."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, CACHE_MANIFEST_NAME)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+            f.write('\n')
+        os.replace(temp_path, path)
@@ -0,0 +1,480 @@
+"""
+Compressed output files and compressed logs for ArduPilot bin to CSV conversion.
+
+A CompressedFile is written like a text file, but it compresses what it is
+given with gzip, zstd or xz as it goes, so no uncompressed copy of the output
+is ever written. Text is collected in blocks of COMPRESS_BLOCK_SIZE bytes, and
+the blocks are compressed and written on a shared pool of threads while the
+log is still being decoded. zlib, lzma and zstandard release the GIL while
+compressing, so the compression of one file overlaps with decoding, and files
+written at the same time (one per message type) are compressed in parallel.
+The blocks of one file are compressed in order into a single gzip member, xz
+stream or zstd frame, which any gzip, xz or zstd reader can decompress.
+
+Compressed logs (.bin.gz, .bin.zst, .bin.xz) are read through a
+DecompressedStream: a thread decompresses the log ahead of the decoder into a
+bounded queue of blocks, so no decompressed copy is written to disk and only
+a few blocks are held in memory.
+"""
+
+import os
+import gzip
+import lzma
+import zlib
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List
+
+
+COMPRESSIONS = ('gzip', 'zstd', 'xz')
+
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+    'xz': '.xz',
+}
+
+# Extensions of the log files read, plain or compressed
+LOG_EXTENSIONS = ('.bin',) + tuple('.bin' + extension for extension in COMPRESSION_EXTENSIONS.values())
+
+# Compression level used when none is given, and the range of valid levels
+DEFAULT_COMPRESS_LEVELS = {'gzip': 6, 'zstd': 3, 'xz': 6}
+COMPRESS_LEVEL_RANGES = {'gzip': (1, 9), 'zstd': (1, 22), 'xz': (0, 9)}
+
+# Bytes of text collected before a block is handed to a compression thread
+COMPRESS_BLOCK_SIZE = 1024 * 1024
+
+# Blocks of one file waiting for compression before write() waits for them
+MAX_PENDING_BLOCKS = 4
+
+# Threads compressing the blocks of all open files
+COMPRESS_THREADS = min(4, os.cpu_count() or 1)
+
+# Bytes of a compressed log decompressed at a time, and blocks decompressed
+# ahead of the decoder
+READ_AHEAD_BLOCK_SIZE = 1024 * 1024
+READ_AHEAD_BLOCKS = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _reset_executor():
+    """Forget the thread pool of the parent in a forked worker process."""
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+
+def _compress_executor() -> ThreadPoolExecutor:
+    """Get the thread pool shared by all compressed files, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(COMPRESS_THREADS, thread_name_prefix='bin2csv-compress')
+        return _executor
+
+
+def _import_zstandard():
+    """Import zstandard, with a helpful error if it is missing."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard is required for zstd compression (pip install zstandard)") from None
+    return zstandard
+
+
+def check_compression(compression: Optional[str], level: Optional[int] = None):
+    """
+    Check a compression and level, raising ValueError if they are not valid.
+
+    Args:
+        compression: One of COMPRESSIONS, or None for no compression
+        level: Compression level, or None for the default level
+    """
+    if compression is None:
+        if level is not None:
+            raise ValueError("A compression level needs a compression")
+        return
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}', expected one of: {', '.join(COMPRESSIONS)}")
+    if level is not None:
+        low, high = COMPRESS_LEVEL_RANGES[compression]
+        if not low <= level <= high:
+            raise ValueError(f"{compression} compression levels range from {low} to {high}, got {level}")
+    if compression == 'zstd':
+        _import_zstandard()
+
+
+def compressed_path(path: str, compression: Optional[str]) -> str:
+    """
+    Add the extension of a compression to a file name.
+
+    Args:
+        path: File path
+        compression: One of COMPRESSIONS, or None
+
+    Returns:
+        path with COMPRESSION_EXTENSIONS[compression] appended, or path if
+        there is no compression
+    """
+    return path + COMPRESSION_EXTENSIONS[compression] if compression else path
+
+
+def _compressor(compression: str, level: int):
+    """Create a streaming compressor with compress(data) and flush() methods."""
+    if compression == 'gzip':
+        # wbits 31 writes a gzip header and trailer around the deflate stream
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+    if compression == 'xz':
+        return lzma.LZMACompressor(lzma.FORMAT_XZ, preset=level)
+    # zstd splits the frame into jobs compressed by threads of its own
+    return _import_zstandard().ZstdCompressor(level=level, threads=-1).compressobj()
+
+
+class CompressedFile:
+    """Text file whose content is compressed on background threads as it is written."""
+
+    def __init__(self, path: str, compression: str, level: Optional[int] = None,
+                 append: bool = False, block_size: int = COMPRESS_BLOCK_SIZE):
+        """
+        Open the file.
+
+        Args:
+            path: Output file path
+            compression: One of COMPRESSIONS
+            level: Compression level (default: DEFAULT_COMPRESS_LEVELS)
+            append: If True, add a new gzip member, xz stream or zstd frame
+                after the content of an existing file instead of replacing it
+            block_size: Bytes of text handed to the compression threads at a time
+        """
+        check_compression(compression, level)
+        self.path = path
+        self.compression = compression
+        self.level = DEFAULT_COMPRESS_LEVELS[compression] if level is None else level
+        self.block_size = block_size
+        self._compressor = _compressor(compression, self.level)
+        self._file = open(path, 'ab' if append else 'wb')
+        # Position reported by tell: only 0 while the file is empty
+        self._position = self._file.tell()
+        self._buffer = []
+        self._buffered = 0
+        # Blocks waiting for compression; None finishes the stream
+        self._blocks = deque()
+        self._compressing = False
+        self._error = None
+        self._condition = threading.Condition()
+
+    def write(self, text: str) -> int:
+        """
+        Write text, compressing it once a block is full.
+
+        Args:
+            text: Text to write
+
+        Returns:
+            Number of characters written
+        """
+        data = text.encode('utf-8')
+        self._buffer.append(data)
+        self._buffered += len(data)
+        self._position += len(data)
+        if self._buffered >= self.block_size:
+            self._submit(b''.join(self._buffer))
+            self._buffer = []
+            self._buffered = 0
+        return len(text)
+
+    def tell(self) -> int:
+        """Uncompressed bytes written, plus the compressed size of an appended file."""
+        return self._position
+
+    def flush(self):
+        """
+        Raise the error of a failed compression, if any.
+
+        Text is compressed in whole blocks, so flushing does not end the
+        current block; the last one is compressed when the file is closed.
+        """
+        with self._condition:
+            self._raise_error()
+
+    def close(self):
+        """Compress the remaining text, finish the compressed stream and close the file."""
+        if self._file is None:
+            return
+        try:
+            if self._buffer:
+                self._submit(b''.join(self._buffer))
+                self._buffer = []
+            self._submit(None)
+            with self._condition:
+                while self._compressing and self._error is None:
+                    self._condition.wait()
+                self._raise_error()
+        finally:
+            with self._condition:
+                # A failed compression stops before the end of the queue
+                while self._compressing:
+                    self._condition.wait()
+            self._file.close()
+            self._file = None
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def writable(self) -> bool:
+        return True
+
+    def _submit(self, block: Optional[bytes]):
+        """Queue a block for compression, waiting while too many blocks are queued."""
+        with self._condition:
+            while len(self._blocks) >= MAX_PENDING_BLOCKS and self._error is None:
+                self._condition.wait()
+            self._raise_error()
+            self._blocks.append(block)
+            if not self._compressing:
+                self._compressing = True
+                _compress_executor().submit(self._compress_blocks)
+
+    def _compress_blocks(self):
+        """Compress and write the queued blocks in order, on a thread of the pool."""
+        while True:
+            with self._condition:
+                if not self._blocks or self._error is not None:
+                    self._compressing = False
+                    self._condition.notify_all()
+                    return
+                block = self._blocks.popleft()
+                self._condition.notify_all()
+            try:
+                if block is None:
+                    self._file.write(self._compressor.flush())
+                else:
+                    self._file.write(self._compressor.compress(block))
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+
+    def _raise_error(self):
+        """Raise the error of a failed compression; the caller holds the condition."""
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_output(path: str, append: bool = False, compression: Optional[str] = None,
+                level: Optional[int] = None):
+    """
+    Open a text output file, compressed or not.
+
+    Args:
+        path: Output file path
+        append: If True, add to the end of an existing file
+        compression: One of COMPRESSIONS, or None for a plain text file
+        level: Compression level (default: DEFAULT_COMPRESS_LEVELS)
+
+    Returns:
+        Open text file, or CompressedFile
+    """
+    if compression is None:
+        return open(path, 'a' if append else 'w', newline='')
+    return CompressedFile(path, compression, level, append)
+
+
+def input_compression(path: str) -> Optional[str]:
+    """
+    Get the compression of an input file from its extension.
+
+    Args:
+        path: File path
+
+    Returns:
+        One of COMPRESSIONS, or None for an uncompressed file
+    """
+    extension = os.path.splitext(path)[1].lower()
+    for compression, compressed_extension in COMPRESSION_EXTENSIONS.items():
+        if extension == compressed_extension:
+            return compression
+    return None
+
+
+def strip_compression(path: str) -> str:
+    """Remove the extension of a compression from a file name (flight.bin.gz -> flight.bin)."""
+    return os.path.splitext(path)[0] if input_compression(path) else path
+
+
+def log_stem(path: str) -> str:
+    """Base name of a log without its directory and extensions (flight.bin.gz -> flight)."""
+    return os.path.splitext(os.path.basename(strip_compression(path)))[0]
+
+
+def is_log_file(path: str) -> bool:
+    """True if a file name has one of LOG_EXTENSIONS."""
+    return path.lower().endswith(LOG_EXTENSIONS)
+
+
+def log_patterns(pattern: str) -> List[str]:
+    """
+    Extend a glob pattern of .bin files to the compressed logs.
+
+    Args:
+        pattern: Glob pattern, e.g. 'logs/*.bin'
+
+    Returns:
+        List holding pattern, followed by one pattern per compressed extension
+        if pattern ends with .bin ('logs/*.bin.gz', ...)
+    """
+    if not pattern.lower().endswith('.bin'):
+        return [pattern]
+    return [pattern] + [pattern + extension for extension in COMPRESSION_EXTENSIONS.values()]
+
+
+def _decompressor(compression: str, file):
+    """Wrap a compressed binary file in a reader of its decompressed bytes."""
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=file, mode='rb')
+    if compression == 'xz':
+        return lzma.LZMAFile(file)
+    # A zstd file may hold several frames, e.g. after appends
+    return _import_zstandard().ZstdDecompressor().stream_reader(file, read_across_frames=True)
+
+
+class DecompressedStream:
+    """Binary reader of a compressed file, decompressed ahead of the reader on a thread."""
+
+    def __init__(self, path: str, compression: Optional[str] = None,
+                 block_size: int = READ_AHEAD_BLOCK_SIZE, max_blocks: int = READ_AHEAD_BLOCKS):
+        """
+        Open the file and start decompressing it.
+
+        Args:
+            path: Compressed file path
+            compression: One of COMPRESSIONS (default: from the file extension)
+            block_size: Bytes decompressed at a time
+            max_blocks: Decompressed blocks waiting to be read before the
+                thread waits for the reader
+        """
+        compression = compression or input_compression(path)
+        check_compression(compression)
+        self.path = path
+        self.block_size = block_size
+        # Compressed bytes read for the decompressed bytes handed out so far
+        self.compressed_position = 0
+        self._file = open(path, 'rb')
+        self._reader = _decompressor(compression, self._file)
+        # Blocks of (data, compressed position); an exception or None (end) last
+        self._blocks = queue.Queue(max_blocks)
+        self._stop = threading.Event()
+        self._current = b''
+        self._offset = 0
+        self._ended = False
+        self._thread = threading.Thread(target=self._read_ahead, name='bin2csv-decompress', daemon=True)
+        self._thread.start()
+
+    def _read_ahead(self):
+        """Decompress blocks into the queue until the end of the file, on the thread."""
+        try:
+            while not self._stop.is_set():
+                block = self._reader.read(self.block_size)
+                if not block:
+                    break
+                self._put((block, self._file.tell()))
+        except EOFError:
+            # A truncated archive ends the log where its data ends
+            pass
+        except Exception as e:
+            self._put(e)
+        self._put(None)
+
+    def _put(self, item):
+        """Queue an item, giving up once the stream is closed."""
+        while not self._stop.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read decompressed bytes.
+
+        Args:
+            size: Number of bytes to read (-1 for all remaining bytes)
+
+        Returns:
+            Bytes read, fewer than size only at the end of the file
+
+        Raises:
+            OSError: If the file cannot be decompressed
+        """
+        chunks = []
+        while size < 0 or size > 0:
+            if self._offset >= len(self._current):
+                if self._ended:
+                    break
+                item = self._blocks.get()
+                if item is None:
+                    self._ended = True
+                    break
+                if isinstance(item, Exception):
+                    self._ended = True
+                    raise OSError(f"Cannot decompress {self.path}: {item}") from item
+                self._current, self.compressed_position = item
+                self._offset = 0
+            count = len(self._current) - self._offset if size < 0 else min(size, len(self._current) - self._offset)
+            chunks.append(self._current[self._offset:self._offset + count])
+            self._offset += count
+            if size > 0:
+                size -= count
+        return b''.join(chunks)
+
+    def close(self):
+        """Stop the decompression thread and close the file."""
+        if self._file is None:
+            return
+        self._stop.set()
+        # Unblock a thread waiting for room in the queue
+        while True:
+            try:
+                self._blocks.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+        self._reader.close()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_input(path: str):
+    """
+    Open a log for reading, decompressing it if it is compressed.
+
+    Args:
+        path: Path of a .bin file or a compressed log
+
+    Returns:
+        Binary file, or DecompressedStream
+    """
+    if input_compression(path) is None:
+        return open(path, 'rb')
+    return DecompressedStream(path)
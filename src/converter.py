@@ -6,23 +6,65 @@ log files to CSV format.
 """
 
 import os
+import json
+import time
+import shutil
 import logging
-import pandas as pd
-from typing import Dict, List, Optional, Any
+import tempfile
+from contextlib import nullcontext
+from concurrent.futures import Executor, Future, as_completed
+from typing import Dict, List, Optional, Any, Tuple, Callable
 from .parser import BinFileParser
+from .dataflash import DataFlashLog, LogFormat
+from .writers import (table_writer, separate_writer, TABLE_WRITERS, DEFAULT_CHUNK_SIZE,
+                      CsvWriter, SeparateCsvWriter, column_union, column_dtypes, type_columns, widen_csv,
+                      typed_frame,
+                      DEFAULT_TYPE_BUFFER_SIZE, DEFAULT_MAX_OPEN_FILES,
+                      OUTPUT_FORMATS, OUTPUT_EXTENSIONS, FORMAT_NAMES, output_extension)
+from .compression import check_compression, open_output, input_compression, log_stem
+from .csvformat import check_float_precision, write_csv
+from .parallel import WorkerPool, resolve_jobs, set_worker_task
+from .summary import ConversionSummary, manifest_path
+from .decimate import AGGREGATES
+from .align import align_frames, INSTANCE_FIELDS
+from .cache import ConversionCache, release
+from .follow import FollowState, follow_state_path, DEFAULT_FOLLOW_INTERVAL
+from .stats import ConversionStats
+from .progress import Progress, ProgressTracker
+
+
+# Smallest byte range worth decoding in its own worker process
+MIN_RANGE_SIZE = 4 * 1024 * 1024
+
+# convert() options that do not change the output, left out of cache keys
+CACHE_IGNORED_OPTIONS = ('chunk_size', 'type_buffer_size', 'max_open_files')
 
 
 class BinToCsvConverter:
     """Main converter class for ArduPilot bin to CSV conversion."""
     
-    def __init__(self, log_level: int = logging.INFO):
+    def __init__(self, log_level: int = logging.INFO, engine: str = 'pymavlink',
+                 use_index: bool = False, collect_stats: bool = False):
         """
         Initialize the converter.
         
         Args:
             log_level: Logging level for converter operations
+            engine: Decode engine used by the parser, 'pymavlink' or 'numpy'
+            use_index: If True, read (and create on first scan) a .binidx sidecar
+                index next to each log
+            collect_stats: If True, time the stages of each conversion and
+                keep the ConversionStats in last_stats
         """
-        self.parser = BinFileParser(log_level)
+        self.parser = BinFileParser(log_level, engine, use_index)
+        self.log_level = log_level
+        self.collect_stats = collect_stats
+        self.last_summary = None
+        self.last_stats = None
+        # ConversionStats, ProgressTracker and float precision of the conversion in progress
+        self.stats = None
+        self.progress = None
+        self.float_precision = None
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(log_level)
         
@@ -33,35 +75,211 @@ class BinToCsvConverter:
             handler.setFormatter(formatter)
             self.logger.addHandler(handler)
     
+    def _stage(self, name: str):
+        """Time a stage in the statistics of the conversion in progress, if any."""
+        return self.stats.stage(name) if self.stats is not None else nullcontext()
+    
+    def _track(self, messages):
+        """
+        Wrap a message generator to report progress and time it as the build stage,
+        when a progress callback or statistics are active.
+        """
+        if self.progress is not None:
+            messages = self.progress.iterate(messages, self.parser.position)
+        if self.stats is not None:
+            messages = self.stats.iterate(messages, 'build')
+        return messages
+    
     def convert(self, input_path: str, output_path: str, 
                 message_types: Optional[List[str]] = None,
-                separate_by_type: bool = False) -> bool:
+                separate_by_type: bool = False,
+                stream: bool = False,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                type_buffer_size: int = DEFAULT_TYPE_BUFFER_SIZE,
+                max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+                decode_jobs: int = 1,
+                output_format: str = 'csv',
+                manifest: bool = False,
+                start: Optional[float] = None,
+                end: Optional[float] = None,
+                rates: Optional[Dict[str, float]] = None,
+                aggregate: Optional[str] = None,
+                aligned: bool = False,
+                align_rate: Optional[float] = None,
+                align_to: Optional[str] = None,
+                align_direction: str = 'nearest',
+                align_tolerance: Optional[float] = None,
+                compression: Optional[str] = None,
+                compress_level: Optional[int] = None,
+                float_precision: Optional[Dict[str, int]] = None,
+                progress: Optional[Callable[[Progress], None]] = None) -> bool:
         """
         Convert a binary log file to CSV format.
         
+        The message counts, time range and file sizes of the conversion are
+        collected during the same pass and kept in last_summary. If the
+        converter collects statistics, the stage times are kept in last_stats.
+        
         Args:
-            input_path: Path to input .bin file
+            input_path: Path to input .bin file, or a compressed log (.bin.gz,
+                .bin.zst, .bin.xz) decompressed as it is decoded
             output_path: Path to output .csv file
-            message_types: List of message types to include (None for all)
+            message_types: List of message types to include (None for all).
+                'TYPE.Field' entries select single fields of a type; only
+                those fields are decoded and written
             separate_by_type: If True, create separate CSV files for each message type
+            stream: If True, write messages in chunks as they are parsed so memory
+                stays flat whatever the file size
+            chunk_size: Number of messages written per chunk when streaming
+            type_buffer_size: Number of messages buffered per message type when
+                streaming separate files
+            max_open_files: Maximum number of files kept open when streaming
+                separate files
+            decode_jobs: Number of worker processes decoding byte ranges of the
+                file in parallel (1 decodes in this process, 0 uses one per CPU)
+            output_format: Output file format, one of OUTPUT_FORMATS. Formats
+                other than 'csv' are always written in chunks as with stream
+            manifest: If True, save the conversion summary as a JSON manifest
+                next to the output (<name>.manifest.json, or manifest.json in
+                the output directory of separate files)
+            start: Seconds since boot (TimeUS / 1e6) of the first message to convert
+            end: Seconds since boot of the last message to convert
+            rates: Dictionary mapping message type to its target rate in Hz.
+                Each 1 / rate seconds of a type keep only their first message;
+                the other messages are dropped while decoding
+            aggregate: 'mean', 'min' or 'max' to write one message per bucket
+                of a rate-limited type with the aggregated numeric fields
+            aligned: If True, write one dense table of the selected types with
+                a TYPE.Field column per field, resampled onto a common time base
+                (separate_by_type, stream and decode_jobs do not apply)
+            align_rate: Samples per second of the aligned time base
+            align_to: Message type whose timestamps are the aligned time base,
+                used if align_rate is None
+            align_direction: 'nearest', 'backward' or 'forward' match of each
+                type's messages to the time base
+            align_tolerance: Largest distance in seconds of a matched message
+            compression: 'gzip', 'zstd' or 'xz' to compress CSV output as it is
+                written, on background threads. Output file names derived from
+                the input or message types get the compression's extension
+                (flight.csv.gz, GPS.csv.gz); an output file path is used as given
+            compress_level: Compression level (default: DEFAULT_COMPRESS_LEVELS)
+            float_precision: Dictionary mapping 'TYPE.Field', 'Field' or '*'
+                (every float column) to the number of decimals CSV float
+                columns are rounded to, e.g. {'*': 3, 'timestamp': 6,
+                'GPS.Lat': 7}. Float columns without a precision are written
+                with every digit of their value
+            progress: Function called with a Progress report (bytes of the
+                input parsed, messages, ETA) at most every PROGRESS_INTERVAL
+                seconds, and once at the end of a successful conversion
             
         Returns:
             True if conversion successful, False otherwise
         """
         try:
             self.logger.info(f"Converting {input_path} to {output_path}")
+            self.last_summary = None
+            self.last_stats = None
             
-            if separate_by_type:
-                return self._convert_separate_files(input_path, output_path, message_types)
+            if output_format not in OUTPUT_FORMATS:
+                self.logger.error(f"Unknown output format: {output_format}")
+                return False
+            if compression is not None and output_format != 'csv':
+                self.logger.error(f"Compression applies to CSV output, not {FORMAT_NAMES[output_format]}")
+                return False
+            if float_precision and output_format != 'csv':
+                self.logger.error(f"Float precision applies to CSV output, not {FORMAT_NAMES[output_format]}")
+                return False
+            try:
+                check_compression(compression, compress_level)
+                check_float_precision(float_precision)
+            except (ValueError, ImportError) as e:
+                self.logger.error(str(e))
+                return False
+            compress = (compression, compress_level)
+            self.float_precision = float_precision or None
+            
+            parse_options = {}
+            message_types, fields = split_fields(message_types)
+            if fields:
+                parse_options['fields'] = fields
+            if start is not None or end is not None:
+                parse_options['time_window'] = time_window(start, end)
+            if rates:
+                if any(rate <= 0 for rate in rates.values()):
+                    self.logger.error(f"Message rates must be positive: {rates}")
+                    return False
+                parse_options['rates'] = dict(rates)
+            if aggregate is not None:
+                if aggregate not in AGGREGATES:
+                    self.logger.error(f"Unknown aggregation: {aggregate}")
+                    return False
+                parse_options['aggregate'] = aggregate
+            
+            summary = ConversionSummary(input_path, output_format)
+            if self.collect_stats:
+                self.stats = self.parser.stats = ConversionStats(input_path)
+            if progress is not None:
+                self.progress = ProgressTracker(progress, summary.file_size, input_path)
+            decode_jobs = resolve_jobs(decode_jobs)
+            if aligned:
+                if separate_by_type:
+                    self.logger.warning("Aligned output is a single table, ignoring separate files")
+                    separate_by_type = False
+                tolerance = round(align_tolerance * 1000000) if align_tolerance is not None else None
+                success = self._convert_aligned(input_path, output_path, message_types, chunk_size,
+                                                output_format, summary, parse_options,
+                                                align_rate, align_to, align_direction, tolerance,
+                                                compress)
+            elif decode_jobs > 1:
+                success = self._convert_parallel(input_path, output_path, message_types, separate_by_type,
+                                                 decode_jobs, chunk_size, type_buffer_size, max_open_files,
+                                                 output_format, summary, parse_options, compress)
+            elif separate_by_type and (stream or output_format != 'csv'):
+                success = self._convert_separate_files_streaming(input_path, output_path, message_types,
+                                                                 type_buffer_size, max_open_files,
+                                                                 output_format, summary, parse_options,
+                                                                 compress)
+            elif separate_by_type:
+                success = self._convert_separate_files(input_path, output_path, message_types, summary,
+                                                       parse_options, compress)
+            elif stream or output_format != 'csv':
+                success = self._convert_single_file_streaming(input_path, output_path, message_types,
+                                                              chunk_size, output_format, summary,
+                                                              parse_options, compress)
             else:
-                return self._convert_single_file(input_path, output_path, message_types)
+                success = self._convert_single_file(input_path, output_path, message_types, summary,
+                                                    parse_options, compress)
+            
+            if success:
+                self.last_summary = summary
+                if self.progress is not None:
+                    self.progress.finish(summary.total_messages)
+                if self.stats is not None:
+                    self.stats.finish(summary)
+                    self.last_stats = self.stats
+                if manifest:
+                    if separate_by_type:
+                        path = manifest_path(output_path, separate_by_type=True)
+                    else:
+                        path = manifest_path(self._single_output_file(input_path, output_path, output_format,
+                                                                      compression)[1])
+                    summary.save(path)
+                    self.logger.info(f"Saved manifest to {path}")
+            return success
                 
         except Exception as e:
             self.logger.error(f"Error during conversion: {e}")
             return False
+        finally:
+            self.stats = self.parser.stats = None
+            self.progress = None
+            self.float_precision = None
     
     def _convert_single_file(self, input_path: str, output_path: str, 
-                           message_types: Optional[List[str]] = None) -> bool:
+                           message_types: Optional[List[str]] = None,
+                           summary: Optional[ConversionSummary] = None,
+                           parse_options: Optional[Dict[str, Any]] = None,
+                           compress: Tuple[Optional[str], Optional[int]] = (None, None)) -> bool:
         """
         Convert binary log to a single CSV file.
         
@@ -69,39 +287,40 @@ class BinToCsvConverter:
             input_path: Path to input .bin file or output directory
             output_path: Path to output .csv file or directory
             message_types: List of message types to include
+            summary: Summary updated with the converted messages
+            parse_options: Keyword arguments of BinFileParser.parse_messages
+            compress: Tuple of (compression, compression level) of the output
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            # Determine if output_path is a directory or file
-            if os.path.isdir(output_path) or (not os.path.exists(output_path) and output_path.endswith(os.sep)):
-                # It's a directory - derive filename from input
-                output_dir = output_path
-                input_stem = os.path.splitext(os.path.basename(input_path))[0]
-                output_file = os.path.join(output_dir, f"{input_stem}.csv")
-            else:
-                # It's a file path
-                output_dir = os.path.dirname(output_path)
-                output_file = output_path
+            output_dir, output_file = self._single_output_file(input_path, output_path, 'csv', compress[0])
+            summary = summary or ConversionSummary(input_path)
             
             # Collect all messages
             messages = []
-            for message in self.parser.parse_messages(input_path, message_types):
+            for message in self._track(self.parser.parse_messages(input_path, message_types,
+                                                                  **(parse_options or {}))):
                 messages.append(message)
+                summary.update(message)
             
             if not messages:
                 self.logger.warning(f"No messages found in {input_path}")
                 return False
             
-            # Create DataFrame and save to CSV
-            df = pd.DataFrame(messages)
+            # Create a DataFrame typed from the FMT definitions and save to CSV
+            formats = self._converted_formats(input_path, summary, parse_options)
+            with self._stage('dataframe'):
+                df = typed_frame(messages, dtypes=column_dtypes(formats.values()))
             
             # Ensure output directory exists
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            df.to_csv(output_file, index=False)
+            with self._stage('write'), open_output(output_file, False, *compress) as output:
+                write_csv(output, df, float_precision=self.float_precision)
+            summary.add_output(output_file)
             self.logger.info(f"Successfully saved {len(messages)} messages to {output_file}")
             
             return True
@@ -110,8 +329,174 @@ class BinToCsvConverter:
             self.logger.error(f"Error in single file conversion: {e}")
             return False
     
+    def _convert_single_file_streaming(self, input_path: str, output_path: str,
+                                       message_types: Optional[List[str]] = None,
+                                       chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                       output_format: str = 'csv',
+                                       summary: Optional[ConversionSummary] = None,
+                                       parse_options: Optional[Dict[str, Any]] = None,
+                                       compress: Tuple[Optional[str], Optional[int]] = (None, None)) -> bool:
+        """
+        Convert binary log to a single output file, writing fixed-size chunks.
+        
+        The column set is the union of the FMT definitions of the selected
+        message types, so it is known before the first message is parsed and
+        every chunk is written with the same header or schema.
+        
+        Args:
+            input_path: Path to input .bin file
+            output_path: Path to output file or directory
+            message_types: List of message types to include
+            chunk_size: Number of messages written per chunk
+            output_format: Output file format, one of OUTPUT_FORMATS
+            summary: Summary updated with the converted messages
+            parse_options: Keyword arguments of BinFileParser.parse_messages
+            compress: Tuple of (compression, compression level) of CSV output
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            output_dir, output_file = self._single_output_file(input_path, output_path, output_format,
+                                                               compress[0])
+            summary = summary or ConversionSummary(input_path, output_format)
+            
+            with self._stage('formats'):
+                formats = self.parser.get_message_formats(input_path)
+            if message_types is not None:
+                formats = {name: fmt for name, fmt in formats.items() if name in message_types}
+            formats = self._project_formats(formats, parse_options)
+            
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+            
+            with self._stage('write'), table_writer(output_format, output_file, formats.values(),
+                                                    chunk_size, compression=compress[0],
+                                                    compress_level=compress[1],
+                                                    float_precision=self.float_precision) as writer:
+                for message in self._track(self.parser.parse_messages(input_path, message_types,
+                                                                      **(parse_options or {}))):
+                    writer.write(message)
+                    summary.update(message)
+            total = writer.count
+            
+            if total == 0:
+                self.logger.warning(f"No messages found in {input_path}")
+                return False
+            
+            summary.add_output(output_file)
+            self.logger.info(f"Successfully saved {total} messages to {output_file}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error in streaming single file conversion: {e}")
+            return False
+    
+    def _single_output_file(self, input_path: str, output_path: str, output_format: str = 'csv',
+                            compression: Optional[str] = None):
+        """
+        Resolve the file written by a single file conversion.
+        
+        Args:
+            input_path: Path to input .bin file
+            output_path: Path to output file or directory
+            output_format: Output file format, one of OUTPUT_FORMATS
+            compression: Compression of CSV output, whose extension is added
+                to file names derived from the input
+            
+        Returns:
+            Tuple of (output directory, output file path)
+        """
+        # Determine if output_path is a directory or file
+        if os.path.isdir(output_path) or (not os.path.exists(output_path) and output_path.endswith(os.sep)):
+            # It's a directory - derive filename from input
+            output_dir = output_path
+            input_stem = log_stem(input_path)
+            output_file = os.path.join(output_dir, f"{input_stem}{output_extension(output_format, compression)}")
+        else:
+            # It's a file path
+            output_dir = os.path.dirname(output_path)
+            output_file = output_path
+        return output_dir, output_file
+    
+    def _convert_aligned(self, input_path: str, output_path: str,
+                         message_types: Optional[List[str]], chunk_size: int,
+                         output_format: str, summary: ConversionSummary,
+                         parse_options: Dict[str, Any], rate: Optional[float],
+                         reference: Optional[str], direction: str,
+                         tolerance: Optional[int],
+                         compress: Tuple[Optional[str], Optional[int]] = (None, None)) -> bool:
+        """
+        Convert binary log to one time-aligned wide table.
+        
+        The selected types are decoded into one DataFrame each and joined
+        onto the time base with as-of joins on TimeUS (see align.align_frames).
+        
+        Args:
+            input_path: Path to input .bin file
+            output_path: Path to output file or directory
+            message_types: List of message types to include
+            chunk_size: Number of rows written per chunk to columnar files
+            output_format: Output file format, one of OUTPUT_FORMATS
+            summary: Summary updated with the converted messages
+            parse_options: Keyword arguments of BinFileParser.parse_messages;
+                rate limits do not apply
+            rate: Samples per second of the time base
+            reference: Message type whose TimeUS values are the time base
+            direction: One of ALIGN_DIRECTIONS
+            tolerance: Largest TimeUS distance of a match
+            compress: Tuple of (compression, compression level) of CSV output
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            output_dir, output_file = self._single_output_file(input_path, output_path, output_format,
+                                                               compress[0])
+            
+            if reference is not None and message_types is not None and reference not in message_types:
+                message_types = list(message_types) + [reference]
+            # The joins need the TimeUS and instance of every type, selected or not
+            fields = {msg_type: ['TimeUS', *INSTANCE_FIELDS] + names
+                      for msg_type, names in (parse_options.get('fields') or {}).items()}
+            with self._stage('build'):
+                frames = self.parser.parse_frames(input_path, message_types,
+                                                  parse_options.get('time_window'), fields)
+            for msg_type, frame in frames.items():
+                if len(frame):
+                    summary.update_type(msg_type, len(frame), float(frame['timestamp'].iloc[0]),
+                                        float(frame['timestamp'].iloc[-1]))
+            if not summary.message_counts:
+                self.logger.warning(f"No messages with TimeUS found in {input_path}")
+                return False
+            
+            with self._stage('align'):
+                df = align_frames(frames, rate, reference, direction, tolerance, order=message_types)
+            
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+            with self._stage('write'):
+                if output_format == 'csv':
+                    with open_output(output_file, False, *compress) as output:
+                        write_csv(output, df, float_precision=self.float_precision)
+                else:
+                    with TABLE_WRITERS[output_format](output_file, list(df.columns), chunk_size=chunk_size) as writer:
+                        for first in range(0, len(df), chunk_size):
+                            writer.write_frame(df.iloc[first:first + chunk_size])
+            summary.add_output(output_file)
+            self.logger.info(f"Successfully saved {len(df)} aligned rows of {len(frames)} message types "
+                             f"to {output_file}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error in aligned conversion: {e}")
+            return False
+    
     def _convert_separate_files(self, input_path: str, output_base: str, 
-                              message_types: Optional[List[str]] = None) -> bool:
+                              message_types: Optional[List[str]] = None,
+                              summary: Optional[ConversionSummary] = None,
+                              parse_options: Optional[Dict[str, Any]] = None,
+                              compress: Tuple[Optional[str], Optional[int]] = (None, None)) -> bool:
         """
         Convert binary log to separate CSV files by message type.
         
@@ -119,6 +504,9 @@ class BinToCsvConverter:
             input_path: Path to input .bin file
             output_base: Output directory path for separate files
             message_types: List of message types to include
+            summary: Summary updated with the converted messages
+            parse_options: Keyword arguments of BinFileParser.parse_messages
+            compress: Tuple of (compression, compression level) of the outputs
             
         Returns:
             True if successful, False otherwise
@@ -133,8 +521,11 @@ class BinToCsvConverter:
             
             # Group messages by type
             messages_by_type = {}
+            summary = summary or ConversionSummary(input_path)
             
-            for message in self.parser.parse_messages(input_path, message_types):
+            for message in self._track(self.parser.parse_messages(input_path, message_types,
+                                                                  **(parse_options or {}))):
+                summary.update(message)
                 msg_type = message['message_type']
                 if msg_type not in messages_by_type:
                     messages_by_type[msg_type] = []
@@ -145,10 +536,15 @@ class BinToCsvConverter:
                 return False
             
             # Save each message type to separate file in the output directory
+            formats = self._converted_formats(input_path, summary, parse_options)
             for msg_type, messages in messages_by_type.items():
-                df = pd.DataFrame(messages)
-                output_file = os.path.join(output_dir, f"{msg_type}.csv")
-                df.to_csv(output_file, index=False)
+                with self._stage('dataframe'):
+                    dtypes = column_dtypes([formats[msg_type]]) if msg_type in formats else None
+                    df = typed_frame(messages, dtypes=dtypes)
+                output_file = os.path.join(output_dir, f"{msg_type}{output_extension('csv', compress[0])}")
+                with self._stage('write'), open_output(output_file, False, *compress) as output:
+                    write_csv(output, df, float_precision=self.float_precision, message_type=msg_type)
+                summary.add_output(output_file)
                 self.logger.info(f"Saved {len(messages)} {msg_type} messages to {output_file}")
             
             self.logger.info(f"Successfully converted {input_path} to {len(messages_by_type)} separate CSV files in {output_dir}")
@@ -158,6 +554,427 @@ class BinToCsvConverter:
             self.logger.error(f"Error in separate files conversion: {e}")
             return False
     
+    def _convert_separate_files_streaming(self, input_path: str, output_base: str,
+                                          message_types: Optional[List[str]] = None,
+                                          type_buffer_size: int = DEFAULT_TYPE_BUFFER_SIZE,
+                                          max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+                                          output_format: str = 'csv',
+                                          summary: Optional[ConversionSummary] = None,
+                                          parse_options: Optional[Dict[str, Any]] = None,
+                                          compress: Tuple[Optional[str], Optional[int]] = (None, None)) -> bool:
+        """
+        Convert binary log to separate files by message type, incrementally.
+        
+        Each message type is appended to its own file through a small buffer,
+        so memory scales with the number of types rather than the length of
+        the log. For CSV an LRU pool bounds the number of open files; columnar
+        files each stay open until the end.
+        
+        Args:
+            input_path: Path to input .bin file
+            output_base: Output directory path for separate files
+            message_types: List of message types to include
+            type_buffer_size: Number of messages buffered per message type
+            max_open_files: Maximum number of CSV files kept open at once
+            output_format: Output file format, one of OUTPUT_FORMATS
+            summary: Summary updated with the converted messages
+            parse_options: Keyword arguments of BinFileParser.parse_messages
+            compress: Tuple of (compression, compression level) of CSV output
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            output_dir = output_base
+            if not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+            
+            with self._stage('formats'):
+                formats = self.parser.get_message_formats(input_path)
+            formats = self._project_formats(formats, parse_options)
+            summary = summary or ConversionSummary(input_path, output_format)
+            
+            with self._stage('write'), separate_writer(output_format, output_dir, formats, type_buffer_size,
+                                                       max_open_files, compression=compress[0],
+                                                       compress_level=compress[1],
+                                                       float_precision=self.float_precision) as writer:
+                for message in self._track(self.parser.parse_messages(input_path, message_types,
+                                                                      **(parse_options or {}))):
+                    writer.write(message)
+                    summary.update(message)
+            
+            if not writer.counts:
+                self.logger.warning(f"No messages found in {input_path}")
+                return False
+            
+            for msg_type, count in writer.counts.items():
+                summary.add_output(writer.path(msg_type))
+                self.logger.info(f"Saved {count} {msg_type} messages to {writer.path(msg_type)}")
+            
+            self.logger.info(f"Successfully converted {input_path} to {len(writer.counts)} separate "
+                             f"{FORMAT_NAMES[output_format]} files in {output_dir}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error in streaming separate files conversion: {e}")
+            return False
+    
+    def _convert_parallel(self, input_path: str, output_path: str,
+                          message_types: Optional[List[str]], separate_by_type: bool,
+                          decode_jobs: int, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          type_buffer_size: int = DEFAULT_TYPE_BUFFER_SIZE,
+                          max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+                          output_format: str = 'csv',
+                          summary: Optional[ConversionSummary] = None,
+                          parse_options: Optional[Dict[str, Any]] = None,
+                          compress: Tuple[Optional[str], Optional[int]] = (None, None)) -> bool:
+        """
+        Convert one binary log by decoding byte ranges in parallel processes.
+        
+        The log is split into ranges that start at record boundaries. Each
+        worker decodes its range with the NumPy decoder into part files, and
+        the parts are joined in file order. The output has the same layout as
+        a streaming conversion. If the ranges do not line up with the record
+        sequence of the whole log, the file is converted sequentially.
+        
+        Args:
+            input_path: Path to input .bin file
+            output_path: Path to output file, or directory for separate files
+            message_types: List of message types to include
+            separate_by_type: If True, create separate files for each message type
+            decode_jobs: Number of worker processes
+            chunk_size: Number of messages written per chunk
+            type_buffer_size: Number of messages buffered per message type
+            max_open_files: Maximum number of CSV files kept open per worker
+            output_format: Output file format, one of OUTPUT_FORMATS
+            summary: Summary updated with the converted messages
+            parse_options: Keyword arguments of BinFileParser.parse_messages
+            compress: Tuple of (compression, compression level) of CSV output;
+                the parts are not compressed, the joined outputs are
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        parse_options = parse_options or {}
+        summary = summary or ConversionSummary(input_path, output_format)
+        sequential_args = (input_path, output_path, message_types, separate_by_type, chunk_size,
+                           type_buffer_size, max_open_files, output_format, summary, parse_options,
+                           compress)
+        if parse_options.get('rates'):
+            # Buckets of rate-limited types can straddle the range boundaries
+            self.logger.info(f"Rate limits span the whole log, converting {input_path} sequentially")
+            return self._convert_sequential_streaming(*sequential_args)
+        if input_compression(input_path) is not None:
+            self.logger.info(f"{input_path} is decompressed as one stream, converting sequentially")
+            return self._convert_sequential_streaming(*sequential_args)
+        
+        with self._stage('formats'), self.parser.open_log(input_path) as log:
+            index = self.parser.get_index(input_path, log)
+            formats = log.formats
+            clock = (index.timebase, index.start_timestamp) if index is not None else log.clock_base()
+            start, stop = 0, log.size
+            if parse_options.get('time_window') is not None:
+                start, stop = log.window_offsets(*parse_options['time_window'], index=index)
+                stop = log.size if stop is None else stop
+            parts = min(decode_jobs, max((stop - start) // MIN_RANGE_SIZE, 1))
+            ranges = log.split_ranges(parts, start, stop)
+        
+        if len(ranges) < 2:
+            self.logger.info(f"{input_path} is too small to split, converting sequentially")
+            return self._convert_sequential_streaming(*sequential_args)
+        
+        selected = sorted((fmt for fmt in formats.values()
+                           if message_types is None or fmt.name in message_types),
+                          key=lambda fmt: fmt.offset)
+        formats_by_type = self._project_formats({fmt.name: fmt for fmt in selected}, parse_options)
+        selected = list(formats_by_type.values())
+        if separate_by_type:
+            output_dir = output_path
+        else:
+            output_dir, output_file = self._single_output_file(input_path, output_path, output_format,
+                                                               compress[0])
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        
+        self.logger.info(f"Decoding {input_path} in {len(ranges)} ranges with {decode_jobs} worker processes")
+        parts_dir = tempfile.mkdtemp(prefix='.bin2csv-', dir=output_dir or '.')
+        try:
+            part_paths = [os.path.join(parts_dir, f"part{number:05d}") for number in range(len(ranges))]
+            if not separate_by_type:
+                part_paths = [part + OUTPUT_EXTENSIONS[output_format] for part in part_paths]
+            writer_args = (output_format, formats_by_type, chunk_size, type_buffer_size, max_open_files,
+                           self.float_precision)
+            
+            futures = []
+            # Workers decode and write their part files; joining the parts is the write stage
+            with self._stage('decode'), WorkerPool(min(decode_jobs, len(ranges)), self.log_level) as executor:
+                for (start, stop), part_path in zip(ranges, part_paths):
+                    futures.append(executor.submit(
+                        _convert_range_in_worker, input_path, formats, start, stop, clock,
+                        message_types, part_path, separate_by_type, writer_args, parse_options))
+                results = []
+                for future, (_, stop) in zip(futures, ranges):
+                    results.append(future.result())
+                    if self.progress is not None:
+                        self.progress.update(stop, self.progress.messages + results[-1][0].total_messages)
+            
+            # Each range must end exactly where the next one was resynchronised
+            for (_, next_offset), (start, _) in zip(results, ranges[1:]):
+                if next_offset != start:
+                    self.logger.warning(f"Range boundaries of {input_path} do not line up with its "
+                                        f"records, converting sequentially")
+                    return self._convert_sequential_streaming(*sequential_args)
+            
+            for part_summary, _ in results:
+                summary.merge(part_summary)
+            counts = summary.message_counts
+            if not counts:
+                self.logger.warning(f"No messages found in {input_path}")
+                return False
+            
+            extension = OUTPUT_EXTENSIONS[output_format]
+            if separate_by_type:
+                output_type_extension = output_extension(output_format, compress[0])
+                for msg_type in counts:
+                    output_file = os.path.join(output_dir, f"{msg_type}{output_type_extension}")
+                    type_parts = [os.path.join(part, f"{msg_type}{extension}") for part in part_paths]
+                    with self._stage('write'):
+                        _join_parts(table_writer(output_format, output_file, [formats_by_type[msg_type]],
+                                                 chunk_size, key=msg_type, compression=compress[0],
+                                                 compress_level=compress[1]), type_parts)
+                    summary.add_output(output_file)
+                    self.logger.info(f"Saved {counts[msg_type]} {msg_type} messages to {output_file}")
+                self.logger.info(f"Successfully converted {input_path} to {len(counts)} separate "
+                                 f"{FORMAT_NAMES[output_format]} files in {output_dir}")
+            else:
+                with self._stage('write'):
+                    _join_parts(table_writer(output_format, output_file, selected, chunk_size,
+                                             compression=compress[0], compress_level=compress[1]),
+                                part_paths)
+                summary.add_output(output_file)
+                self.logger.info(f"Successfully saved {sum(counts.values())} messages to {output_file}")
+            return True
+            
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+    
+    def _converted_formats(self, input_path: str, summary: ConversionSummary,
+                           parse_options: Optional[Dict[str, Any]]) -> Dict[str, LogFormat]:
+        """
+        Get the formats of the message types converted, to type their columns.
+        
+        Args:
+            input_path: Path to input .bin file
+            summary: Summary of the converted messages
+            parse_options: Keyword arguments of BinFileParser.parse_messages
+            
+        Returns:
+            Dictionary mapping message type to its format or projected format
+        """
+        with self._stage('formats'):
+            formats = self.parser.get_message_formats(input_path)
+        formats = {name: fmt for name, fmt in formats.items() if name in summary.message_counts}
+        return self._project_formats(formats, parse_options)
+    
+    def _project_formats(self, formats: Dict[str, LogFormat],
+                         parse_options: Optional[Dict[str, Any]]) -> Dict[str, LogFormat]:
+        """
+        Restrict the formats given to the writers to the selected fields.
+        
+        Args:
+            formats: Dictionary mapping message type to its format
+            parse_options: Keyword arguments of BinFileParser.parse_messages
+            
+        Returns:
+            Dictionary mapping message type to its format or projected format
+        """
+        fields = (parse_options or {}).get('fields') or {}
+        projected = dict(formats)
+        for msg_type, names in fields.items():
+            fmt = formats.get(msg_type)
+            if fmt is None:
+                continue
+            unknown = [name for name in names if name not in fmt.column_index]
+            if unknown:
+                self.logger.warning(f"Message type {msg_type} has no field {', '.join(unknown)}")
+            projected[msg_type] = fmt.project(names)
+        return projected
+    
+    def _convert_sequential_streaming(self, input_path: str, output_path: str,
+                                      message_types: Optional[List[str]], separate_by_type: bool,
+                                      chunk_size: int, type_buffer_size: int,
+                                      max_open_files: int, output_format: str,
+                                      summary: ConversionSummary,
+                                      parse_options: Dict[str, Any],
+                                      compress: Tuple[Optional[str], Optional[int]] = (None, None)) -> bool:
+        """Streaming conversion in this process, used when a file is not split."""
+        if separate_by_type:
+            return self._convert_separate_files_streaming(input_path, output_path, message_types,
+                                                          type_buffer_size, max_open_files,
+                                                          output_format, summary, parse_options, compress)
+        return self._convert_single_file_streaming(input_path, output_path, message_types,
+                                                   chunk_size, output_format, summary, parse_options,
+                                                   compress)
+    
+    def follow(self, input_path: str, output_path: str,
+               message_types: Optional[List[str]] = None,
+               separate_by_type: bool = False,
+               poll_interval: float = DEFAULT_FOLLOW_INTERVAL,
+               idle_timeout: Optional[float] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE,
+               type_buffer_size: int = DEFAULT_TYPE_BUFFER_SIZE,
+               max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+               start: Optional[float] = None,
+               end: Optional[float] = None) -> bool:
+        """
+        Convert a log that is still being written, appending new messages to CSV.
+        
+        The log is checked every poll_interval seconds and only the complete
+        records written since the last check are decoded (see
+        BinFileParser.follow_messages). The position in the log, its FMT
+        table and the output columns are saved in a follow state next to the
+        output after every pass (<name>.follow.json, or follow.json in the
+        output directory of separate files), so a later call with the same
+        paths resumes where this one stopped instead of starting over.
+        
+        Timestamps use the clock base found on the first pass; if the log has
+        no GPS fix yet, they stay relative to boot for the whole output.
+        
+        Args:
+            input_path: Path to input .bin file
+            output_path: Path to output .csv file, or output directory with
+                separate_by_type
+            message_types: List of message types to include (None for all),
+                or 'TYPE.Field' entries as in convert()
+            separate_by_type: If True, append to one CSV file per message type
+            poll_interval: Seconds between two checks of the log
+            idle_timeout: Return once the log has not grown for this many
+                seconds (None to follow until interrupted, 0 to return after
+                converting what is there now)
+            chunk_size: Number of messages written per chunk to a single file
+            type_buffer_size: Number of messages buffered per message type
+            max_open_files: Maximum number of separate files kept open at once
+            start: Seconds since boot of the first message to convert
+            end: Seconds since boot of the last message to convert
+            
+        Returns:
+            True if following ended without error, False otherwise
+        """
+        try:
+            self.last_summary = None
+            if input_compression(input_path) is not None:
+                self.logger.error(f"Cannot follow a compressed log: {input_path}")
+                return False
+            parse_options = {}
+            message_types, fields = split_fields(message_types)
+            if fields:
+                parse_options['fields'] = fields
+            if start is not None or end is not None:
+                parse_options['time_window'] = time_window(start, end)
+            
+            if separate_by_type:
+                output_file = output_path
+                os.makedirs(output_path, exist_ok=True)
+            else:
+                output_dir, output_file = self._single_output_file(input_path, output_path)
+                if output_dir and not os.path.exists(output_dir):
+                    os.makedirs(output_dir)
+            state_path = follow_state_path(output_file, separate_by_type)
+            
+            state = FollowState.load(state_path, input_path)
+            if state is not None:
+                state.truncate_outputs()
+                self.logger.info(f"Resuming {input_path} at byte {state.offset}")
+            else:
+                state = FollowState(input_path)
+            self.logger.info(f"Following {input_path} into {output_file}")
+            
+            summary = ConversionSummary(input_path)
+            last_size = None
+            idle_since = time.monotonic()
+            try:
+                while True:
+                    size = os.path.getsize(input_path)
+                    if size != last_size:
+                        last_size = size
+                        idle_since = time.monotonic()
+                        count = self._follow_pass(input_path, output_file, state, state_path,
+                                                  message_types, separate_by_type, chunk_size,
+                                                  type_buffer_size, max_open_files, summary,
+                                                  parse_options)
+                        state.save(state_path)
+                        if count:
+                            self.logger.info(f"Appended {count} messages from {input_path} "
+                                             f"(byte {state.offset} of {size})")
+                    elif idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                        break
+                    time.sleep(poll_interval)
+            except KeyboardInterrupt:
+                self.logger.info(f"Stopped following {input_path} at byte {state.offset}")
+            
+            self.last_summary = summary
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error following {input_path}: {e}")
+            return False
+    
+    def _follow_pass(self, input_path: str, output_file: str, state: FollowState, state_path: str,
+                     message_types: Optional[List[str]], separate_by_type: bool,
+                     chunk_size: int, type_buffer_size: int, max_open_files: int,
+                     summary: ConversionSummary, parse_options: Dict[str, Any]) -> int:
+        """
+        Append the messages written to a followed log since the last pass.
+        
+        The columns of a single output file are the union of the formats
+        defined so far. When later FMT records add columns, the file is
+        rewritten with the wider header before appending, so it matches a
+        conversion of the whole log.
+        
+        Returns:
+            Number of messages appended
+        """
+        append = bool(state.outputs)
+        writer = None
+        count = 0
+        try:
+            for message in self.parser.follow_messages(input_path, state, message_types, **parse_options):
+                if writer is None:
+                    formats = {fmt.name: fmt for fmt in sorted(state.formats.values(), key=lambda fmt: fmt.offset)}
+                    if message_types is not None:
+                        formats = {name: fmt for name, fmt in formats.items() if name in message_types}
+                    formats = self._project_formats(formats, parse_options)
+                    if separate_by_type:
+                        columns_by_type = {name: type_columns(fmt) for name, fmt in formats.items()}
+                        dtypes_by_type = {name: column_dtypes([fmt]) for name, fmt in formats.items()}
+                        writer = SeparateCsvWriter(output_file, columns_by_type, type_buffer_size,
+                                                   max_open_files, append=append,
+                                                   dtypes_by_type=dtypes_by_type)
+                    else:
+                        columns, float_columns = column_union(formats.values())
+                        if append and (columns, float_columns) != (state.columns, state.float_columns):
+                            self.logger.info(f"New message formats add columns, rewriting {output_file}")
+                            widen_csv(output_file, columns,
+                                      [column for column in float_columns if column not in state.float_columns],
+                                      chunk_size)
+                            state.record_outputs([output_file])
+                        state.columns, state.float_columns = columns, float_columns
+                        state.save(state_path)
+                        writer = CsvWriter(output_file, state.columns, state.float_columns, chunk_size,
+                                           append=append, dtypes=column_dtypes(formats.values()))
+                writer.write(message)
+                summary.update(message)
+                count += 1
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        if separate_by_type and writer is not None:
+            state.record_outputs([writer.path(msg_type) for msg_type in writer.counts])
+        elif writer is not None:
+            state.record_outputs([output_file])
+        return count
+    
     def get_available_message_types(self, input_path: str) -> List[str]:
         """
         Get list of available message types in the binary log file.
@@ -175,6 +992,23 @@ class BinToCsvConverter:
             self.logger.error(f"Error getting message types: {e}")
             return []
     
+    def get_message_counts(self, input_path: str) -> Dict[str, int]:
+        """
+        Get the number of messages of each type in the binary log file.
+        
+        Args:
+            input_path: Path to input .bin file
+            
+        Returns:
+            Dictionary mapping message type to message count, sorted by type
+        """
+        try:
+            counts = self.parser.get_message_counts(input_path)
+            return {msg_type: counts[msg_type] for msg_type in sorted(counts)}
+        except Exception as e:
+            self.logger.error(f"Error getting message counts: {e}")
+            return {}
+    
     def get_file_summary(self, input_path: str) -> Dict[str, Any]:
         """
         Get summary information about the binary log file.
@@ -216,40 +1050,451 @@ class BinToCsvConverter:
     
     def batch_convert(self, input_files: List[str], output_dir: str, 
                      message_types: Optional[List[str]] = None,
-                     separate_by_type: bool = False) -> Dict[str, bool]:
+                     separate_by_type: bool = False,
+                     stream: bool = False,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     type_buffer_size: int = DEFAULT_TYPE_BUFFER_SIZE,
+                     max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+                     jobs: int = 1,
+                     decode_jobs: int = 1,
+                     output_format: str = 'csv',
+                     manifest: bool = False,
+                     start: Optional[float] = None,
+                     end: Optional[float] = None,
+                     rates: Optional[Dict[str, float]] = None,
+                     aggregate: Optional[str] = None,
+                     aligned: bool = False,
+                     align_rate: Optional[float] = None,
+                     align_to: Optional[str] = None,
+                     align_direction: str = 'nearest',
+                     align_tolerance: Optional[float] = None,
+                     cache_dir: Optional[str] = None,
+                     cache_verify: bool = False,
+                     cache_max_age: Optional[float] = None,
+                     cache_max_size: Optional[int] = None,
+                     compression: Optional[str] = None,
+                     compress_level: Optional[int] = None,
+                     float_precision: Optional[Dict[str, int]] = None,
+                     progress: Optional[Callable[[Progress], None]] = None) -> Dict[str, bool]:
         """
         Convert multiple binary log files to CSV format.
         
         Args:
-            input_files: List of input .bin file paths
+            input_files: List of input .bin file paths, plain or compressed
             output_dir: Directory for output CSV files
             message_types: List of message types to include
             separate_by_type: If True, create separate CSV files for each message type
+            stream: If True, write messages in chunks as they are parsed
+            chunk_size: Number of messages written per chunk when streaming
+            type_buffer_size: Number of messages buffered per message type when
+                streaming separate files
+            max_open_files: Maximum number of files kept open when streaming
+                separate files
+            jobs: Number of files converted in parallel worker processes
+                (1 converts in this process, 0 uses one worker per CPU)
+            decode_jobs: Number of worker processes decoding each file in byte
+                ranges; only used when files are converted one at a time
+            output_format: Output file format, one of OUTPUT_FORMATS
+            manifest: If True, save a JSON manifest next to each output
+            start: Seconds since boot of the first message to convert
+            end: Seconds since boot of the last message to convert
+            rates: Dictionary mapping message type to its target rate in Hz
+            aggregate: 'mean', 'min' or 'max' to aggregate rate-limited types
+            aligned: If True, write one time-aligned wide table per file
+            align_rate: Samples per second of the aligned time base
+            align_to: Message type whose timestamps are the aligned time base
+            align_direction: 'nearest', 'backward' or 'forward' aligned matches
+            align_tolerance: Largest distance in seconds of an aligned match
+            cache_dir: Directory of a conversion cache (None disables it). Files
+                whose content was already converted with the same options get
+                their outputs hard-linked from the cache instead
+            cache_verify: If True, hash every input again instead of trusting
+                an unchanged size and modification time
+            cache_max_age: Seconds after their last use when cache entries are evicted
+            cache_max_size: Largest total size in bytes of the cached outputs;
+                least recently used entries are evicted beyond it
+            compression: 'gzip', 'zstd' or 'xz' to compress CSV outputs as they
+                are written (flight.csv.gz)
+            compress_level: Compression level (default: DEFAULT_COMPRESS_LEVELS)
+            float_precision: Dictionary mapping 'TYPE.Field', 'Field' or '*' to
+                the number of decimals CSV float columns are rounded to
+            progress: Function called with a Progress report of the whole batch
+                (bytes of all inputs, files done, messages, ETA). Files converted
+                in this process report as they are parsed; files converted in
+                worker processes or restored from the cache when they are done
             
         Returns:
-            Dictionary mapping input file to conversion success status
+            Dictionary mapping input file to conversion success status. If
+            the converter collects statistics, last_stats holds those of the
+            files converted (not restored from the cache) added together
         """
         results = {}
+        batch_stats = ConversionStats() if self.collect_stats else None
+        tracker = None
+        sizes = {}
+        if progress is not None:
+            sizes = {input_file: os.path.getsize(input_file) if os.path.isfile(input_file) else 0
+                     for input_file in input_files}
+            tracker = ProgressTracker(progress, sum(sizes.values()), files_total=len(input_files))
         
         # Ensure output directory exists
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
-        for input_file in input_files:
-            try:
-                # Generate output filename
-                base_name = os.path.splitext(os.path.basename(input_file))[0]
-                output_path = os.path.join(output_dir, f"{base_name}.csv")
-                
-                # Convert file
-                success = self.convert(input_file, output_path, message_types, separate_by_type)
-                results[input_file] = success
+        options = {
+            'message_types': message_types,
+            'separate_by_type': separate_by_type,
+            'stream': stream,
+            'chunk_size': chunk_size,
+            'type_buffer_size': type_buffer_size,
+            'max_open_files': max_open_files,
+            'output_format': output_format,
+            'manifest': manifest,
+            'start': start,
+            'end': end,
+            'rates': rates,
+            'aggregate': aggregate,
+            'aligned': aligned,
+            'align_rate': align_rate,
+            'align_to': align_to,
+            'align_direction': align_direction,
+            'align_tolerance': align_tolerance,
+            'compression': compression,
+            'compress_level': compress_level,
+            'float_precision': float_precision,
+        }
+        
+        cache = None
+        cache_keys = {}
+        pending_files = input_files
+        if cache_dir is not None:
+            cache = ConversionCache(cache_dir, cache_verify)
+            results, cache_keys = self._restore_cached(cache, input_files, output_dir, options)
+            pending_files = [input_file for input_file in input_files if input_file not in results]
+            if tracker is not None:
+                for input_file in results:
+                    tracker.file_done(input_file, tracker.bytes_done + sizes[input_file])
+        
+        jobs = min(resolve_jobs(jobs), max(len(pending_files), 1))
+        
+        if jobs > 1:
+            # Worker processes cannot start pools of their own
+            results.update(self._batch_convert_parallel(pending_files, output_dir,
+                                                        dict(options, decode_jobs=1), jobs, batch_stats,
+                                                        tracker, sizes))
+        else:
+            done_bytes = tracker.bytes_done if tracker is not None else 0
+            for input_file in pending_files:
+                try:
+                    # Generate output filename
+                    output_path = self._batch_output_path(input_file, output_dir, output_format, compression)
+                    
+                    # Convert file
+                    file_progress = None
+                    if tracker is not None:
+                        file_progress = tracker.file_callback(input_file, done_bytes)
+                    success = self.convert(input_file, output_path, decode_jobs=decode_jobs,
+                                           progress=file_progress, **options)
+                    results[input_file] = success
+                    if batch_stats is not None and self.last_stats is not None:
+                        batch_stats.merge(self.last_stats)
+                    
+                except Exception as e:
+                    self.logger.error(f"Error processing {input_file}: {e}")
+                    results[input_file] = False
                 
-            except Exception as e:
-                self.logger.error(f"Error processing {input_file}: {e}")
-                results[input_file] = False
+                if tracker is not None:
+                    done_bytes += sizes[input_file]
+                    messages = self.last_summary.total_messages if results[input_file] else 0
+                    tracker.file_done(input_file, done_bytes, messages)
+        
+        if cache is not None:
+            self._store_cached(cache, cache_keys, results, output_dir, options)
+            evicted = cache.evict(cache_max_age, cache_max_size)
+            try:
+                cache.save()
+            except OSError as e:
+                self.logger.warning(f"Could not write cache manifest in {cache_dir}: {e}")
+            self.logger.info(f"Conversion cache: {cache.hits} reused, {cache.misses} converted, "
+                             f"{evicted} evicted, {cache.size} bytes cached")
         
+        results = {input_file: results[input_file] for input_file in input_files}
         successful = sum(1 for success in results.values() if success)
         self.logger.info(f"Batch conversion complete: {successful}/{len(input_files)} files successful")
+        if batch_stats is not None:
+            batch_stats.finish()
+            self.last_stats = batch_stats
+        if tracker is not None:
+            tracker.finish()
         
         return results
+    
+    def _restore_cached(self, cache: ConversionCache, input_files: List[str], output_dir: str,
+                        options: Dict[str, Any]) -> Tuple[Dict[str, bool], Dict[str, str]]:
+        """
+        Place the cached outputs of the files of a batch that were already converted.
+        
+        Outputs of the other files that are hard-linked to the cache are
+        removed, so converting them again cannot change a cached copy.
+        
+        Args:
+            cache: Conversion cache
+            input_files: List of input .bin file paths
+            output_dir: Directory for output files
+            options: Keyword arguments of convert()
+            
+        Returns:
+            Tuple of (results of the restored files, cache keys of the files to convert)
+        """
+        key_options = {name: value for name, value in options.items() if name not in CACHE_IGNORED_OPTIONS}
+        key_options['engine'] = self.parser.engine
+        results = {}
+        keys = {}
+        for input_file in input_files:
+            output_path = self._batch_output_path(input_file, output_dir, options['output_format'],
+                                                  options['compression'])
+            try:
+                key = cache.key(input_file, key_options)
+                if cache.restore(key, output_path, input_file, options['separate_by_type'],
+                                 options['manifest']):
+                    self.logger.info(f"Reused cached conversion of {input_file} for {output_path}")
+                    results[input_file] = True
+                    continue
+                release(output_path)
+                keys[input_file] = key
+            except OSError as e:
+                self.logger.warning(f"Conversion cache not used for {input_file}: {e}")
+        return results, keys
+    
+    def _store_cached(self, cache: ConversionCache, keys: Dict[str, str], results: Dict[str, bool],
+                      output_dir: str, options: Dict[str, Any]):
+        """Add the outputs of the successfully converted files of a batch to the cache."""
+        separate = options['separate_by_type']
+        for input_file, key in keys.items():
+            if not results.get(input_file):
+                continue
+            output_path = self._batch_output_path(input_file, output_dir, options['output_format'],
+                                                  options['compression'])
+            summary = None
+            if options['manifest']:
+                try:
+                    with open(manifest_path(output_path, separate)) as f:
+                        summary = json.load(f)
+                except (OSError, ValueError):
+                    pass
+            try:
+                cache.store(key, output_path, separate, summary)
+            except OSError as e:
+                self.logger.warning(f"Could not cache the conversion of {input_file}: {e}")
+
+    def _batch_convert_parallel(self, input_files: List[str], output_dir: str,
+                                options: Dict[str, Any], jobs: int,
+                                stats: Optional[ConversionStats] = None,
+                                tracker: Optional[ProgressTracker] = None,
+                                sizes: Optional[Dict[str, int]] = None) -> Dict[str, bool]:
+        """
+        Convert files in a pool of worker processes.
+        
+        Each worker builds its own converter with this converter's settings.
+        Worker log records are passed back to this process and prefixed with
+        the input file name.
+        
+        Args:
+            input_files: List of input .bin file paths
+            output_dir: Directory for output CSV files
+            options: Keyword arguments of convert()
+            jobs: Number of worker processes
+            stats: Statistics to which the statistics of each worker conversion are added
+            tracker: Progress of the batch, updated as each file is done
+            sizes: Dictionary mapping input file to its size, used with tracker
+            
+        Returns:
+            Dictionary mapping input file to conversion success status
+        """
+        self.logger.info(f"Converting {len(input_files)} files with {jobs} worker processes")
+        
+        futures = {}
+        with self.worker_pool(jobs) as executor:
+            for input_file in input_files:
+                output_path = self._batch_output_path(input_file, output_dir, options['output_format'],
+                                                      options['compression'])
+                if stats is not None:
+                    futures[input_file] = executor.submit(_convert_with_stats_in_worker, input_file,
+                                                          output_path, options)
+                else:
+                    futures[input_file] = self.submit_convert(executor, input_file, output_path, options)
+            
+            results = {}
+            files = {future: input_file for input_file, future in futures.items()}
+            for future in as_completed(files):
+                input_file = files[future]
+                try:
+                    if stats is not None:
+                        results[input_file], file_stats = future.result()
+                        if file_stats is not None:
+                            stats.merge(file_stats)
+                    else:
+                        results[input_file] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error processing {input_file}: {e}")
+                    results[input_file] = False
+                if tracker is not None:
+                    tracker.file_done(input_file, tracker.bytes_done + sizes[input_file])
+        
+        return results
+    
+    def worker_pool(self, jobs: int) -> WorkerPool:
+        """
+        Create a pool of worker processes for submit_convert.
+        
+        Each worker builds its own converter with this converter's settings
+        and logs through this process.
+        
+        Args:
+            jobs: Number of worker processes
+            
+        Returns:
+            WorkerPool; entering it gives the executor
+        """
+        settings = (self.log_level, self.parser.engine, self.parser.use_index, self.collect_stats)
+        return WorkerPool(jobs, self.log_level, _init_batch_worker, settings)
+    
+    def submit_convert(self, executor: Executor, input_file: str, output_path: str,
+                       options: Dict[str, Any]) -> Future:
+        """
+        Convert one file in a worker process of a pool from worker_pool.
+        
+        Args:
+            executor: Executor of the pool
+            input_file: Path to input .bin file
+            output_path: Output path passed to convert()
+            options: Keyword arguments of convert()
+            
+        Returns:
+            Future of the result of convert()
+        """
+        return executor.submit(_convert_in_worker, input_file, output_path, options)
+    
+    def _batch_output_path(self, input_file: str, output_dir: str, output_format: str = 'csv',
+                           compression: Optional[str] = None) -> str:
+        """Output path of one file of a batch conversion."""
+        base_name = log_stem(input_file)
+        return os.path.join(output_dir, f"{base_name}{output_extension(output_format, compression)}")
+
+
+def time_window(start: Optional[float], end: Optional[float]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Convert a window in seconds since boot to TimeUS bounds.
+    
+    Args:
+        start: First second of the window (None for the start of the log)
+        end: Last second of the window (None for the end of the log)
+        
+    Returns:
+        Tuple of (first, last) TimeUS
+    """
+    return (round(start * 1000000) if start is not None else None,
+            round(end * 1000000) if end is not None else None)
+
+
+def split_fields(message_types: Optional[List[str]]) -> Tuple[Optional[List[str]], Dict[str, List[str]]]:
+    """
+    Split 'TYPE.Field' entries of a message type list into a field selection.
+    
+    A plain 'TYPE' entry selects all fields of the type, even if fields of
+    it are also listed.
+    
+    Args:
+        message_types: Message types and 'TYPE.Field' entries (None for all types)
+        
+    Returns:
+        Tuple of (message types, dictionary mapping message type to its
+        selected fields)
+    """
+    if message_types is None:
+        return None, {}
+    types = []
+    fields = {}
+    whole = set()
+    for entry in message_types:
+        msg_type, _, field = entry.partition('.')
+        if msg_type not in types:
+            types.append(msg_type)
+        if not field:
+            whole.add(msg_type)
+        elif field not in fields.setdefault(msg_type, []):
+            fields[msg_type].append(field)
+    return types, {msg_type: names for msg_type, names in fields.items() if msg_type not in whole}
+
+
+def _join_parts(writer, part_paths: List[str]):
+    """Append the part files that exist to a new output file in order."""
+    with writer:
+        for part_path in part_paths:
+            if os.path.exists(part_path):
+                writer.append_part(part_path)
+
+
+def _convert_range_in_worker(input_path: str, formats: dict, start: int, stop: int, clock: tuple,
+                             message_types: Optional[List[str]], part_path: str,
+                             separate_by_type: bool, writer_args: tuple,
+                             parse_options: Dict[str, Any]):
+    """
+    Decode one byte range of a log into part files.
+    
+    CSV parts are written without a header row. parse_options are passed to
+    DataFlashLog.iter_messages.
+    
+    Returns:
+        Tuple of (ConversionSummary of the range, offset of the first record
+        after the range or None at the end of the log)
+    """
+    set_worker_task(f"{os.path.basename(input_path)}@{start}")
+    try:
+        with DataFlashLog(input_path, formats=formats) as log:
+            (output_format, formats_by_type, chunk_size, type_buffer_size, max_open_files,
+             float_precision) = writer_args
+            if separate_by_type:
+                os.makedirs(part_path)
+                writer = separate_writer(output_format, part_path, formats_by_type, type_buffer_size,
+                                         max_open_files, header=False, float_precision=float_precision)
+            else:
+                writer = table_writer(output_format, part_path, formats_by_type.values(), chunk_size,
+                                      header=False, float_precision=float_precision)
+            summary = ConversionSummary(input_path, output_format)
+            with writer:
+                for message in log.iter_messages(message_types, start=start, stop=stop, clock=clock,
+                                                 **parse_options):
+                    writer.write(message)
+                    summary.update(message)
+            return summary, log.next_offset
+    finally:
+        set_worker_task(None)
+
+
+# Converter of a batch worker process, created once per worker
+_worker_converter = None
+
+
+def _init_batch_worker(log_level: int, engine: str, use_index: bool, collect_stats: bool = False):
+    """Create the converter used by a batch worker process."""
+    global _worker_converter
+    _worker_converter = BinToCsvConverter(log_level, engine, use_index, collect_stats)
+    for logger in (_worker_converter.logger, _worker_converter.parser.logger):
+        logger.handlers = []
+
+
+def _convert_in_worker(input_file: str, output_path: str, options: Dict[str, Any]) -> bool:
+    """Convert one file of a batch in a worker process."""
+    set_worker_task(os.path.basename(input_file))
+    try:
+        return _worker_converter.convert(input_file, output_path, **options)
+    finally:
+        set_worker_task(None)
+
+
+def _convert_with_stats_in_worker(input_file: str, output_path: str,
+                                  options: Dict[str, Any]) -> Tuple[bool, Optional[ConversionStats]]:
+    """Convert one file of a batch in a worker process, returning its statistics too."""
+    success = _convert_in_worker(input_file, output_path, options)
+    return success, _worker_converter.last_stats
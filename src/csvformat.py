@@ -0,0 +1,162 @@
+"""
+Bulk CSV formatting of typed message frames.
+
+write_csv writes a DataFrame built by typed_frame as CSV text with the same
+bytes as DataFrame.to_csv(index=False), but faster: each column is turned
+into Python values in one call (NumPy's tolist for numeric columns), NaN
+cells are found with a vectorised mask, and the rows of a whole block are
+formatted by the csv module's C writer into one string that is written to
+the output at once. Numbers are formatted by the csv writer itself, which
+prints floats with repr, as to_csv does for float64 columns; float32
+columns are printed as the float64 of their values, the text pymavlink's
+float values give.
+
+Float columns can be rounded to a number of decimals first (see
+field_precision), with NumPy's round on the whole column, which releases
+the GIL. The rounded values are still printed with repr, so 0.7 rounded
+to 3 decimals is written 0.7 and float32 fields lose the float64 digits
+they do not have (0.10000000149011612 becomes 0.1).
+"""
+
+import io
+import os
+import csv
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+
+
+# Number of cells formatted and written per block
+CSV_BLOCK_CELLS = 500000
+
+# Key of float_precision applying to every float column
+ALL_FLOAT_FIELDS = '*'
+
+
+def check_float_precision(float_precision: Optional[Dict[str, int]]):
+    """
+    Check float precisions before a conversion starts.
+
+    Args:
+        float_precision: Dictionary mapping 'TYPE.Field', 'Field' or '*' to
+            the number of decimals of those float columns
+
+    Raises:
+        ValueError: If a key is empty or a number of decimals is not a
+            non-negative integer
+    """
+    for key, digits in (float_precision or {}).items():
+        if not key or isinstance(digits, bool) or not isinstance(digits, (int, np.integer)) or digits < 0:
+            raise ValueError(f"Float precision must map fields to a number of decimals >= 0, "
+                             f"got {key!r}: {digits!r}")
+
+
+def field_precision(float_precision: Optional[Dict[str, int]], column: str,
+                    message_type: Optional[str] = None) -> Optional[int]:
+    """
+    Number of decimals of a float column.
+
+    The most specific key wins: 'TYPE.Field', then 'Field', then '*'. A
+    column of an aligned table is named 'TYPE.Field' or 'TYPE[instance].Field'
+    and also matches the 'TYPE.Field' and 'Field' keys.
+
+    Args:
+        float_precision: Dictionary mapping 'TYPE.Field', 'Field' or '*' to
+            a number of decimals
+        column: Column name
+        message_type: Message type of the rows, None for several types
+
+    Returns:
+        Number of decimals, or None to print the values unrounded
+    """
+    if not float_precision:
+        return None
+    keys = [column]
+    if message_type is not None:
+        keys.insert(0, f"{message_type}.{column}")
+    elif '.' in column:
+        column_type, field = column.rsplit('.', 1)
+        keys += [f"{column_type.split('[', 1)[0]}.{field}", field]
+    keys.append(ALL_FLOAT_FIELDS)
+    for key in keys:
+        if key in float_precision:
+            return float_precision[key]
+    return None
+
+
+def _float_cells(values: np.ndarray, digits: Optional[int]) -> List[Any]:
+    """Cells of a float column: floats rounded to digits decimals, None for NaN."""
+    if digits is not None:
+        # Adding 0.0 turns the -0.0 of small negative values into 0.0
+        values = np.round(values.astype(np.float64), digits) + 0.0
+    cells = values.tolist()
+    for index in np.flatnonzero(np.isnan(values)).tolist():
+        cells[index] = None
+    return cells
+
+
+def _column_cells(df: pd.DataFrame, column: str, float_precision: Optional[Dict[str, int]],
+                  message_type: Optional[str]) -> List[Any]:
+    """Values of one column as written by the csv module, None for missing values."""
+    values = df[column].to_numpy()
+    if values.dtype.kind in 'iub':
+        return values.tolist()
+    if values.dtype.kind == 'f':
+        cells = _float_cells(values, field_precision(float_precision, column, message_type))
+        if message_type is None and float_precision and 'message_type' in df.columns:
+            # Rows of a table holding several types follow their own 'TYPE.Field' precision
+            row_types = None
+            for key, digits in float_precision.items():
+                msg_type, _, field = key.rpartition('.')
+                if not msg_type or field != column:
+                    continue
+                if row_types is None:
+                    row_types = df['message_type'].to_numpy()
+                rows = np.flatnonzero(row_types == msg_type)
+                for index, cell in zip(rows.tolist(), _float_cells(values[rows], digits)):
+                    cells[index] = cell
+        return cells
+    values = values.astype(object)
+    values[pd.isna(values)] = None
+    return values.tolist()
+
+
+def write_header(output, columns: List[str]):
+    """
+    Write the header row of a CSV table.
+
+    Args:
+        output: Text file the table is written to
+        columns: Column names
+    """
+    csv.writer(output, lineterminator=os.linesep).writerow(columns)
+
+
+def write_csv(output, df: pd.DataFrame, header: bool = True,
+              float_precision: Optional[Dict[str, int]] = None,
+              message_type: Optional[str] = None, block_cells: int = CSV_BLOCK_CELLS):
+    """
+    Write a DataFrame as CSV, a block of rows at a time.
+
+    With no float_precision the text is the same as that of
+    df.to_csv(output, index=False) with float32 columns cast to float64.
+
+    Args:
+        output: Text file the table is written to
+        df: Frame from typed_frame, or an aligned table
+        header: If True, write the header row first
+        float_precision: Dictionary mapping 'TYPE.Field', 'Field' or '*' to
+            the number of decimals of those float columns (see field_precision)
+        message_type: Message type of every row, used to find the
+            'TYPE.Field' precisions of a file of one message type
+        block_cells: Number of cells formatted and written at a time
+    """
+    if header:
+        write_header(output, list(df.columns))
+    block_rows = max(block_cells // max(len(df.columns), 1), 1)
+    for first in range(0, len(df), block_rows):
+        block = df.iloc[first:first + block_rows]
+        cells = [_column_cells(block, column, float_precision, message_type) for column in block.columns]
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator=os.linesep).writerows(zip(*cells))
+        output.write(buffer.getvalue())
@@ -0,0 +1,1395 @@
+"""
+Low-level DataFlash record decoding for ArduPilot log files.
+
+This module reads the FMT records of an ArduPilot binary log (.bin), builds one
+NumPy structured dtype per message type and decodes the records of each type in
+bulk with NumPy over a memory-mapped file. It backs the "numpy" engine of
+BinFileParser. Compressed logs are decoded from a sliding window over their
+decompressed stream instead (CompressedDataFlashLog).
+"""
+
+import os
+import mmap
+import array
+import numpy as np
+from enum import Enum
+from typing import Dict, List, Optional, Iterator, Tuple, Any, Iterable
+
+from .decimate import BucketAggregate, FIRST_VALUE_FIELDS
+from .align import instance_field
+from .compression import input_compression, open_input
+
+
+HEAD1 = 0xA3
+HEAD2 = 0x95
+HEADER_LENGTH = 3
+FMT_TYPE = 0x80
+FMT_LENGTH = 89
+
+# Bytes of the log scanned per step; bounds the size of the temporary arrays
+DEFAULT_WINDOW_SIZE = 8 * 1024 * 1024
+
+# Consecutive adjacent records required to accept a header when resynchronising
+RESYNC_RECORDS = 8
+RESYNC_SEARCH_SIZE = 64 * 1024
+
+# Messages yielded by iter_messages between two updates of DataFlashLog.position
+POSITION_STEP = 4096
+
+# Byte distance at which the binary search for a TimeUS stops narrowing
+SEEK_RESOLUTION = 64 * 1024
+
+# Bytes read from the start of a file to check its structure
+VALIDATION_READ_SIZE = 4096
+
+# DataFlash format character -> (NumPy dtype, multiplier applied on decode)
+FORMAT_TO_DTYPE = {
+    'a': (('<i2', (32,)), None),
+    'b': ('<i1', None),
+    'B': ('<u1', None),
+    'g': ('<f2', None),
+    'h': ('<i2', None),
+    'H': ('<u2', None),
+    'i': ('<i4', None),
+    'I': ('<u4', None),
+    'f': ('<f4', None),
+    'n': ('S4', None),
+    'N': ('S16', None),
+    'Z': ('S64', None),
+    'c': ('<i2', 0.01),
+    'C': ('<u2', 0.01),
+    'e': ('<i4', 0.01),
+    'E': ('<u4', 0.01),
+    'L': ('<i4', 1.0e-7),
+    'd': ('<f8', None),
+    'M': ('<i1', None),
+    'q': ('<i8', None),
+    'Q': ('<u8', None),
+}
+
+STRING_FORMATS = 'nNZ'
+INTEGER_FORMATS = 'bBhHiIMqQ'
+
+# Message types pymavlink always decodes when filtering, so they also advance its clock
+CLOCK_MESSAGE_TYPES = {'MODE', 'MSG', 'PARM', 'STAT', 'ORGN', 'VER'}
+
+# GPS epoch offset used by pymavlink (seconds between 1970 and 1980-01-06)
+GPS_EPOCH = 86400 * (10 * 365 + int((1980 - 1969) / 4) + 1 + 6 - 2)
+GPS_LEAP_SECONDS = 18
+
+
+def null_term(value) -> str:
+    """Decode a fixed-size string field and cut it at the first NUL."""
+    if isinstance(value, bytes):
+        value = value.decode(errors='backslashreplace')
+    idx = value.find('\0')
+    if idx != -1:
+        value = value[:idx]
+    return value
+
+
+def decode_string(raw: bytes) -> str:
+    """Decode a string field the same way pymavlink's DFMessage does."""
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError:
+        text = raw.decode('ISO-8859-1')
+    idx = text.find('\0')
+    if idx != -1:
+        text = text[:idx]
+    return text
+
+
+class LogFormat:
+    """Message format defined by a FMT record."""
+
+    def __init__(self, type_id: int, name: str, length: int, format: str,
+                 columns: List[str], offset: int = -1):
+        """
+        Initialize the format.
+
+        Args:
+            type_id: Message type ID used in record headers
+            name: Message type name
+            length: Record length in bytes, including the 3-byte header
+            format: DataFlash format characters, one per field
+            columns: Field names
+            offset: Byte offset of the FMT record defining this format
+        """
+        self.type_id = type_id
+        self.name = name
+        self.length = length
+        self.format = format
+        self.columns = columns
+        self.offset = offset
+        # Payload byte positions of the fields, None when the dtype covers the whole payload
+        self.positions = None
+
+        fields = []
+        self.multipliers = []
+        for i, char in enumerate(format):
+            if char not in FORMAT_TO_DTYPE:
+                raise ValueError(f"Unsupported format char '{char}' in message {name}")
+            dtype, multiplier = FORMAT_TO_DTYPE[char]
+            fields.append((f'f{i}', dtype))
+            self.multipliers.append(multiplier)
+        self.dtype = np.dtype(fields)
+
+        # Duplicated column names resolve to the last field, as in pymavlink
+        self.column_index = {column: i for i, column in enumerate(columns)}
+
+    @property
+    def payload_length(self) -> int:
+        """Record length without the header."""
+        return self.length - HEADER_LENGTH
+
+    @property
+    def has_time_us(self) -> bool:
+        """True if the first field is the TimeUS timestamp."""
+        return bool(self.columns) and self.columns[0] == 'TimeUS' and len(self.format) > 0
+
+    def field_values(self, records: np.ndarray, column: str) -> list:
+        """
+        Convert one field of decoded records to Python values.
+
+        Values match what pymavlink returns for the field: multipliers are
+        applied, strings are decoded and int16 arrays become array.array.
+
+        Args:
+            records: Structured array of decoded records of this format
+            column: Field name
+
+        Returns:
+            List of field values, one per record
+        """
+        index = self.column_index.get(column)
+        if index is None or index >= len(self.format):
+            return [None] * len(records)
+
+        char = self.format[index]
+        values = records[f'f{index}']
+
+        if char == 'a':
+            return [array.array('h', row) for row in values.tolist()]
+        if char in STRING_FORMATS:
+            if char == 'Z' and self.name == 'FILE':
+                # pymavlink keeps FILE contents as raw bytes
+                raw = np.ascontiguousarray(values).view(np.uint8).reshape(len(values), -1)
+                return [row.tobytes() for row in raw]
+            return [decode_string(raw) for raw in values.tolist()]
+        return self.numeric_values(records, column).tolist()
+
+    def numeric_values(self, records: np.ndarray, column: str) -> Optional[np.ndarray]:
+        """
+        Get one numeric field of decoded records as an array.
+
+        Args:
+            records: Structured array of decoded records of this format
+            column: Field name
+
+        Returns:
+            Array with multipliers applied and float fields as float64, or
+            None if the field is not a number
+        """
+        index = self.column_index.get(column)
+        if index is None or index >= len(self.format):
+            return None
+        char = self.format[index]
+        if char == 'a' or char in STRING_FORMATS:
+            return None
+
+        values = records[f'f{index}']
+        multiplier = self.multipliers[index]
+        if multiplier is not None:
+            values = values.astype(np.float64)
+            # pymavlink divides by the reciprocal for better accuracy
+            if 0.0 < multiplier < 1.0:
+                values = values / (1 / multiplier)
+            else:
+                values = values * multiplier
+        elif char in 'fg':
+            values = values.astype(np.float64)
+        return values
+
+    def project(self, columns: Iterable[str]) -> 'LogFormat':
+        """
+        Build the format of a subset of the fields of this format.
+
+        Records of this format decoded with the projected format only read
+        the bytes of the kept fields. Type ID, name, length and offset are
+        unchanged.
+
+        Args:
+            columns: Field names to keep; names that are not fields are ignored
+
+        Returns:
+            LogFormat with the kept fields in record order
+        """
+        indices = sorted({self.column_index[column] for column in columns
+                          if self.column_index.get(column, len(self.format)) < len(self.format)})
+        fmt = LogFormat(self.type_id, self.name, self.length,
+                        ''.join(self.format[i] for i in indices),
+                        [self.columns[i] for i in indices], self.offset)
+        positions = []
+        for i in indices:
+            dtype, start = self.dtype.fields[f'f{i}'][:2]
+            positions.append(np.arange(start, start + dtype.itemsize))
+        fmt.positions = np.concatenate(positions) if positions else np.zeros(0, dtype=np.int64)
+        return fmt
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the definition of the format as a JSON-serialisable dictionary."""
+        return {'type_id': self.type_id, 'name': self.name, 'length': self.length,
+                'format': self.format, 'columns': self.columns, 'offset': self.offset}
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> 'LogFormat':
+        """Build a format from a dictionary written by to_dict."""
+        return cls(entry['type_id'], entry['name'], entry['length'], entry['format'],
+                   entry['columns'], entry['offset'])
+
+    @classmethod
+    def from_record(cls, record: np.void, offset: int) -> Optional['LogFormat']:
+        """
+        Build a format from a decoded FMT record.
+
+        Args:
+            record: FMT record decoded with the FMT dtype
+            offset: Byte offset of the FMT record
+
+        Returns:
+            LogFormat, or None if the record is not a usable format definition
+        """
+        name = null_term(record['f2'].tobytes())
+        format = null_term(record['f3'].tobytes())
+        columns = null_term(record['f4'].tobytes()).split(',')
+        if columns == ['']:
+            columns = []
+        if not name or not name.isprintable():
+            return None
+        try:
+            fmt = cls(int(record['f0']), name, int(record['f1']), format, columns, offset)
+        except ValueError:
+            return None
+        if fmt.dtype.itemsize != fmt.payload_length:
+            return None
+        return fmt
+
+
+FMT_FORMAT = LogFormat(FMT_TYPE, 'FMT', FMT_LENGTH, 'BBnNZ',
+                       ['Type', 'Length', 'Name', 'Format', 'Columns'])
+
+
+class LogStatus(Enum):
+    """Outcome of a structural check of a log file."""
+
+    VALID = 'valid'
+    TRUNCATED = 'truncated'
+    UNKNOWN_FORMAT = 'unknown format'
+    NOT_FOUND = 'not found'
+
+
+class ValidationResult:
+    """Result of validate_log; true only for a valid log."""
+
+    def __init__(self, status: LogStatus, message: str = ''):
+        """
+        Initialize the result.
+
+        Args:
+            status: Outcome of the check
+            message: Explanation for logs that are not valid
+        """
+        self.status = status
+        self.message = message
+
+    def __bool__(self) -> bool:
+        return self.status is LogStatus.VALID
+
+    def __repr__(self) -> str:
+        return f"ValidationResult({self.status.value!r}, {self.message!r})"
+
+
+def check_header(head: bytes, file_size: int) -> ValidationResult:
+    """
+    Check the first bytes of a log for a DataFlash FMT record.
+
+    A log must start with a record header (0xA3 0x95) of a FMT record. If that
+    record is the FMT-of-FMT definition, it must describe FMT records as this
+    module decodes them.
+
+    Args:
+        head: Bytes from the start of the file
+        file_size: Size of the whole file in bytes
+
+    Returns:
+        ValidationResult
+    """
+    if file_size == 0:
+        return ValidationResult(LogStatus.TRUNCATED, "file is empty")
+    if len(head) < 2 or head[0] != HEAD1 or head[1] != HEAD2:
+        if len(head) < 2 and head[:1] in (b'', bytes([HEAD1])):
+            return ValidationResult(LogStatus.TRUNCATED, "file ends inside the first record header")
+        return ValidationResult(LogStatus.UNKNOWN_FORMAT, "no DataFlash record header at the start")
+    if len(head) < HEADER_LENGTH:
+        return ValidationResult(LogStatus.TRUNCATED, "file ends inside the first record header")
+    if head[2] != FMT_TYPE:
+        return ValidationResult(LogStatus.UNKNOWN_FORMAT,
+                                f"first record has type 0x{head[2]:02x}, expected FMT")
+    if len(head) < FMT_LENGTH:
+        return ValidationResult(LogStatus.TRUNCATED, "file ends inside the first FMT record")
+
+    record = np.frombuffer(head, dtype=FMT_FORMAT.dtype, count=1, offset=HEADER_LENGTH)[0]
+    if int(record['f0']) == FMT_TYPE:
+        fmt = LogFormat.from_record(record, 0)
+        if fmt is None or fmt.name != FMT_FORMAT.name or fmt.format != FMT_FORMAT.format:
+            return ValidationResult(LogStatus.UNKNOWN_FORMAT, "FMT-of-FMT record does not describe FMT records")
+    return ValidationResult(LogStatus.VALID)
+
+
+def validate_log(file_path: str) -> ValidationResult:
+    """
+    Check the structure of a log by reading only its first few KB.
+
+    Args:
+        file_path: Path to the .bin file, or a compressed log
+
+    Returns:
+        ValidationResult
+    """
+    try:
+        with open_input(file_path) as f:
+            head = f.read(VALIDATION_READ_SIZE)
+            if input_compression(file_path) is None:
+                file_size = os.fstat(f.fileno()).st_size
+            else:
+                # The size of a compressed log is unknown until it is decompressed
+                file_size = len(head)
+    except FileNotFoundError:
+        return ValidationResult(LogStatus.NOT_FOUND, "file not found")
+    return check_header(head, file_size)
+
+
+def _follow_chain(next_index: np.ndarray) -> np.ndarray:
+    """
+    Follow record links from the first candidate header.
+
+    Args:
+        next_index: For each candidate, index of the candidate following it
+            (len(next_index) when there is none)
+
+    Returns:
+        Indices of the candidates on the chain starting at candidate 0
+    """
+    count = len(next_index)
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Pointer doubling: path holds the first L links, jump advances L links
+    jump = np.append(next_index, count)
+    path = np.zeros(1, dtype=np.int64)
+    while True:
+        step = jump[path]
+        found = step[step < count]
+        path = np.concatenate([path, found])
+        if len(found) < len(step):
+            return path
+        jump = jump[jump]
+
+
+def _projection(fmt: LogFormat, fields: Optional[Dict[str, List[str]]]) -> Tuple[LogFormat, List[str]]:
+    """
+    Work out how to decode a format for iter_messages.
+
+    Returns:
+        Tuple of (format to decode records with, columns of the messages)
+    """
+    columns = list(dict.fromkeys(fmt.columns))
+    if not fields or fields.get(fmt.name) is None:
+        return fmt, columns
+    selected = set(fields[fmt.name])
+    columns = [column for column in columns if column in selected]
+    if fmt.has_time_us:
+        selected.add('TimeUS')
+    # Rate limits bucket the records of each instance separately
+    instance = instance_field(fmt.columns)
+    if instance is not None:
+        selected.add(instance)
+    return fmt.project(selected), columns
+
+
+class DataFlashLog:
+    """Memory-mapped DataFlash log with its FMT table."""
+
+    def __init__(self, file_path: str, window_size: int = DEFAULT_WINDOW_SIZE,
+                 formats: Optional[Dict[int, LogFormat]] = None):
+        """
+        Open and memory-map a log file.
+
+        Args:
+            file_path: Path to the .bin file
+            window_size: Number of bytes scanned per step
+            formats: Known message formats keyed by type ID (e.g. from an
+                index); the FMT records are read from the file on first use if None
+        """
+        self.file_path = file_path
+        self.window_size = window_size
+        self._file = open(file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = np.frombuffer(self._mmap, dtype=np.uint8)
+        else:
+            self._mmap = None
+            self.data = np.zeros(0, dtype=np.uint8)
+
+        self._formats = None
+        if formats is not None:
+            self._set_formats(formats)
+        # Offset of a record iter_messages has recently yielded, for progress reports
+        self.position = 0
+
+    @property
+    def formats(self) -> Dict[int, LogFormat]:
+        """Message formats keyed by type ID."""
+        if self._formats is None:
+            self._set_formats(self.read_formats())
+        return self._formats
+
+    @formats.setter
+    def formats(self, formats: Dict[int, LogFormat]):
+        self._set_formats(formats)
+
+    def _type_table(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Record length and FMT offset of each type ID (0 and the file size if undefined)."""
+        if self._formats is None:
+            self._set_formats(self.read_formats())
+        return self._lengths, self._defined_at
+
+    def _set_formats(self, formats: Dict[int, LogFormat]):
+        """Store the FMT table and the per-type lengths used to walk records."""
+        self._formats = formats
+        self._lengths = np.zeros(256, dtype=np.int64)
+        self._defined_at = np.full(256, self.size, dtype=np.int64)
+        for fmt in formats.values():
+            self._lengths[fmt.type_id] = fmt.length
+            self._defined_at[fmt.type_id] = fmt.offset
+
+    def validate(self) -> ValidationResult:
+        """Check the structure of the log from its first few KB (see check_header)."""
+        return check_header(self.data[:VALIDATION_READ_SIZE].tobytes(), self.size)
+
+    def close(self):
+        """Release the memory map and the file handle."""
+        self.data = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def type_ids(self, names) -> set:
+        """
+        Get the type IDs of the given message names.
+
+        Args:
+            names: Iterable of message type names
+
+        Returns:
+            Set of type IDs present in the FMT table
+        """
+        names = set(names)
+        return {fmt.type_id for fmt in self.formats.values() if fmt.name in names}
+
+    def _find_headers(self, start: int, stop: int) -> np.ndarray:
+        """Byte offsets in [start, stop) where a record header signature starts."""
+        block = self.data[start:min(stop + 1, self.size)]
+        if len(block) < 2:
+            return np.zeros(0, dtype=np.int64)
+        hits = np.flatnonzero((block[:-1] == HEAD1) & (block[1:] == HEAD2)).astype(np.int64)
+        hits += start
+        return hits[hits + 2 < self.size]
+
+    def read_formats(self, start: int = 0, formats: Optional[Dict[int, LogFormat]] = None) -> Dict[int, LogFormat]:
+        """
+        Read the FMT records from a byte offset into a table keyed by type ID.
+
+        Args:
+            start: Byte offset where the search starts
+            formats: Formats already known, e.g. those before start; a type
+                keeps its first definition
+
+        Returns:
+            New table holding formats and the formats defined from start
+        """
+        formats = dict(formats or {FMT_TYPE: FMT_FORMAT})
+        for start in range(start, self.size, self.window_size):
+            headers = self._find_headers(start, start + self.window_size)
+            headers = headers[self.data[headers + 2] == FMT_TYPE]
+            headers = headers[headers + FMT_LENGTH <= self.size]
+            if len(headers) == 0:
+                continue
+            for offset, record in zip(headers.tolist(), self.decode(FMT_FORMAT, headers)):
+                fmt = LogFormat.from_record(record, offset)
+                if fmt is not None and fmt.type_id not in formats:
+                    formats[fmt.type_id] = fmt
+        return formats
+
+    def iter_records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Locate the records of the log in file order.
+
+        Headers are resolved like pymavlink does: a record starts where the
+        previous one ends, and bytes that do not start a record of a known type
+        are skipped until the next one. A truncated trailing record ends the log.
+
+        After the iteration, next_offset holds the offset of the first record
+        at or after stop, or None if the log ended first, and end_offset the
+        offset just after the last record yielded (start if there was none),
+        where decoding resumes once a growing log has more complete records.
+
+        Args:
+            start: Byte offset of the first record (0 or a record boundary)
+            stop: Byte offset before which records must start (None for the end)
+
+        Yields:
+            Tuples of (byte offsets, type IDs) for consecutive runs of records
+        """
+        self.next_offset = None
+        self.end_offset = start
+        if stop is None:
+            stop = self.size
+        lengths, defined_at = self._type_table()
+        offset = start
+        for window_start in range(start, self.size, self.window_size):
+            window_stop = min(window_start + self.window_size, self.size)
+            if offset >= window_stop:
+                continue
+
+            headers = self._find_headers(offset, window_stop)
+            type_ids = self.data[headers + 2]
+            known = (lengths[type_ids] > 0) & (defined_at[type_ids] < headers)
+            headers = headers[known]
+            type_ids = type_ids[known]
+            if len(headers) == 0:
+                offset = window_stop
+                continue
+
+            ends = headers + lengths[type_ids]
+            path = _follow_chain(np.searchsorted(headers, ends))
+            truncated = np.flatnonzero(ends[path] > self.size)
+            if len(truncated):
+                path = path[:truncated[0]]
+            beyond = np.flatnonzero(headers[path] >= stop)
+            if len(beyond):
+                self.next_offset = int(headers[path[beyond[0]]])
+                path = path[:beyond[0]]
+            if len(path):
+                self.end_offset = int(ends[path[-1]])
+                yield headers[path], type_ids[path]
+            if len(truncated) or len(beyond):
+                return
+            offset = int(ends[path[-1]])
+
+    def resync(self, offset: int) -> int:
+        """
+        Find the first record boundary at or after an arbitrary byte offset.
+
+        A boundary is a known header followed by RESYNC_RECORDS records that
+        each start exactly where the previous one ends (or that reach the end
+        of the log), which rules out header signatures inside payloads.
+
+        Args:
+            offset: Byte offset to search from
+
+        Returns:
+            Byte offset of the record boundary, or the file size if none
+        """
+        lengths, defined_at = self._type_table()
+        while offset < self.size:
+            stop = min(offset + RESYNC_SEARCH_SIZE, self.size)
+            for candidate in self._find_headers(offset, stop).tolist():
+                position = candidate
+                for _ in range(RESYNC_RECORDS):
+                    type_id = int(self.data[position + 2])
+                    length = int(lengths[type_id])
+                    if length == 0 or defined_at[type_id] >= position:
+                        break
+                    if position + length > self.size:
+                        # A truncated record ends the log
+                        return candidate if position > candidate else self.size
+                    position += length
+                    if position > self.size - HEADER_LENGTH:
+                        return candidate
+                    if self.data[position] != HEAD1 or self.data[position + 1] != HEAD2:
+                        break
+                else:
+                    return candidate
+            offset = stop
+        return self.size
+
+    def message_counts(self) -> Dict[str, int]:
+        """
+        Count the records of each message type from their headers only.
+
+        Payloads are skipped by their known length without being decoded.
+
+        Returns:
+            Dictionary mapping message type to number of records
+        """
+        counts = np.zeros(256, dtype=np.int64)
+        for _, ids in self.iter_records():
+            counts += np.bincount(ids, minlength=256)
+        result = {}
+        for type_id in np.flatnonzero(counts).tolist():
+            name = self.formats[type_id].name
+            result[name] = result.get(name, 0) + int(counts[type_id])
+        return result
+
+    def decode(self, fmt: LogFormat, offsets: np.ndarray) -> np.ndarray:
+        """
+        Decode records of one message type in bulk.
+
+        Args:
+            fmt: Format of the records, or a projection of it from LogFormat.project
+            offsets: Byte offsets of the record headers
+
+        Returns:
+            Structured array with one element per record
+        """
+        if fmt.dtype.itemsize == 0:
+            return np.zeros(len(offsets), dtype=fmt.dtype)
+        positions = fmt.positions if fmt.positions is not None else np.arange(fmt.payload_length)
+        index = offsets[:, None] + (HEADER_LENGTH + positions)
+        return self.data[index].view(fmt.dtype).reshape(len(offsets))
+
+    def _first_record(self, type_ids: set, condition=None) -> Optional[Tuple[LogFormat, np.ndarray]]:
+        """
+        Decode the first record whose type is in type_ids.
+
+        Args:
+            type_ids: Type IDs to look for
+            condition: Optional function of (format, records) returning a
+                boolean mask of the records to accept
+
+        Returns:
+            Tuple of (format, one-element record array), or None if not found
+        """
+        wanted = np.array(sorted(type_ids), dtype=np.uint8)
+        for offsets, ids in self.iter_records():
+            hits = np.flatnonzero(np.isin(ids, wanted))
+            if len(hits) == 0:
+                continue
+            if condition is None:
+                fmt = self.formats[int(ids[hits[0]])]
+                return fmt, self.decode(fmt, offsets[hits[:1]])
+            first = None
+            for type_id in np.unique(ids[hits]).tolist():
+                fmt = self.formats[type_id]
+                positions = hits[ids[hits] == type_id]
+                accepted = np.flatnonzero(condition(fmt, self.decode(fmt, offsets[positions])))
+                if len(accepted) and (first is None or positions[accepted[0]] < first[1]):
+                    first = (fmt, positions[accepted[0]])
+            if first is not None:
+                fmt, position = first
+                return fmt, self.decode(fmt, offsets[position:position + 1])
+        return None
+
+    def clock_base(self) -> Tuple[float, float]:
+        """
+        Work out the time base of the log as pymavlink's microsecond clock does.
+
+        The base comes from the first GPS record with a valid GPS week. Logs
+        without TimeUS fields get a zero base.
+
+        Returns:
+            Tuple of (time base, timestamp of records before the first TimeUS)
+        """
+        timebase = 0.0
+        gps_ids = self.type_ids(['GPS'])
+        if gps_ids and all({'TimeUS', 'GWk', 'GMS'} <= set(self.formats[t].columns) for t in gps_ids):
+            def has_week(fmt, records):
+                return records[f"f{fmt.column_index['GWk']}"] > 0
+
+            gps = self._first_record(gps_ids, has_week)
+            if gps is not None:
+                fmt, record = gps
+                week = fmt.field_values(record, 'GWk')[0]
+                msec = fmt.field_values(record, 'GMS')[0]
+                time_us = fmt.field_values(record, 'TimeUS')[0]
+                gps_time = GPS_EPOCH + 86400 * 7 * week + msec * 0.001 - GPS_LEAP_SECONDS
+                timebase = gps_time - time_us * 0.000001
+
+        with_time_us = {fmt.type_id for fmt in self.formats.values() if 'TimeUS' in fmt.columns}
+        first = self._first_record(with_time_us) if with_time_us else None
+        if first is None:
+            return timebase, timebase
+        fmt, record = first
+        return timebase, timebase + fmt.field_values(record, 'TimeUS')[0] * 0.000001
+
+    def split_ranges(self, parts: int, start: int = 0,
+                     stop: Optional[int] = None) -> List[Tuple[int, int]]:
+        """
+        Split the log into byte ranges that start at record boundaries.
+
+        Args:
+            parts: Number of ranges wanted
+            start: Byte offset of the first range (0 or a record boundary)
+            stop: Byte offset where the last range ends (None for the end)
+
+        Returns:
+            List of (start, stop) byte ranges covering [start, stop) in file order
+        """
+        if stop is None:
+            stop = self.size
+        bounds = [start]
+        for k in range(1, parts):
+            boundary = self.resync(start + (stop - start) * k // parts)
+            if boundary > bounds[-1] and boundary < stop:
+                bounds.append(boundary)
+        bounds.append(stop)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _stamped_types(self, type_ids: Optional[set] = None) -> np.ndarray:
+        """Boolean table of the type IDs whose first field is TimeUS."""
+        return np.array([i in self.formats and self.formats[i].has_time_us and
+                         (type_ids is None or i in type_ids) for i in range(256)])
+
+    def _next_time_us(self, offset: int, stamped: np.ndarray) -> Optional[int]:
+        """TimeUS of the first stamped record at or after a record boundary."""
+        lengths, defined_at = self._type_table()
+        position = offset
+        while position + HEADER_LENGTH <= self.size:
+            type_id = int(self.data[position + 2])
+            length = int(lengths[type_id])
+            if self.data[position] != HEAD1 or self.data[position + 1] != HEAD2 or \
+                    length == 0 or defined_at[type_id] >= position:
+                position = self.resync(position + 1)
+                continue
+            if position + length > self.size:
+                return None
+            if stamped[type_id]:
+                fmt = self.formats[type_id]
+                return fmt.field_values(self.decode(fmt, np.array([position])), 'TimeUS')[0]
+            position += length
+        return None
+
+    def _bisect_time(self, time_us: int, stamped: np.ndarray) -> Tuple[int, int]:
+        """
+        Binary search the file for the records around a TimeUS.
+
+        Returns:
+            Tuple of (low, high): low is a record boundary whose next stamped
+            record is before time_us (or 0), and the stamped records at or
+            after high are at or after time_us
+        """
+        low, high = 0, self.size
+        while high - low > SEEK_RESOLUTION:
+            middle = (low + high) // 2
+            boundary = self.resync(middle)
+            if boundary >= high:
+                high = middle
+                continue
+            time = self._next_time_us(boundary, stamped)
+            if time is not None and time < time_us:
+                low = boundary
+            else:
+                high = boundary
+        return low, high
+
+    def window_offsets(self, start_us: Optional[int], end_us: Optional[int], index=None,
+                       type_ids: Optional[set] = None) -> Tuple[int, Optional[int]]:
+        """
+        Find the byte range holding the records of a TimeUS window.
+
+        The coarse timestamp-to-offset map of the index is used if there is
+        one, otherwise the file is binary searched. TimeUS is assumed to grow
+        through the log.
+
+        Args:
+            start_us: First TimeUS of the window (None for the start of the log)
+            end_us: Last TimeUS of the window (None for the end of the log)
+            index: Optional LogIndex of the file
+            type_ids: Type IDs whose TimeUS is used (None for all)
+
+        Returns:
+            Tuple of (start, stop): start is a record boundary at or before the
+            first record of the window; records starting at or after stop
+            (None for the end of the log) are after the window
+        """
+        start, stop = 0, None
+        if index is not None and len(index.time_offsets):
+            offsets = index.time_offsets
+            times = np.maximum.accumulate(index.time_us)
+            if start_us is not None:
+                k = int(np.searchsorted(times, start_us, side='left')) - 1
+                start = int(offsets[k]) if k >= 0 else 0
+            if end_us is not None:
+                k = int(np.searchsorted(times, end_us, side='right'))
+                stop = int(offsets[k]) if k < len(offsets) else None
+            return start, stop
+
+        stamped = self._stamped_types(type_ids)
+        if start_us is not None:
+            start = self._bisect_time(start_us, stamped)[0]
+        if end_us is not None:
+            high = self._bisect_time(end_us + 1, stamped)[1]
+            stop = high if high < self.size else None
+        return start, stop
+
+    def timestamp_before(self, offset: int, clock: Tuple[float, float],
+                         type_ids: Optional[set] = None) -> float:
+        """
+        Get the clock timestamp carried into the record starting at offset.
+
+        This is the timestamp of the last TimeUS-stamped record before offset,
+        found by resynchronising a little before offset and looking further
+        back until one is found.
+
+        Args:
+            offset: Byte offset of a record boundary
+            clock: Tuple of (time base, initial timestamp) from clock_base
+            type_ids: Type IDs that advance the clock (None for all)
+
+        Returns:
+            Timestamp in seconds
+        """
+        timebase, initial = clock
+        stamped = self._stamped_types(type_ids)
+        lookback = RESYNC_SEARCH_SIZE
+        while offset > 0:
+            low = max(0, offset - lookback)
+            last = None
+            for offsets, ids in self.iter_records(self.resync(low) if low else 0, offset):
+                hits = np.flatnonzero(stamped[ids])
+                if len(hits):
+                    last = (int(ids[hits[-1]]), offsets[hits[-1]:hits[-1] + 1])
+            if last is not None:
+                fmt = self.formats[last[0]]
+                return timebase + fmt.field_values(self.decode(fmt, last[1]), 'TimeUS')[0] * 0.000001
+            if low == 0:
+                break
+            lookback *= 4
+        return initial
+
+    def iter_messages(self, message_types: Optional[list] = None, index=None,
+                      start: int = 0, stop: Optional[int] = None,
+                      clock: Optional[Tuple[float, float]] = None,
+                      time_window: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                      fields: Optional[Dict[str, List[str]]] = None,
+                      rates: Optional[Dict[str, float]] = None,
+                      aggregate: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Decode messages in file order as dictionaries.
+
+        The dictionaries have the same keys and values as the ones built by
+        BinFileParser from pymavlink messages.
+
+        Args:
+            message_types: List of message types to include (None for all types)
+            index: Optional LogIndex of the file, used to jump straight to the
+                records of the selected types
+            start: Byte offset of the first record to decode (a record boundary)
+            stop: Byte offset before which records must start (None for the end)
+            clock: Tuple of (time base, initial timestamp) from clock_base;
+                computed if None
+            time_window: Tuple of (first, last) TimeUS of the messages to yield,
+                either may be None. A message without TimeUS takes the TimeUS
+                of the last record before it. Without a stop offset, decoding
+                ends with the first batch of records past the window.
+            fields: Dictionary mapping message type to the fields to include;
+                types missing here keep all fields. Only the bytes of these
+                fields (and TimeUS) are decoded.
+            rates: Dictionary mapping message type to its target rate in Hz.
+                Messages of these types are grouped in buckets of 1 / rate
+                seconds and only the first message of each bucket is yielded;
+                the others are never converted to Python values.
+            aggregate: One of AGGREGATES to yield one message per bucket with
+                the mean, minimum or maximum of its numeric fields instead.
+                It is yielded in place of the first message of the next bucket
+                (or at the end), with the timestamp of the bucket's first message.
+
+        Yields:
+            Dictionary containing message data
+        """
+        wanted = None
+        clocked = None
+        clock_types = None
+        if message_types is not None:
+            wanted = np.array(sorted(self.type_ids(message_types)), dtype=np.uint8)
+            clock_types = self.type_ids(set(message_types) | CLOCK_MESSAGE_TYPES)
+            clocked = np.array(sorted(clock_types), dtype=np.uint8)
+
+        if index is not None:
+            clock = (index.timebase, index.start_timestamp)
+        elif clock is None:
+            clock = self.clock_base()
+        timebase, timestamp = clock
+        if start > 0:
+            timestamp = self.timestamp_before(start, clock, clock_types)
+        if index is not None:
+            records = index.iter_records(clock_types, start, stop)
+        else:
+            records = self.iter_records(start, stop)
+
+        window_start = window_end = None
+        if time_window is not None:
+            window_start, window_end = time_window
+        self.position = start
+        # TimeUS carried into the first records; -1 before any TimeUS
+        time_us = round((timestamp - timebase) * 1000000) if start > 0 else -1
+        # Type ID -> (format decoded, columns yielded)
+        projections = {}
+        type_rates = {}
+        if rates:
+            type_rates = {type_id: rates[fmt.name] for type_id, fmt in self.formats.items()
+                          if fmt.name in rates}
+        # (type ID, instance) -> bucket of its last record, and BucketAggregate of its open bucket
+        buckets = {}
+        pending = {}
+
+        for offsets, ids in records:
+            self.position = int(offsets[0])
+            if clocked is not None:
+                keep = np.isin(ids, clocked)
+                offsets = offsets[keep]
+                ids = ids[keep]
+            if len(ids) == 0:
+                continue
+
+            # Decode each type of the run in bulk, then interleave in file order
+            stamps = np.full(len(ids), np.nan)
+            times = np.full(len(ids), -1, dtype=np.int64)
+            rows = {}
+            for type_id in np.unique(ids).tolist():
+                if type_id not in projections:
+                    projections[type_id] = _projection(self.formats[type_id], fields)
+                fmt = projections[type_id][0]
+                positions = np.flatnonzero(ids == type_id)
+                records = self.decode(fmt, offsets[positions])
+                if fmt.has_time_us:
+                    stamps[positions] = timebase + records['f0'].astype(np.float64) * 0.000001
+                    times[positions] = records['f0']
+                rows[type_id] = (fmt, records, positions)
+
+            has_stamp = ~np.isnan(stamps)
+            last = np.where(has_stamp, np.arange(len(stamps)), -1)
+            np.maximum.accumulate(last, out=last)
+            stamps = np.where(last >= 0, stamps[np.maximum(last, 0)], timestamp)
+            timestamp = float(stamps[-1])
+
+            if wanted is not None:
+                selected = np.isin(ids, wanted)
+            else:
+                selected = np.ones(len(ids), dtype=bool)
+
+            past_window = False
+            if time_window is not None:
+                times = np.where(last >= 0, times[np.maximum(last, 0)], time_us)
+                time_us = int(times[-1])
+                if window_start is not None:
+                    selected &= times >= window_start
+                if window_end is not None:
+                    selected &= times <= window_end
+                    past_window = stop is None and time_us > window_end
+
+            merged = {}
+            if type_rates:
+                merged = self._decimate(rows, stamps, selected, projections, type_rates, aggregate,
+                                        buckets, pending)
+
+            messages = {}
+            for type_id, (fmt, records, positions) in rows.items():
+                mask = selected[positions]
+                if not mask.any():
+                    continue
+                records = records[mask]
+                columns = projections[type_id][1]
+                values = [fmt.field_values(records, column) for column in columns]
+                keys = ['timestamp', 'message_type'] + columns
+                times = stamps[positions[mask]].tolist()
+                names = [fmt.name] * len(records)
+                messages[type_id] = iter([dict(zip(keys, row)) for row in zip(times, names, *values)])
+
+            if merged:
+                for position in np.union1d(np.flatnonzero(selected), list(merged)).tolist():
+                    if position in merged:
+                        yield merged[position]
+                    else:
+                        yield next(messages[int(ids[position])])
+            else:
+                order = ids[selected].tolist()
+                yielded_offsets = offsets[selected]
+                for first in range(0, len(order), POSITION_STEP):
+                    self.position = int(yielded_offsets[first])
+                    for type_id in order[first:first + POSITION_STEP]:
+                        yield next(messages[type_id])
+
+            if past_window:
+                break
+
+        for bucket in pending.values():
+            yield bucket.result()
+
+    def _decimate(self, rows: dict, stamps: np.ndarray, selected: np.ndarray, projections: dict,
+                  rates: Dict[int, float], aggregate: Optional[str], buckets: Dict[tuple, int],
+                  pending: Dict[tuple, BucketAggregate]) -> Dict[int, Dict[str, Any]]:
+        """
+        Reduce the selected records of rate-limited types of a run to one per bucket.
+
+        Each instance of a type with an instance field (see INSTANCE_FIELDS)
+        is bucketed on its own.
+
+        Args:
+            rows: Dictionary mapping type ID to (format, records, positions) of the run
+            stamps: Timestamps of the records of the run
+            selected: Mask of the records of the run to yield; updated
+            projections: Dictionary mapping type ID to (format, columns)
+            rates: Dictionary mapping type ID to its target rate in Hz
+            aggregate: One of AGGREGATES, or None to keep the first record of each bucket
+            buckets: Dictionary mapping (type ID, instance) to the bucket of its
+                last record; updated
+            pending: Dictionary mapping (type ID, instance) to the aggregate of
+                its open bucket, in the order the buckets started; updated
+
+        Returns:
+            Dictionary mapping run positions to the aggregated messages yielded there
+        """
+        merged = {}
+        started = []
+        for type_id, (fmt, records, positions) in rows.items():
+            rate = rates.get(type_id)
+            if rate is None:
+                continue
+            type_mask = selected[positions]
+            if not type_mask.any():
+                continue
+            instance = instance_field(fmt.columns)
+            if instance is None:
+                groups = [((type_id, None), type_mask)]
+            else:
+                instances = fmt.numeric_values(records, instance)
+                groups = [((type_id, value), type_mask & (instances == value))
+                          for value in dict.fromkeys(instances[type_mask].tolist())]
+
+            for key, mask in groups:
+                kept = positions[mask]
+                bucket = np.floor(stamps[kept] * rate).astype(np.int64)
+                new = np.empty(len(kept), dtype=bool)
+                new[0] = bucket[0] != buckets.get(key)
+                new[1:] = bucket[1:] != bucket[:-1]
+                buckets[key] = int(bucket[-1])
+                if aggregate is None:
+                    selected[kept[~new]] = False
+                    continue
+
+                # Aggregate each run of records in the same bucket
+                selected[kept] = False
+                group = records[mask]
+                starts = np.flatnonzero(np.concatenate(([True], new[1:])))
+                counts = np.diff(np.append(starts, len(kept))).tolist()
+                reduce = {'mean': np.add, 'min': np.minimum, 'max': np.maximum}[aggregate]
+                columns = projections[type_id][1]
+                reduced = {}
+                for column in columns:
+                    if column in FIRST_VALUE_FIELDS:
+                        continue
+                    values = fmt.numeric_values(group, column)
+                    if values is not None:
+                        if aggregate == 'mean':
+                            values = values.astype(np.float64)
+                        reduced[column] = reduce.reduceat(values, starts).tolist()
+                first = group[starts]
+                keys = ['timestamp', 'message_type'] + columns
+                rows_first = zip(stamps[kept[starts]].tolist(), [fmt.name] * len(starts),
+                                 *[fmt.field_values(first, column) for column in columns])
+                segments = [BucketAggregate(aggregate, dict(zip(keys, row)), counts[i],
+                                            {column: values[i] for column, values in reduced.items()})
+                            for i, row in enumerate(rows_first)]
+
+                if not new[0]:
+                    pending[key].merge(segments[0])
+                    segments[0] = pending[key]
+                elif key in pending:
+                    merged[int(kept[0])] = pending.pop(key).result()
+                for segment, position in zip(segments[:-1], kept[starts[1:]].tolist()):
+                    merged[position] = segment.result()
+                if new[0] or len(segments) > 1:
+                    pending.pop(key, None)
+                    started.append((int(kept[starts[-1]]), key, segments[-1]))
+
+        for _, key, segment in sorted(started, key=lambda item: item[0]):
+            pending[key] = segment
+        return merged
+
+    def read_columns(self, message_types: Optional[list] = None, index=None, start: int = 0,
+                     time_window: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                     fields: Optional[Dict[str, List[str]]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Decode the messages of types with TimeUS into columns.
+
+        Unlike iter_messages, no dictionary is built per message: each field
+        of each type is returned as one array.
+
+        Args:
+            message_types: List of message types to include (None for all
+                types with TimeUS); types without TimeUS are skipped
+            index: Optional LogIndex of the file
+            start: Byte offset of the first record to decode (a record boundary)
+            time_window: Tuple of (first, last) TimeUS of the messages to
+                include, either may be None
+            fields: Dictionary mapping message type to the fields to include
+
+        Returns:
+            Dictionary mapping message type to a dictionary of columns
+            (timestamp followed by the fields), in definition order. Numeric
+            fields are NumPy arrays, other fields lists.
+        """
+        selected = {type_id: fmt for type_id, fmt in self.formats.items()
+                    if fmt.has_time_us and (message_types is None or fmt.name in message_types)}
+        if not selected:
+            return {}
+        timebase = index.timebase if index is not None else self.clock_base()[0]
+        window_start, window_end = time_window or (None, None)
+        if index is not None:
+            records = index.iter_records(set(selected), start)
+        else:
+            records = self.iter_records(start)
+        wanted = np.array(sorted(selected), dtype=np.uint8)
+        projections = {type_id: _projection(fmt, fields) for type_id, fmt in selected.items()}
+
+        chunks = {type_id: [] for type_id in selected}
+        for offsets, ids in records:
+            keep = np.isin(ids, wanted)
+            offsets = offsets[keep]
+            ids = ids[keep]
+            if len(ids) == 0:
+                continue
+            last_position = -1
+            last_time = None
+            for type_id in np.unique(ids).tolist():
+                positions = np.flatnonzero(ids == type_id)
+                decoded = self.decode(projections[type_id][0], offsets[positions])
+                times = decoded['f0']
+                if positions[-1] > last_position:
+                    last_position, last_time = positions[-1], int(times[-1])
+                mask = np.ones(len(decoded), dtype=bool)
+                if window_start is not None:
+                    mask &= times >= window_start
+                if window_end is not None:
+                    mask &= times <= window_end
+                chunks[type_id].append(decoded[mask])
+            if window_end is not None and last_time > window_end:
+                break
+
+        result = {}
+        for type_id in sorted(selected, key=lambda type_id: selected[type_id].offset):
+            fmt, columns = projections[type_id]
+            records = np.concatenate(chunks[type_id]) if chunks[type_id] else np.zeros(0, dtype=fmt.dtype)
+            data = {'timestamp': timebase + records['f0'].astype(np.float64) * 0.000001}
+            for column in columns:
+                values = fmt.numeric_values(records, column)
+                data[column] = values if values is not None else fmt.field_values(records, column)
+            result[fmt.name] = data
+        return result
+
+
+class StreamWindow:
+    """
+    Bytes of a decompressed log around the current decoding position.
+
+    The window is indexed by byte offsets in the decompressed log, like the
+    data array of a memory-mapped DataFlashLog. Reading moves forward through
+    the stream: a slice drops the bytes before its start, and an index past
+    the window reads on. An index before the window restarts the stream.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Initialize the window; the stream is opened on first use.
+
+        Args:
+            file_path: Path to the compressed log
+        """
+        self.file_path = file_path
+        self.stream = None
+        # Offset of the first byte of buffer
+        self.base = 0
+        self.buffer = np.zeros(0, dtype=np.uint8)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start = key.start or 0
+            self._load(start, key.stop, advance=True)
+            return self.buffer[start - self.base:max(key.stop - self.base, 0)]
+        key = np.asarray(key)
+        if key.size == 0:
+            return np.zeros(key.shape, dtype=np.uint8)
+        self._load(int(key.min()), int(key.max()) + 1)
+        return self.buffer[key - self.base]
+
+    def _load(self, start: int, stop: int, advance: bool = False):
+        """Make the window hold the bytes [start, stop), or up to the end of the log."""
+        if start < self.base or self.stream is None:
+            self.close()
+            self.stream = open_input(self.file_path)
+            self.base = 0
+            self.buffer = np.zeros(0, dtype=np.uint8)
+        end = self.base + len(self.buffer)
+        if start >= end:
+            # Nothing in the window is needed any more
+            skip = start - end
+            while skip > 0:
+                skipped = len(self.stream.read(min(skip, DEFAULT_WINDOW_SIZE)))
+                if skipped == 0:
+                    break
+                skip -= skipped
+            self.base = start - skip
+            self.buffer = np.zeros(0, dtype=np.uint8)
+            end = self.base
+        elif advance and start > self.base:
+            self.buffer = self.buffer[start - self.base:]
+            self.base = start
+        if stop > end:
+            chunks = [self.buffer]
+            missing = stop - end
+            while missing > 0:
+                data = self.stream.read(missing)
+                if not data:
+                    break
+                chunks.append(np.frombuffer(data, dtype=np.uint8))
+                missing -= len(data)
+            self.buffer = np.concatenate(chunks)
+
+    @property
+    def compressed_position(self) -> int:
+        """Compressed bytes read so far."""
+        return self.stream.compressed_position if self.stream is not None else 0
+
+    def close(self):
+        """Close the stream."""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+class CompressedDataFlashLog(DataFlashLog):
+    """
+    DataFlash log decoded from its decompressed stream (.bin.gz, .bin.zst, .bin.xz).
+
+    The FMT table and the decompressed size are read in a first pass over the
+    stream. Decoding then reads forward through a StreamWindow, holding about
+    window_size bytes of the log at a time, and restarts the stream when it
+    has to go back (e.g. after the clock base has been found). Seeking to a
+    time window and splitting into byte ranges are not supported.
+    """
+
+    def __init__(self, file_path: str, window_size: int = DEFAULT_WINDOW_SIZE,
+                 formats: Optional[Dict[int, LogFormat]] = None):
+        """
+        Open a compressed log; nothing is decompressed until it is used.
+
+        Args:
+            file_path: Path to the compressed log
+            window_size: Number of bytes scanned per step
+            formats: Known message formats keyed by type ID
+        """
+        self.file_path = file_path
+        self.window_size = window_size
+        self.data = StreamWindow(file_path)
+        self._size = None
+        self._scanned_formats = None
+        self._formats = None
+        if formats is not None:
+            self._set_formats(formats)
+        self.position = 0
+
+    @property
+    def size(self) -> int:
+        """Size of the decompressed log in bytes."""
+        if self._size is None:
+            self._scan()
+        return self._size
+
+    @property
+    def compressed_position(self) -> int:
+        """Compressed bytes read by the decoding in progress."""
+        return self.data.compressed_position if self.data is not None else 0
+
+    def _scan(self):
+        """Read the FMT records and the decompressed size in one pass over the stream."""
+        formats = {FMT_TYPE: FMT_FORMAT}
+        payload = HEADER_LENGTH + np.arange(FMT_FORMAT.payload_length)
+        base = 0
+        tail = np.zeros(0, dtype=np.uint8)
+        with open_input(self.file_path) as stream:
+            while True:
+                chunk = stream.read(self.window_size)
+                block = np.concatenate([tail, np.frombuffer(chunk, dtype=np.uint8)])
+                # Keep the bytes that may start a FMT record ending in the next chunk
+                keep = len(block) if not chunk else max(len(block) - FMT_LENGTH + 1, 0)
+                if len(block) >= HEADER_LENGTH:
+                    headers = np.flatnonzero((block[:-2] == HEAD1) & (block[1:-1] == HEAD2) &
+                                             (block[2:] == FMT_TYPE))
+                    headers = headers[(headers < keep) & (headers + FMT_LENGTH <= len(block))]
+                    records = block[headers[:, None] + payload].view(FMT_FORMAT.dtype).reshape(len(headers))
+                    for offset, record in zip((headers + base).tolist(), records):
+                        fmt = LogFormat.from_record(record, offset)
+                        if fmt is not None and fmt.type_id not in formats:
+                            formats[fmt.type_id] = fmt
+                if not chunk:
+                    self._size = base + len(block)
+                    break
+                tail = block[keep:]
+                base += keep
+        self._scanned_formats = formats
+
+    def read_formats(self, start: int = 0, formats: Optional[Dict[int, LogFormat]] = None) -> Dict[int, LogFormat]:
+        """Read the FMT records, from the first pass over the stream when reading them all."""
+        if start == 0 and formats is None:
+            if self._scanned_formats is None:
+                self._scan()
+            return dict(self._scanned_formats)
+        return super().read_formats(start, formats)
+
+    def validate(self) -> ValidationResult:
+        """Check the structure of the log from its first few KB."""
+        head = self.data[:VALIDATION_READ_SIZE].tobytes()
+        return check_header(head, len(head))
+
+    def window_offsets(self, start_us: Optional[int], end_us: Optional[int], index=None,
+                       type_ids: Optional[set] = None) -> Tuple[int, Optional[int]]:
+        """A compressed log cannot be searched, its time windows start at the beginning."""
+        return 0, None
+
+    def split_ranges(self, parts: int, start: int = 0,
+                     stop: Optional[int] = None) -> List[Tuple[int, int]]:
+        """A compressed log is decoded as one stream, in a single range."""
+        return [(start, self.size if stop is None else stop)]
+
+    def close(self):
+        """Stop decompressing."""
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+
+def open_dataflash(file_path: str, **kwargs) -> DataFlashLog:
+    """
+    Open a log for the NumPy decoder.
+
+    Args:
+        file_path: Path to the .bin file, or a compressed log
+        **kwargs: Keyword arguments of DataFlashLog
+
+    Returns:
+        DataFlashLog, or CompressedDataFlashLog for a compressed log
+    """
+    if input_compression(file_path) is not None:
+        return CompressedDataFlashLog(file_path, **kwargs)
+    return DataFlashLog(file_path, **kwargs)
@@ -0,0 +1,109 @@
+"""
+Per-type decimation for ArduPilot bin to CSV conversion.
+
+High-rate message types can be reduced to a target rate while a log is
+decoded. Time is divided into buckets of 1 / rate seconds of the message
+timestamps; each bucket keeps its first message, or a single message with
+the mean, minimum or maximum of the numeric fields of all its messages.
+Each instance of a multi-instance type (e.g. IMU with I=0 and I=1) has
+buckets of its own, so the rate applies per sensor.
+"""
+
+import math
+from typing import Dict, Any, Optional
+
+from .align import INSTANCE_FIELDS
+
+
+# Aggregations of the messages of a bucket
+AGGREGATES = ('mean', 'min', 'max')
+
+# Fields kept from the first message of a bucket rather than aggregated
+FIRST_VALUE_FIELDS = ('timestamp', 'message_type', 'TimeUS') + INSTANCE_FIELDS
+
+
+def bucket_of(timestamp: float, rate: float) -> int:
+    """
+    Get the time bucket of a message.
+
+    Args:
+        timestamp: Message timestamp in seconds
+        rate: Target rate of the message type in Hz
+
+    Returns:
+        Bucket number
+    """
+    return math.floor(timestamp * rate)
+
+
+def is_aggregated(column: str, value) -> bool:
+    """True if a field value is a number that is aggregated over a bucket."""
+    return (column not in FIRST_VALUE_FIELDS and isinstance(value, (int, float))
+            and not isinstance(value, bool))
+
+
+class BucketAggregate:
+    """Running aggregate of the messages of one type instance in one time bucket."""
+
+    def __init__(self, how: str, message: Dict[str, Any], count: int = 1,
+                 values: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the aggregate.
+
+        Args:
+            how: One of AGGREGATES
+            message: First message of the bucket; fields that are not
+                aggregated keep its values
+            count: Number of messages already aggregated
+            values: Sum (for 'mean'), minimum or maximum of each aggregated
+                field over those messages; taken from message if None
+        """
+        if how not in AGGREGATES:
+            raise ValueError(f"Unknown aggregation '{how}', expected one of: {', '.join(AGGREGATES)}")
+        self.how = how
+        self.message = message
+        self.count = count
+        if values is None:
+            values = {column: value for column, value in message.items()
+                      if is_aggregated(column, value)}
+        self.values = values
+
+    def merge(self, other: 'BucketAggregate'):
+        """
+        Add the messages of an aggregate of the same bucket that follow this one.
+
+        Args:
+            other: Aggregate of the following messages
+        """
+        self.count += other.count
+        for column, value in other.values.items():
+            current = self.values.get(column)
+            if current is None:
+                self.values[column] = value
+            elif self.how == 'mean':
+                self.values[column] = current + value
+            elif self.how == 'min':
+                self.values[column] = min(current, value)
+            else:
+                self.values[column] = max(current, value)
+
+    def add(self, message: Dict[str, Any]):
+        """
+        Add one message of the bucket.
+
+        Args:
+            message: Message dictionary from BinFileParser.parse_messages
+        """
+        self.merge(BucketAggregate(self.how, message))
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Get the message standing for the whole bucket.
+
+        Returns:
+            Message dictionary with the timestamp of the first message
+        """
+        message = dict(self.message)
+        for column, value in self.values.items():
+            message[column] = value / self.count if self.how == 'mean' else value
+        return message
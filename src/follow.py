@@ -0,0 +1,178 @@
+"""
+Follow-mode state for ArduPilot binary logs that are still being written.
+
+A FollowState remembers how far a growing log has been decoded: the byte
+offset just after the last complete record, the FMT table and clock base read
+so far, the columns of the output and the sizes of the output files after the
+last pass. It is saved next to the output so a later run appends only the
+records written since, and so outputs left longer by an interrupted pass are
+cut back before appending.
+"""
+
+import os
+import json
+import hashlib
+from typing import Optional, List
+
+from .dataflash import LogFormat, FMT_TYPE, FMT_FORMAT
+
+
+FOLLOW_STATE_VERSION = 1
+
+FOLLOW_STATE_SUFFIX = '.follow.json'
+
+# Name of the state file inside the output directory of separate files
+FOLLOW_STATE_NAME = 'follow.json'
+
+# Bytes at the start of the log hashed to recognise the same log later
+HEAD_SIZE = 4096
+
+# Default seconds between two checks of a followed log
+DEFAULT_FOLLOW_INTERVAL = 1.0
+
+
+def follow_state_path(output_path: str, separate_by_type: bool = False) -> str:
+    """
+    Path of the follow state of an output.
+
+    Args:
+        output_path: Output file, or output directory of separate files
+        separate_by_type: True if output_path is a directory of per-type files
+
+    Returns:
+        <name>.follow.json next to an output file, or follow.json inside the
+        output directory
+    """
+    if separate_by_type:
+        return os.path.join(output_path, FOLLOW_STATE_NAME)
+    return os.path.splitext(output_path)[0] + FOLLOW_STATE_SUFFIX
+
+
+def head_digest(file_path: str, length: int = HEAD_SIZE) -> str:
+    """Hash the first length bytes of a file."""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read(length)).hexdigest()
+
+
+class FollowState:
+    """Position of a follow-mode conversion in a growing log."""
+
+    def __init__(self, file_path: str):
+        """
+        Initialize the state of a log that has not been decoded yet.
+
+        Args:
+            file_path: Path to the .bin file
+        """
+        self.file_path = file_path
+        # Byte offset just after the last complete record decoded
+        self.offset = 0
+        # FMT table keyed by type ID, read up to the end of the last pass
+        self.formats = None
+        # Tuple of (time base, initial timestamp) from DataFlashLog.clock_base
+        self.clock = None
+        # Header and float columns of a single output file
+        self.columns = None
+        self.float_columns = None
+        # Output file -> size in bytes after the last complete pass
+        self.outputs = {}
+        self.head = None
+
+    def matches(self, file_path: str) -> bool:
+        """True if the log at file_path is the one this state was saved for, grown or not."""
+        try:
+            size = os.path.getsize(file_path)
+            return size >= self.offset and (self.head is None or
+                                            head_digest(file_path, min(self.offset, HEAD_SIZE)) == self.head)
+        except OSError:
+            return False
+
+    def advance(self, offset: int):
+        """
+        Record a completed pass over the log.
+
+        Args:
+            offset: Byte offset just after the last complete record decoded
+        """
+        if self.offset < HEAD_SIZE:
+            self.head = head_digest(self.file_path, min(offset, HEAD_SIZE))
+        self.offset = offset
+
+    def record_outputs(self, paths: List[str]):
+        """
+        Remember the current size of output files.
+
+        Args:
+            paths: Output files written so far
+        """
+        for path in paths:
+            if os.path.isfile(path):
+                self.outputs[path] = os.path.getsize(path)
+
+    def truncate_outputs(self):
+        """Cut the output files back to their sizes after the last complete pass."""
+        for path, size in self.outputs.items():
+            if os.path.isfile(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def save(self, path: str):
+        """
+        Write the state to path atomically.
+
+        Args:
+            path: State file path
+        """
+        data = {
+            'version': FOLLOW_STATE_VERSION,
+            'file_path': os.path.abspath(self.file_path),
+            'offset': self.offset,
+            'head': self.head,
+            'clock': list(self.clock) if self.clock is not None else None,
+            'formats': ([fmt.to_dict() for fmt in self.formats.values() if fmt.type_id != FMT_TYPE]
+                        if self.formats is not None else None),
+            'columns': self.columns,
+            'float_columns': self.float_columns,
+            'outputs': self.outputs,
+        }
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.write('\n')
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, file_path: str) -> Optional['FollowState']:
+        """
+        Read the state saved for a log.
+
+        Args:
+            path: State file path
+            file_path: Path to the .bin file being followed
+
+        Returns:
+            FollowState, or None if there is no usable state for this log
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (data.get('version') != FOLLOW_STATE_VERSION
+                or data.get('file_path') != os.path.abspath(file_path)):
+            return None
+
+        state = cls(file_path)
+        state.offset = data['offset']
+        state.head = data['head']
+        state.clock = tuple(data['clock']) if data['clock'] is not None else None
+        if data['formats'] is not None:
+            state.formats = {FMT_TYPE: FMT_FORMAT}
+            for entry in data['formats']:
+                state.formats[entry['type_id']] = LogFormat.from_dict(entry)
+        state.columns = data['columns']
+        state.float_columns = data['float_columns']
+        state.outputs = data['outputs']
+        if not state.matches(file_path):
+            return None
+        return state
@@ -0,0 +1,269 @@
+"""
+Sidecar index for ArduPilot binary log files.
+
+A LogIndex stores the FMT table of a log, the byte offsets and counts of each
+message type, per-type first/last TimeUS, a coarse TimeUS-to-offset map and the
+log's clock base. It is saved
+next to the log as <name>.binidx and is only used while the log's size and
+modification time still match.
+"""
+
+import os
+import json
+import numpy as np
+from typing import Dict, Optional, Iterator, Tuple
+
+from .dataflash import DataFlashLog, LogFormat, FMT_TYPE, FMT_FORMAT
+
+
+INDEX_SUFFIX = '.binidx'
+INDEX_VERSION = 2
+
+# Number of records yielded per step when iterating through the index
+INDEX_BATCH_SIZE = 200000
+
+# Number of stamped records between two entries of the timestamp-to-offset map
+TIME_MAP_STEP = 1000
+
+
+def index_path(file_path: str) -> str:
+    """Path of the sidecar index of a log file."""
+    return os.path.splitext(file_path)[0] + INDEX_SUFFIX
+
+
+def _file_signature(file_path: str) -> Tuple[int, int]:
+    """Size and modification time (ns) identifying a version of a file."""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class LogIndex:
+    """Message offsets, counts and time bounds of a log file."""
+
+    def __init__(self, file_size: int, mtime_ns: int, formats: Dict[int, LogFormat],
+                 offsets: Dict[int, np.ndarray], time_bounds: Dict[int, Tuple[int, int]],
+                 timebase: float = 0.0, start_timestamp: float = 0.0,
+                 end_timestamp: float = 0.0, time_offsets: Optional[np.ndarray] = None,
+                 time_us: Optional[np.ndarray] = None):
+        """
+        Initialize the index.
+
+        Args:
+            file_size: Size of the indexed file in bytes
+            mtime_ns: Modification time of the indexed file in nanoseconds
+            formats: Message formats keyed by type ID
+            offsets: Byte offsets of the records of each type ID, in file order
+            time_bounds: First and last TimeUS of each type ID with a TimeUS field
+            timebase: Clock base of the log (see DataFlashLog.clock_base)
+            start_timestamp: Timestamp of the first message
+            end_timestamp: Timestamp of the last message
+            time_offsets: Byte offsets of every TIME_MAP_STEP-th record with TimeUS
+            time_us: TimeUS of the records at time_offsets
+        """
+        self.file_size = file_size
+        self.mtime_ns = mtime_ns
+        self.formats = formats
+        self.offsets = offsets
+        self.time_bounds = time_bounds
+        self.timebase = timebase
+        self.start_timestamp = start_timestamp
+        self.end_timestamp = end_timestamp
+        self.time_offsets = time_offsets if time_offsets is not None else np.zeros(0, dtype=np.int64)
+        self.time_us = time_us if time_us is not None else np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def build(cls, log: DataFlashLog) -> 'LogIndex':
+        """
+        Build the index of an open log with one header scan.
+
+        Args:
+            log: Open DataFlash log
+
+        Returns:
+            LogIndex of the log
+        """
+        file_size, mtime_ns = _file_signature(log.file_path)
+        timebase, start_timestamp = log.clock_base()
+        offset_type = np.uint32 if log.size < 2 ** 32 else np.uint64
+
+        parts = {}
+        samples = []
+        last_stamped = None
+        stamped = np.array([i in log.formats and log.formats[i].has_time_us for i in range(256)])
+        skip = 0
+        for offsets, ids in log.iter_records():
+            order = np.argsort(ids, kind='stable')
+            sorted_ids = ids[order]
+            bounds = np.flatnonzero(np.diff(sorted_ids)) + 1
+            for group in np.split(order, bounds):
+                parts.setdefault(int(ids[group[0]]), []).append(offsets[group].astype(offset_type))
+            with_time = np.flatnonzero(stamped[ids])
+            if len(with_time):
+                last_stamped = (int(ids[with_time[-1]]), int(offsets[with_time[-1]]))
+                sampled = with_time[skip::TIME_MAP_STEP]
+                samples.append((offsets[sampled], ids[sampled]))
+                skip = (skip - len(with_time)) % TIME_MAP_STEP
+
+        offsets = {type_id: np.concatenate(chunks) for type_id, chunks in parts.items()}
+
+        sample_offsets = np.zeros(0, dtype=np.int64)
+        sample_times = np.zeros(0, dtype=np.int64)
+        if samples:
+            sample_offsets = np.concatenate([sample[0] for sample in samples]).astype(np.int64)
+            sample_ids = np.concatenate([sample[1] for sample in samples])
+            sample_times = np.zeros(len(sample_offsets), dtype=np.int64)
+            for type_id in np.unique(sample_ids).tolist():
+                positions = np.flatnonzero(sample_ids == type_id)
+                records = log.decode(log.formats[type_id], sample_offsets[positions])
+                sample_times[positions] = records['f0']
+
+        time_bounds = {}
+        for type_id, type_offsets in offsets.items():
+            fmt = log.formats[type_id]
+            if 'TimeUS' not in fmt.column_index:
+                continue
+            ends = np.array([type_offsets[0], type_offsets[-1]], dtype=np.int64)
+            first, last = fmt.field_values(log.decode(fmt, ends), 'TimeUS')
+            time_bounds[type_id] = (first, last)
+
+        end_timestamp = start_timestamp
+        if last_stamped is not None:
+            type_id, offset = last_stamped
+            fmt = log.formats[type_id]
+            time_us = fmt.field_values(log.decode(fmt, np.array([offset])), 'TimeUS')[0]
+            end_timestamp = timebase + time_us * 0.000001
+
+        return cls(file_size, mtime_ns, dict(log.formats), offsets, time_bounds,
+                   timebase, start_timestamp, end_timestamp, sample_offsets, sample_times)
+
+    def matches(self, file_path: str) -> bool:
+        """True if the index still describes the file at file_path."""
+        try:
+            return _file_signature(file_path) == (self.file_size, self.mtime_ns)
+        except OSError:
+            return False
+
+    def save(self, path: str):
+        """
+        Write the index to path atomically.
+
+        Args:
+            path: Index file path
+        """
+        meta = {
+            'version': INDEX_VERSION,
+            'file_size': self.file_size,
+            'mtime_ns': self.mtime_ns,
+            'timebase': self.timebase,
+            'start_timestamp': self.start_timestamp,
+            'end_timestamp': self.end_timestamp,
+            'formats': [fmt.to_dict() for fmt in self.formats.values() if fmt.type_id != FMT_TYPE],
+            'time_bounds': {str(type_id): list(bounds) for type_id, bounds in self.time_bounds.items()},
+        }
+        arrays = {f'offsets_{type_id}': offsets for type_id, offsets in self.offsets.items()}
+        arrays['time_offsets'] = self.time_offsets
+        arrays['time_us'] = self.time_us
+        arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path: str) -> 'LogIndex':
+        """
+        Read an index written by save.
+
+        Args:
+            path: Index file path
+
+        Returns:
+            LogIndex
+
+        Raises:
+            ValueError: If the file is not a supported index
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+            if meta.get('version') != INDEX_VERSION:
+                raise ValueError(f"Unsupported index version in {path}")
+            offsets = {int(key[len('offsets_'):]): data[key]
+                       for key in data.files if key.startswith('offsets_')}
+            time_offsets = data['time_offsets']
+            time_us = data['time_us']
+
+        formats = {FMT_TYPE: FMT_FORMAT}
+        for entry in meta['formats']:
+            formats[entry['type_id']] = LogFormat.from_dict(entry)
+        time_bounds = {int(type_id): tuple(bounds) for type_id, bounds in meta['time_bounds'].items()}
+        return cls(meta['file_size'], meta['mtime_ns'], formats, offsets, time_bounds,
+                   meta['timebase'], meta['start_timestamp'], meta['end_timestamp'],
+                   time_offsets, time_us)
+
+    def message_counts(self) -> Dict[str, int]:
+        """
+        Get the number of messages of each type.
+
+        Returns:
+            Dictionary mapping message type to number of messages
+        """
+        counts = {}
+        for type_id, offsets in self.offsets.items():
+            name = self.formats[type_id].name
+            counts[name] = counts.get(name, 0) + len(offsets)
+        return counts
+
+    def iter_records(self, type_ids: Optional[set] = None, start: int = 0,
+                     stop: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Iterate through indexed records in file order.
+
+        Args:
+            type_ids: Type IDs to include (None for all)
+            start: Byte offset of the first record to include
+            stop: Byte offset before which records must start (None for the end)
+
+        Yields:
+            Tuples of (byte offsets, type IDs), like DataFlashLog.iter_records
+        """
+        selected = [type_id for type_id in self.offsets if type_ids is None or type_id in type_ids]
+        if not selected:
+            return
+        offsets = np.concatenate([self.offsets[type_id].astype(np.int64) for type_id in selected])
+        ids = np.concatenate([np.full(len(self.offsets[type_id]), type_id, dtype=np.uint8)
+                              for type_id in selected])
+        if start > 0 or stop is not None:
+            inside = offsets >= start
+            if stop is not None:
+                inside &= offsets < stop
+            offsets = offsets[inside]
+            ids = ids[inside]
+        order = np.argsort(offsets, kind='stable')
+        for start in range(0, len(order), INDEX_BATCH_SIZE):
+            batch = order[start:start + INDEX_BATCH_SIZE]
+            yield offsets[batch], ids[batch]
+
+
+def load_index(file_path: str) -> Optional[LogIndex]:
+    """
+    Load the sidecar index of a log if it exists and is up to date.
+
+    Args:
+        file_path: Path to the .bin file
+
+    Returns:
+        LogIndex, or None if there is no usable index
+    """
+    path = index_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        index = LogIndex.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return index if index.matches(file_path) else None
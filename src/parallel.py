@@ -0,0 +1,115 @@
+"""
+Process pool helpers for parallel conversion.
+
+Workers send their log records through a queue to the parent process, which
+hands each complete record to its own loggers, so output from several workers
+never interleaves mid-line.
+"""
+
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Optional
+
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    """
+    Get the number of worker processes to use.
+
+    Args:
+        jobs: Requested number of workers; 0 or None means one per CPU
+
+    Returns:
+        Number of worker processes
+    """
+    if not jobs:
+        return os.cpu_count() or 1
+    return jobs
+
+
+class _ForwardHandler(logging.Handler):
+    """Hand records received from workers to the parent's logger of the same name."""
+
+    def emit(self, record):
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+
+class _TaskFilter(logging.Filter):
+    """Prefix worker log messages with the name of the task being run."""
+
+    def __init__(self):
+        super().__init__()
+        self.task = None
+
+    def filter(self, record):
+        if self.task:
+            record.msg = f"[{self.task}] {record.getMessage()}"
+            record.args = None
+        return True
+
+
+_task_filter = _TaskFilter()
+
+
+def set_worker_task(task: Optional[str]):
+    """
+    Set the task name prefixed to the log messages of this worker.
+
+    Args:
+        task: Task name, e.g. the input file name (None to clear)
+    """
+    _task_filter.task = task
+
+
+def _init_worker(queue, log_level: int, initializer: Optional[Callable], initargs: tuple):
+    """Route all logging of a worker process to the parent's queue."""
+    handler = QueueHandler(queue)
+    handler.addFilter(_task_filter)
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(log_level)
+
+    # Loggers inherited from the parent may carry their own console handlers
+    for logger in logging.Logger.manager.loggerDict.values():
+        if isinstance(logger, logging.Logger):
+            logger.handlers = []
+            logger.propagate = True
+
+    if initializer is not None:
+        initializer(*initargs)
+
+
+class WorkerPool:
+    """Process pool whose workers log through the parent process."""
+
+    def __init__(self, jobs: int, log_level: int = logging.INFO,
+                 initializer: Optional[Callable] = None, initargs: tuple = ()):
+        """
+        Initialize the pool.
+
+        Args:
+            jobs: Number of worker processes
+            log_level: Logging level in the workers
+            initializer: Function run once in each worker after logging is set up
+            initargs: Arguments of initializer
+        """
+        context = multiprocessing.get_context()
+        self._queue = context.Queue()
+        self._listener = QueueListener(self._queue, _ForwardHandler())
+        self.executor = ProcessPoolExecutor(
+            max_workers=jobs, mp_context=context, initializer=_init_worker,
+            initargs=(self._queue, log_level, initializer, initargs))
+
+    def __enter__(self) -> ProcessPoolExecutor:
+        self._listener.start()
+        return self.executor
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.executor.shutdown(wait=True)
+        finally:
+            self._listener.stop()
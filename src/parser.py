@@ -1,25 +1,52 @@
 """
 Binary file parser for ArduPilot log files.
 
-This module handles the parsing of ArduPilot binary log files (.bin) using pymavlink.
+This module handles the parsing of ArduPilot binary log files (.bin) using pymavlink,
+or using the NumPy DataFlash decoder in dataflash.py. Compressed logs (.bin.gz,
+.bin.zst, .bin.xz) are always decoded by the NumPy decoder, from a stream.
 """
 
 import os
 import logging
-from typing import Generator, Dict, Any, Optional
+import pandas as pd
+from contextlib import nullcontext
+from typing import Generator, Dict, Any, Optional, Tuple, List
 from pymavlink import mavutil
+from .dataflash import (DataFlashLog, CompressedDataFlashLog, LogFormat, LogStatus, ValidationResult,
+                        validate_log, open_dataflash, CLOCK_MESSAGE_TYPES)
+from .compression import input_compression, is_log_file
+from .index import LogIndex, load_index, index_path
+from .decimate import BucketAggregate, bucket_of
+from .align import instance_field
+from .follow import FollowState
+
+
+# Available decode engines
+ENGINES = ('pymavlink', 'numpy')
 
 
 class BinFileParser:
     """Parser for ArduPilot binary log files."""
     
-    def __init__(self, log_level: int = logging.INFO):
+    def __init__(self, log_level: int = logging.INFO, engine: str = 'pymavlink',
+                 use_index: bool = False):
         """
         Initialize the parser.
         
         Args:
             log_level: Logging level for parser operations
+            engine: Decode engine, 'pymavlink' or 'numpy'
+            use_index: If True, read (and create on first scan) a .binidx sidecar
+                index next to each log
         """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of: {', '.join(ENGINES)}")
+        self.engine = engine
+        self.use_index = use_index
+        # ConversionStats of the conversion in progress, timing the parser's stages
+        self.stats = None
+        # pymavlink reader or DataFlashLog of the parse in progress
+        self._reader = None
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(log_level)
         
@@ -30,76 +57,135 @@ class BinFileParser:
             handler.setFormatter(formatter)
             self.logger.addHandler(handler)
     
-    def validate_bin_file(self, file_path: str) -> bool:
+    def _stage(self, name: str):
+        """Time a stage in the statistics of the conversion in progress, if any."""
+        return self.stats.stage(name) if self.stats is not None else nullcontext()
+    
+    def position(self) -> int:
+        """
+        Get the byte offset reached by the parse_messages generator in progress.
+        
+        Returns:
+            Offset of the record being decoded, or 0 if no parse is in progress.
+            For a compressed log, the offset in the compressed file of the
+            data decompressed so far
+        """
+        reader = self._reader
+        if reader is None:
+            return 0
+        if isinstance(reader, CompressedDataFlashLog):
+            return reader.compressed_position
+        if isinstance(reader, DataFlashLog):
+            return reader.position
+        return getattr(reader, 'offset', 0)
+    
+    def validate_bin_file(self, file_path: str, log: Optional[DataFlashLog] = None) -> ValidationResult:
         """
         Validate if the file is a valid ArduPilot binary log file.
         
+        Only the first few KB are read: the file must start with a DataFlash
+        record header of a FMT record, and a FMT-of-FMT record must describe
+        FMT records.
+        
         Args:
-            file_path: Path to the .bin file
+            file_path: Path to the .bin file, or a compressed log
+            log: Already opened log of the file, whose memory map is reused
             
         Returns:
-            True if valid, False otherwise
+            ValidationResult, true only if the file is valid
         """
         if not os.path.exists(file_path):
             self.logger.error(f"File not found: {file_path}")
-            return False
+            return ValidationResult(LogStatus.NOT_FOUND, "file not found")
             
-        if not file_path.lower().endswith('.bin'):
+        if not is_log_file(file_path):
             self.logger.warning(f"File does not have .bin extension: {file_path}")
             
         try:
-            # Try to open the file with mavutil
-            mlog = mavutil.mavlink_connection(file_path)
-            # Try to read first message to validate format
-            msg = mlog.recv_match()
-            if msg is None:
-                self.logger.error(f"No valid messages found in file: {file_path}")
-                return False
-            return True
-        except Exception as e:
+            with self._stage('validate'):
+                result = log.validate() if log is not None else validate_log(file_path)
+        except OSError as e:
             self.logger.error(f"Error validating file {file_path}: {e}")
-            return False
+            return ValidationResult(LogStatus.NOT_FOUND, str(e))
+        
+        if not result:
+            self.logger.error(f"Invalid binary log file {file_path} ({result.status.value}): {result.message}")
+        return result
     
-    def parse_messages(self, file_path: str, message_types: Optional[list] = None) -> Generator[Dict[str, Any], None, None]:
+    def open_log(self, file_path: str) -> DataFlashLog:
+        """
+        Open a log for the NumPy decoder after validating it.
+        
+        The validation reads the start of the log through the same memory map
+        (or decompressed stream) that is used for decoding.
+        
+        Args:
+            file_path: Path to the .bin file, or a compressed log
+            
+        Returns:
+            Open DataFlashLog, or CompressedDataFlashLog; the caller closes it
+            
+        Raises:
+            ValueError: If the file is not a valid binary log
+        """
+        log = open_dataflash(file_path) if os.path.isfile(file_path) else None
+        if not self.validate_bin_file(file_path, log):
+            if log is not None:
+                log.close()
+            raise ValueError(f"Invalid binary log file: {file_path}")
+        return log
+    
+    def parse_messages(self, file_path: str, message_types: Optional[list] = None,
+                       time_window: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                       fields: Optional[Dict[str, List[str]]] = None,
+                       rates: Optional[Dict[str, float]] = None,
+                       aggregate: Optional[str] = None) -> Generator[Dict[str, Any], None, None]:
         """
         Parse messages from a binary log file.
         
+        Compressed logs are decoded by the NumPy decoder whatever the engine,
+        as pymavlink needs a file it can memory-map.
+        
         Args:
-            file_path: Path to the .bin file
+            file_path: Path to the .bin file, or a compressed log
             message_types: List of message types to filter (None for all types)
+            time_window: Tuple of (first, last) TimeUS of the messages to parse,
+                either may be None. Messages without TimeUS take the TimeUS of
+                the message before them. Parsing stops once the window ends
+            fields: Dictionary mapping message type to the fields to include,
+                in addition to timestamp and message_type; types missing here
+                keep all fields
+            rates: Dictionary mapping message type to its target rate in Hz;
+                only the first message of each 1 / rate seconds bucket is kept
+            aggregate: 'mean', 'min' or 'max' to keep one message per bucket
+                aggregating the numeric fields of all its messages instead
             
         Yields:
             Dictionary containing message data
         """
-        if not self.validate_bin_file(file_path):
+        log = None
+        if self.engine == 'numpy' or input_compression(file_path) is not None:
+            log = self.open_log(file_path)
+        elif not self.validate_bin_file(file_path):
             raise ValueError(f"Invalid binary log file: {file_path}")
         
         self.logger.info(f"Starting to parse file: {file_path}")
         
         try:
-            mlog = mavutil.mavlink_connection(file_path)
-            message_count = 0
+            self._reader = log
+            if log is not None:
+                messages = self._parse_messages_numpy(log, message_types, time_window, fields,
+                                                      rates, aggregate)
+                if self.stats is not None:
+                    # Message dictionaries are built while decoding
+                    messages = self.stats.iterate(messages, 'decode')
+            else:
+                messages = self._parse_messages_pymavlink(file_path, message_types, time_window, fields,
+                                                          rates, aggregate)
             
-            while True:
-                msg = mlog.recv_match(type=message_types)
-                if msg is None:
-                    break
-                
+            message_count = 0
+            for msg_dict in messages:
                 message_count += 1
-                
-                # Convert message to dictionary
-                msg_dict = {
-                    'timestamp': getattr(msg, '_timestamp', 0),
-                    'message_type': msg.get_type(),
-                }
-                
-                # Add all message fields
-                for field in msg.get_fieldnames():
-                    try:
-                        msg_dict[field] = getattr(msg, field)
-                    except AttributeError:
-                        msg_dict[field] = None
-                
                 yield msg_dict
             
             self.logger.info(f"Parsed {message_count} messages from {file_path}")
@@ -107,6 +193,318 @@ class BinFileParser:
         except Exception as e:
             self.logger.error(f"Error parsing file {file_path}: {e}")
             raise
+        finally:
+            self._reader = None
+            if log is not None:
+                log.close()
+    
+    def _parse_messages_pymavlink(self, file_path: str, message_types: Optional[list] = None,
+                                  time_window: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                                  fields: Optional[Dict[str, List[str]]] = None,
+                                  rates: Optional[Dict[str, float]] = None,
+                                  aggregate: Optional[str] = None) -> Generator[Dict[str, Any], None, None]:
+        """
+        Parse messages one by one with pymavlink.
+        
+        pymavlink reads the file sequentially, so a time window skips the
+        messages before it without seeking. Rate-limited messages are dropped
+        or aggregated after pymavlink has decoded them, in buckets of their
+        type and instance.
+        
+        Args:
+            file_path: Path to the .bin file
+            message_types: List of message types to filter (None for all types)
+            time_window: Tuple of (first, last) TimeUS, either may be None
+            fields: Dictionary mapping message type to the fields to include
+            rates: Dictionary mapping message type to its target rate in Hz
+            aggregate: 'mean', 'min' or 'max', or None to keep the first message of each bucket
+            
+        Yields:
+            Dictionary containing message data
+        """
+        with self._stage('decode'):
+            mlog = mavutil.mavlink_connection(file_path)
+        self._reader = mlog
+        rates = rates or {}
+        # (type, instance) -> bucket of its last message, and BucketAggregate of its open bucket
+        buckets = {}
+        pending = {}
+        instance_fields = {}
+        selected_fields = {msg_type: set(names) for msg_type, names in (fields or {}).items()}
+        window_start, window_end = time_window or (None, None)
+        time_us = None
+        
+        while True:
+            with self._stage('decode'):
+                msg = mlog.recv_match(type=message_types)
+            if msg is None:
+                break
+            
+            if time_window is not None:
+                fieldnames = msg.get_fieldnames()
+                if fieldnames and fieldnames[0] == 'TimeUS':
+                    time_us = msg.TimeUS
+                if window_end is not None and time_us is not None and time_us > window_end:
+                    break
+                if window_start is not None and (time_us is None or time_us < window_start):
+                    continue
+            
+            # Convert message to dictionary
+            msg_type = msg.get_type()
+            msg_dict = {
+                'timestamp': getattr(msg, '_timestamp', 0),
+                'message_type': msg_type,
+            }
+            
+            bucket = None
+            if msg_type in rates:
+                if msg_type not in instance_fields:
+                    instance_fields[msg_type] = instance_field(msg.get_fieldnames())
+                instance = instance_fields[msg_type]
+                key = (msg_type, getattr(msg, instance, None) if instance is not None else None)
+                bucket = bucket_of(msg_dict['timestamp'], rates[msg_type])
+                new_bucket = bucket != buckets.get(key)
+                buckets[key] = bucket
+                if not new_bucket and aggregate is None:
+                    continue
+            
+            # Add the selected message fields
+            fieldnames = msg.get_fieldnames()
+            if msg_type in selected_fields:
+                fieldnames = [field for field in fieldnames if field in selected_fields[msg_type]]
+            for field in fieldnames:
+                try:
+                    msg_dict[field] = getattr(msg, field)
+                except AttributeError:
+                    msg_dict[field] = None
+            
+            if bucket is not None and aggregate is not None:
+                if not new_bucket:
+                    pending[key].add(msg_dict)
+                    continue
+                previous = pending.pop(key, None)
+                pending[key] = BucketAggregate(aggregate, msg_dict)
+                if previous is None:
+                    continue
+                msg_dict = previous.result()
+            
+            yield msg_dict
+        
+        for bucket in pending.values():
+            yield bucket.result()
+    
+    def _parse_messages_numpy(self, log: DataFlashLog, message_types: Optional[list] = None,
+                              time_window: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                              fields: Optional[Dict[str, List[str]]] = None,
+                              rates: Optional[Dict[str, float]] = None,
+                              aggregate: Optional[str] = None) -> Generator[Dict[str, Any], None, None]:
+        """
+        Parse messages by decoding each message type in bulk with NumPy.
+        
+        A time window is located with the index's timestamp-to-offset map, or
+        by binary searching the file, and only that region is decoded. With
+        fields, only the bytes of the selected fields are read.
+        
+        Args:
+            log: Open log from open_log
+            message_types: List of message types to filter (None for all types)
+            time_window: Tuple of (first, last) TimeUS, either may be None
+            fields: Dictionary mapping message type to the fields to include
+            rates: Dictionary mapping message type to its target rate in Hz
+            aggregate: 'mean', 'min' or 'max', or None to keep the first message of each bucket
+            
+        Yields:
+            Dictionary containing message data
+        """
+        index = self.get_index(log.file_path, log)
+        start = 0
+        if time_window is not None:
+            type_ids = None
+            if message_types is not None:
+                type_ids = log.type_ids(set(message_types) | CLOCK_MESSAGE_TYPES)
+            start, _ = log.window_offsets(*time_window, index=index, type_ids=type_ids)
+            self.logger.debug(f"Time window of {log.file_path} starts at byte {start}")
+        yield from log.iter_messages(message_types, index, start=start, time_window=time_window,
+                                     fields=fields, rates=rates, aggregate=aggregate)
+    
+    def follow_messages(self, file_path: str, state: FollowState,
+                        message_types: Optional[list] = None,
+                        time_window: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                        fields: Optional[Dict[str, List[str]]] = None) -> Generator[Dict[str, Any], None, None]:
+        """
+        Parse the messages appended to a growing log since the last call.
+        
+        Messages are decoded with the NumPy decoder, which resumes at the byte
+        offset kept in state, whatever the engine. The FMT table and clock
+        base are read on the first call, once the file holds its first FMT
+        record; later calls only look for FMT records in the appended bytes.
+        A record cut off at the end of the file is left for the next call.
+        state.formats and state.clock are set before the first message is
+        yielded; state.offset advances once all messages have been yielded.
+        
+        Args:
+            file_path: Path to the .bin file
+            state: Follow state of the log, updated in place
+            message_types: List of message types to filter (None for all types)
+            time_window: Tuple of (first, last) TimeUS of the messages to parse,
+                either may be None
+            fields: Dictionary mapping message type to the fields to include
+            
+        Yields:
+            Dictionary containing message data
+        """
+        log = DataFlashLog(file_path)
+        try:
+            if log.size <= state.offset:
+                return
+            if state.formats is None:
+                if log.validate().status is LogStatus.TRUNCATED:
+                    self.logger.debug(f"Waiting for the first FMT record of {file_path}")
+                    return
+                if not self.validate_bin_file(file_path, log):
+                    raise ValueError(f"Invalid binary log file: {file_path}")
+                formats = log.read_formats()
+            else:
+                formats = log.read_formats(state.offset, state.formats)
+            log.formats = state.formats = formats
+            if state.clock is None:
+                state.clock = log.clock_base()
+            
+            message_count = 0
+            # With a stop offset, decoding does not end early past the time window
+            for msg_dict in log.iter_messages(message_types, start=state.offset, stop=log.size,
+                                              clock=state.clock, time_window=time_window, fields=fields):
+                message_count += 1
+                yield msg_dict
+            
+            state.advance(log.end_offset)
+            self.logger.debug(f"Parsed {message_count} new messages from {file_path}, "
+                              f"now at byte {state.offset} of {log.size}")
+        finally:
+            log.close()
+    
+    def parse_frames(self, file_path: str, message_types: Optional[list] = None,
+                     time_window: Optional[Tuple[Optional[int], Optional[int]]] = None,
+                     fields: Optional[Dict[str, List[str]]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Parse the messages of types with TimeUS into one DataFrame per type.
+        
+        The numpy engine decodes each field of a type into one column without
+        building a dictionary per message. Types without TimeUS are skipped.
+        
+        Args:
+            file_path: Path to the .bin file
+            message_types: List of message types to include (None for all types)
+            time_window: Tuple of (first, last) TimeUS of the messages to parse,
+                either may be None
+            fields: Dictionary mapping message type to the fields to include
+            
+        Returns:
+            Dictionary mapping message type to a DataFrame with a timestamp
+            column followed by the message fields
+        """
+        if self.engine != 'numpy' and input_compression(file_path) is None:
+            messages = {}
+            for message in self.parse_messages(file_path, message_types, time_window, fields):
+                messages.setdefault(message['message_type'], []).append(message)
+            frames = {}
+            with self._stage('dataframe'):
+                for msg_type, type_messages in messages.items():
+                    frame = pd.DataFrame(type_messages).drop(columns='message_type')
+                    if 'TimeUS' in frame:
+                        frames[msg_type] = frame
+            return frames
+        
+        with self.open_log(file_path) as log:
+            index = self.get_index(file_path, log)
+            start = 0
+            if time_window is not None:
+                start, _ = log.window_offsets(*time_window, index=index,
+                                              type_ids=log.type_ids(message_types) if message_types else None)
+            self.logger.info(f"Decoding columns of {file_path}")
+            with self._stage('decode'):
+                columns = log.read_columns(message_types, index, start, time_window, fields)
+        with self._stage('dataframe'):
+            return {msg_type: pd.DataFrame(data) for msg_type, data in columns.items()}
+    
+    def get_index(self, file_path: str, log: Optional[DataFlashLog] = None) -> Optional[LogIndex]:
+        """
+        Get the sidecar index of a log, building and saving it if needed.
+        
+        Args:
+            file_path: Path to the .bin file
+            log: Already opened log of the file; used to build the index, and
+                given the FMT table of a loaded index
+            
+        Returns:
+            LogIndex, or None if the parser does not use indexes or the log
+            is compressed (its records are read in one pass, without seeking)
+        """
+        if not self.use_index or input_compression(file_path) is not None:
+            return None
+        
+        index = load_index(file_path)
+        if index is not None:
+            if log is not None:
+                log.formats = index.formats
+            return index
+        
+        self.logger.info(f"Building index for {file_path}")
+        if log is not None:
+            index = LogIndex.build(log)
+        else:
+            with DataFlashLog(file_path) as log:
+                index = LogIndex.build(log)
+        
+        path = index_path(file_path)
+        try:
+            index.save(path)
+        except OSError as e:
+            self.logger.warning(f"Could not write index {path}: {e}")
+        return index
+    
+    def get_message_formats(self, file_path: str) -> Dict[str, LogFormat]:
+        """
+        Get the message formats defined by the FMT records of the file.
+        
+        Only the FMT records are decoded, so this is much cheaper than a parse.
+        
+        Args:
+            file_path: Path to the .bin file
+            
+        Returns:
+            Dictionary mapping message type to its format, in definition order
+        """
+        index = self.get_index(file_path)
+        if index is not None:
+            formats = sorted(index.formats.values(), key=lambda fmt: fmt.offset)
+        else:
+            with open_dataflash(file_path) as log:
+                formats = sorted(log.formats.values(), key=lambda fmt: fmt.offset)
+        return {fmt.name: fmt for fmt in formats}
+    
+    def get_message_counts(self, file_path: str) -> Dict[str, int]:
+        """
+        Count the messages of each type in the binary log file.
+        
+        Only the FMT records and the 3-byte message headers are read; payloads
+        are skipped by their known length without being decoded.
+        
+        Args:
+            file_path: Path to the .bin file
+            
+        Returns:
+            Dictionary mapping message type to number of messages
+        """
+        with self.open_log(file_path) as log:
+            try:
+                index = self.get_index(file_path, log)
+                if index is not None:
+                    return index.message_counts()
+                return log.message_counts()
+            except Exception as e:
+                self.logger.error(f"Error counting message types in {file_path}: {e}")
+                raise
     
     def get_message_types(self, file_path: str) -> set:
         """
@@ -118,16 +516,11 @@ class BinFileParser:
         Returns:
             Set of unique message types
         """
-        message_types = set()
-        
         try:
-            for message in self.parse_messages(file_path):
-                message_types.add(message['message_type'])
+            return set(self.get_message_counts(file_path))
         except Exception as e:
             self.logger.error(f"Error getting message types from {file_path}: {e}")
             raise
-        
-        return message_types
     
     def get_file_info(self, file_path: str) -> Dict[str, Any]:
         """
@@ -154,6 +547,21 @@ class BinFileParser:
         
         info['file_size'] = os.path.getsize(file_path)
         
+        if self.use_index:
+            try:
+                with self.open_log(file_path) as log:
+                    index = self.get_index(file_path, log)
+                counts = index.message_counts()
+                info['message_types'] = set(counts)
+                info['total_messages'] = sum(counts.values())
+                if index.start_timestamp and index.end_timestamp:
+                    info['start_time'] = index.start_timestamp
+                    info['end_time'] = index.end_timestamp
+                    info['duration'] = index.end_timestamp - index.start_timestamp
+            except Exception as e:
+                self.logger.error(f"Error getting file info for {file_path}: {e}")
+            return info
+        
         try:
             first_timestamp = None
             last_timestamp = None
@@ -0,0 +1,188 @@
+"""
+Progress reporting for ArduPilot bin to CSV conversion.
+
+Progress is measured in bytes of the input log: the parser reports the byte
+offset it has reached, and a ProgressTracker turns it into Progress reports
+with the messages converted so far and an estimated time to completion.
+Reports are throttled so that a callback costs almost nothing: the clock is
+only read every PROGRESS_CHECK_MESSAGES messages, and a report is sent at most
+every PROGRESS_INTERVAL seconds.
+"""
+
+import time
+from typing import Callable, Optional, Iterable, Iterator
+
+
+# Least number of seconds between two progress reports
+PROGRESS_INTERVAL = 0.25
+
+# Messages between two checks of the clock while parsing
+PROGRESS_CHECK_MESSAGES = 2048
+
+
+class ConversionCancelled(BaseException):
+    """
+    Raised by a progress callback to stop the conversion in progress.
+
+    Like KeyboardInterrupt it is not an Exception, so it passes through the
+    error handling of the converter (which closes its output files) up to the
+    caller instead of being reported as a failed conversion.
+    """
+
+
+class Progress:
+    """Progress of a conversion or batch of conversions."""
+
+    def __init__(self, bytes_done: int, bytes_total: int, messages: int, elapsed: float,
+                 file_path: Optional[str] = None, files_done: int = 0, files_total: int = 1):
+        """
+        Initialize the report.
+
+        Args:
+            bytes_done: Bytes of the input parsed so far
+            bytes_total: Total bytes of the input
+            messages: Messages converted so far
+            elapsed: Seconds since the conversion started
+            file_path: File being converted
+            files_done: Files of a batch finished so far
+            files_total: Files of the batch
+        """
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        self.messages = messages
+        self.elapsed = elapsed
+        self.file_path = file_path
+        self.files_done = files_done
+        self.files_total = files_total
+
+    @property
+    def fraction(self) -> float:
+        """Part of the input parsed, from 0 to 1."""
+        if self.bytes_total <= 0:
+            return 0.0
+        return min(self.bytes_done / self.bytes_total, 1.0)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds until the conversion ends, or None before any progress."""
+        if self.bytes_done <= 0 or self.elapsed <= 0:
+            return None
+        return max(self.bytes_total - self.bytes_done, 0) * self.elapsed / self.bytes_done
+
+    def __repr__(self) -> str:
+        return (f"Progress({self.bytes_done}/{self.bytes_total} bytes, {self.messages} messages, "
+                f"{self.files_done}/{self.files_total} files)")
+
+
+class ProgressTracker:
+    """Throttled source of Progress reports for a callback."""
+
+    def __init__(self, callback: Callable[[Progress], None], bytes_total: int,
+                 file_path: Optional[str] = None, files_total: int = 1,
+                 interval: float = PROGRESS_INTERVAL):
+        """
+        Initialize the tracker and start the clock.
+
+        Args:
+            callback: Function called with each Progress report
+            bytes_total: Total bytes of the input
+            file_path: File being converted
+            files_total: Number of files of a batch
+            interval: Least number of seconds between two reports
+        """
+        self.callback = callback
+        self.bytes_total = bytes_total
+        self.file_path = file_path
+        self.files_total = files_total
+        self.interval = interval
+        self.bytes_done = 0
+        self.messages = 0
+        self.files_done = 0
+        # Messages of the files of a batch finished so far
+        self._finished_messages = 0
+        self._started = time.monotonic()
+        self._reported = None
+
+    def update(self, bytes_done: Optional[int] = None, messages: Optional[int] = None,
+               file_path: Optional[str] = None, force: bool = False):
+        """
+        Record progress, reporting it if the last report is old enough.
+
+        Args:
+            bytes_done: Bytes of the input parsed so far
+            messages: Messages converted so far
+            file_path: File being converted
+            force: If True, report even if the last report is recent
+        """
+        if bytes_done is not None:
+            self.bytes_done = min(bytes_done, self.bytes_total)
+        if messages is not None:
+            self.messages = messages
+        if file_path is not None:
+            self.file_path = file_path
+        now = time.monotonic()
+        if not force and self._reported is not None and now - self._reported < self.interval:
+            return
+        self._reported = now
+        self.callback(Progress(self.bytes_done, self.bytes_total, self.messages, now - self._started,
+                               self.file_path, self.files_done, self.files_total))
+
+    def iterate(self, messages: Iterable, position: Callable[[], int]) -> Iterator:
+        """
+        Report progress while messages are consumed.
+
+        Args:
+            messages: Message generator
+            position: Function giving the byte offset the parser has reached
+
+        Yields:
+            The messages
+        """
+        count = self.messages
+        check = count + PROGRESS_CHECK_MESSAGES
+        self.update(0, count, force=True)
+        for message in messages:
+            yield message
+            count += 1
+            if count >= check:
+                check = count + PROGRESS_CHECK_MESSAGES
+                self.update(position(), count)
+        self.messages = count
+
+    def file_callback(self, file_path: str, bytes_before: int) -> Callable[[Progress], None]:
+        """
+        Get a callback that reports the progress of one file of a batch as batch progress.
+
+        Args:
+            file_path: File of the batch
+            bytes_before: Bytes of the batch in the files finished before it
+
+        Returns:
+            Callback for the conversion of the file
+        """
+        def report(progress: Progress):
+            self.update(bytes_before + progress.bytes_done, self._finished_messages + progress.messages,
+                        file_path)
+        return report
+
+    def file_done(self, file_path: str, bytes_done: int, messages: int = 0):
+        """
+        Record a finished file of a batch and report it.
+
+        Args:
+            file_path: File of the batch
+            bytes_done: Bytes of the batch in the files finished so far
+            messages: Messages converted from the file
+        """
+        self.files_done += 1
+        self._finished_messages += messages
+        self.update(bytes_done, self._finished_messages, file_path, force=True)
+
+    def finish(self, messages: Optional[int] = None):
+        """
+        Report the end of the conversion.
+
+        Args:
+            messages: Messages converted in total, if known
+        """
+        self.update(self.bytes_total, messages, force=True)
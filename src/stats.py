@@ -0,0 +1,288 @@
+"""
+Stage timing and throughput statistics for ArduPilot bin to CSV conversion.
+
+A ConversionStats records the wall and CPU time spent in each stage of a
+conversion (validation, decoding, building message dictionaries, DataFrame
+construction, writing), along with the messages and bytes processed and the
+peak resident memory. Stages nest: the time of a stage entered inside another
+is counted only for the inner one, so the stage times add up to the time of
+the conversion.
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Iterable, Iterator
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Stages in the order they are reported:
+#   validate  - checking the file header and FMT records
+#   formats   - reading the FMT table and locating ranges before decoding
+#   decode    - pymavlink recv_match, or NumPy decoding and message dictionaries
+#   build     - building message dictionaries from pymavlink messages, and filtering
+#   dataframe - constructing DataFrames from message dictionaries
+#   align     - joining the per-type tables of aligned output
+#   write     - writing output files, including chunk DataFrames when streaming
+STAGES = ('validate', 'formats', 'decode', 'build', 'dataframe', 'align', 'write')
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Get the peak resident memory of this process and its finished children.
+
+    Returns:
+        Peak resident set size in bytes, or None where the resource module
+        is not available
+    """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def cpu_time() -> float:
+    """CPU time of this process and its finished children, in seconds."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+@contextmanager
+def profile_to(path: Optional[str]):
+    """
+    Run the body under cProfile and dump the profile to a file.
+
+    Args:
+        path: pstats file written when the body ends (None disables profiling)
+    """
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+class ConversionStats:
+    """Per-stage time, throughput and peak memory of one or more conversions."""
+
+    def __init__(self, file_path: Optional[str] = None):
+        """
+        Initialize the statistics and start the clock.
+
+        Args:
+            file_path: Path to the converted .bin file (None for a batch)
+        """
+        self.file_path = file_path
+        self.files = 0
+        self.messages = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_rss = None
+        # Stage name -> [wall seconds, CPU seconds, calls]
+        self.stages = {}
+        # Entered stages: [name, wall start, CPU start, wall of inner stages, CPU of inner stages]
+        self._stack = []
+        self._started = (time.perf_counter(), cpu_time())
+
+    def enter(self, name: str):
+        """
+        Start timing a stage; the enclosing stage stops counting until exit.
+
+        Args:
+            name: Stage name, one of STAGES
+        """
+        self._stack.append([name, time.perf_counter(), time.process_time(), 0.0, 0.0])
+
+    def exit(self):
+        """Stop timing the stage entered last."""
+        name, wall_start, cpu_start, inner_wall, inner_cpu = self._stack.pop()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+        totals[0] += wall - inner_wall
+        totals[1] += cpu - inner_cpu
+        totals[2] += 1
+        if self._stack:
+            self._stack[-1][3] += wall
+            self._stack[-1][4] += cpu
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time the body as a stage.
+
+        Args:
+            name: Stage name, one of STAGES
+        """
+        self.enter(name)
+        try:
+            yield
+        finally:
+            self.exit()
+
+    def iterate(self, iterable: Iterable, name: str) -> Iterator:
+        """
+        Time the production of each item of an iterable as a stage.
+
+        Only the time spent inside the iterable is counted, not the time the
+        consumer spends between items.
+
+        Args:
+            iterable: Iterable to time, e.g. a message generator
+            name: Stage name, one of STAGES
+
+        Yields:
+            The items of iterable
+        """
+        iterator = iter(iterable)
+        while True:
+            self.enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.exit()
+            yield item
+
+    def add_time(self, name: str, wall: float, cpu: float = 0.0, calls: int = 1):
+        """
+        Add time measured elsewhere, e.g. in a worker process, to a stage.
+
+        Args:
+            name: Stage name, one of STAGES
+            wall: Wall seconds
+            cpu: CPU seconds
+            calls: Number of timed calls
+        """
+        totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+        totals[0] += wall
+        totals[1] += cpu
+        totals[2] += calls
+
+    def finish(self, summary=None):
+        """
+        Stop the clock and record the totals of the conversion.
+
+        Args:
+            summary: ConversionSummary of the conversion, giving the messages
+                converted and the bytes read and written
+        """
+        wall_start, cpu_start = self._started
+        self.wall_time = time.perf_counter() - wall_start
+        self.cpu_time = cpu_time() - cpu_start
+        peak = peak_rss()
+        if peak is not None:
+            self.peak_rss = max(self.peak_rss or 0, peak)
+        if summary is not None:
+            self.files = 1
+            self.messages = summary.total_messages
+            self.bytes_read = summary.file_size
+            self.bytes_written = sum(summary.outputs.values())
+
+    def merge(self, other: 'ConversionStats'):
+        """
+        Add the stage times and counts of another conversion of a batch.
+
+        Args:
+            other: Statistics of the other conversion
+        """
+        for name, (wall, cpu, calls) in other.stages.items():
+            self.add_time(name, wall, cpu, calls)
+        self.files += other.files
+        self.messages += other.messages
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+        if other.peak_rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, other.peak_rss)
+
+    @property
+    def messages_per_second(self) -> float:
+        """Messages converted per second of wall time."""
+        return self.messages / self.wall_time if self.wall_time > 0 else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        """MB of input read per second of wall time."""
+        return self.bytes_read / (1024 * 1024) / self.wall_time if self.wall_time > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the statistics as a JSON-serialisable dictionary.
+
+        Returns:
+            Dictionary with the totals, throughput, peak memory and the wall
+            time, CPU time and calls of each stage
+        """
+        order = [name for name in STAGES if name in self.stages]
+        order += sorted(name for name in self.stages if name not in STAGES)
+        return {
+            'file_path': self.file_path,
+            'files': self.files,
+            'messages': self.messages,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'wall_time': round(self.wall_time, 6),
+            'cpu_time': round(self.cpu_time, 6),
+            'messages_per_second': round(self.messages_per_second, 1),
+            'mb_per_second': round(self.mb_per_second, 3),
+            'peak_rss': self.peak_rss,
+            'stages': {name: {'wall_time': round(self.stages[name][0], 6),
+                              'cpu_time': round(self.stages[name][1], 6),
+                              'calls': self.stages[name][2]}
+                       for name in order},
+        }
+
+    def format(self) -> str:
+        """
+        Format the statistics as a table for the console.
+
+        Returns:
+            Multi-line text, one line per stage followed by the totals
+        """
+        data = self.to_dict()
+        # Stages of conversions run in parallel processes add up to more than the elapsed time
+        staged = sum(stage[0] for stage in self.stages.values())
+        total = max(self.wall_time, staged)
+        lines = [f"{'Stage':<10} {'Wall (s)':>10} {'CPU (s)':>10} {'Wall %':>7}"]
+        for name, stage in data['stages'].items():
+            share = 100 * stage['wall_time'] / total if total > 0 else 0
+            lines.append(f"{name:<10} {stage['wall_time']:>10.3f} {stage['cpu_time']:>10.3f} {share:>6.1f}%")
+        other = self.wall_time - staged
+        if other > 0.0005:
+            share = 100 * other / total
+            lines.append(f"{'other':<10} {other:>10.3f} {'':>10} {share:>6.1f}%")
+        lines.append(f"{'total':<10} {self.wall_time:>10.3f} {self.cpu_time:>10.3f}")
+        lines.append(f"{self.messages} messages, {self.bytes_read / (1024 * 1024):.1f} MB read, "
+                     f"{self.bytes_written / (1024 * 1024):.1f} MB written: "
+                     f"{self.messages_per_second:,.0f} msgs/s, {self.mb_per_second:.2f} MB/s")
+        if self.peak_rss is not None:
+            lines.append(f"Peak memory: {self.peak_rss / (1024 * 1024):.1f} MB")
+        return '\n'.join(lines)
+
+    def save(self, path: str):
+        """
+        Write the statistics as JSON.
+
+        Args:
+            path: JSON file path
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write('\n')
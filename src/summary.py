@@ -0,0 +1,161 @@
+"""
+Conversion summaries for ArduPilot bin to CSV conversion.
+
+A ConversionSummary is filled in while a log is being converted, so the
+message counts, time range and file sizes of the log are known without
+parsing it again. It can be saved as a JSON manifest next to the output.
+"""
+
+import os
+import json
+from typing import Dict, Any, Optional
+
+from .compression import COMPRESSION_EXTENSIONS
+
+
+MANIFEST_SUFFIX = '.manifest.json'
+
+# Manifest file written inside the output directory of separate conversions
+MANIFEST_NAME = 'manifest.json'
+
+
+def manifest_path(output_path: str, separate_by_type: bool = False) -> str:
+    """
+    Path of the manifest of a conversion output.
+
+    Args:
+        output_path: Output file, or output directory for separate files
+        separate_by_type: True if output_path is a directory of per-type files
+
+    Returns:
+        Manifest file path
+    """
+    if separate_by_type:
+        return os.path.join(output_path, MANIFEST_NAME)
+    root, extension = os.path.splitext(output_path)
+    if extension in COMPRESSION_EXTENSIONS.values():
+        # flight.csv.gz -> flight.manifest.json
+        root = os.path.splitext(root)[0]
+    return root + MANIFEST_SUFFIX
+
+
+class ConversionSummary:
+    """Message counts, time range and sizes of one conversion."""
+
+    def __init__(self, file_path: str, output_format: str = 'csv'):
+        """
+        Initialize the summary.
+
+        Args:
+            file_path: Path to the converted .bin file
+            output_format: Output file format
+        """
+        self.file_path = file_path
+        self.file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+        self.output_format = output_format
+        self.message_counts = {}
+        self.start_time = None
+        self.end_time = None
+        self.outputs = {}
+
+    def update(self, message: Dict[str, Any]):
+        """
+        Count a converted message.
+
+        Args:
+            message: Message dictionary from BinFileParser.parse_messages
+        """
+        msg_type = message['message_type']
+        self.message_counts[msg_type] = self.message_counts.get(msg_type, 0) + 1
+        timestamp = message.get('timestamp', 0)
+        if timestamp and timestamp > 0:
+            if self.start_time is None:
+                self.start_time = timestamp
+            self.end_time = timestamp
+
+    def update_type(self, msg_type: str, count: int, first: Optional[float] = None,
+                    last: Optional[float] = None):
+        """
+        Count converted messages of one type in bulk.
+
+        Args:
+            msg_type: Message type
+            count: Number of converted messages of the type
+            first: Timestamp of the first of them
+            last: Timestamp of the last of them
+        """
+        self.message_counts[msg_type] = self.message_counts.get(msg_type, 0) + count
+        if first is not None and first > 0:
+            self.start_time = first if self.start_time is None else min(self.start_time, first)
+        if last is not None and last > 0:
+            self.end_time = last if self.end_time is None else max(self.end_time, last)
+
+    def merge(self, other: 'ConversionSummary'):
+        """
+        Add the messages of a summary covering a later part of the same log.
+
+        Args:
+            other: Summary of the following part
+        """
+        for msg_type, count in other.message_counts.items():
+            self.message_counts[msg_type] = self.message_counts.get(msg_type, 0) + count
+        if other.start_time is not None:
+            if self.start_time is None:
+                self.start_time = other.start_time
+            self.end_time = other.end_time
+
+    def add_output(self, path: str):
+        """
+        Record a written output file and its size.
+
+        Args:
+            path: Output file path
+        """
+        self.outputs[path] = os.path.getsize(path) if os.path.exists(path) else 0
+
+    @property
+    def total_messages(self) -> int:
+        """Number of converted messages."""
+        return sum(self.message_counts.values())
+
+    @property
+    def duration(self) -> float:
+        """Seconds between the first and last timestamped message."""
+        if self.start_time is None or self.end_time is None:
+            return 0
+        return self.end_time - self.start_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the summary as a JSON-serialisable dictionary.
+
+        The keys shared with BinFileParser.get_file_info have the same meaning.
+
+        Returns:
+            Dictionary with the summary
+        """
+        return {
+            'file_path': self.file_path,
+            'file_size': self.file_size,
+            'message_types': sorted(self.message_counts),
+            'message_counts': {msg_type: self.message_counts[msg_type]
+                               for msg_type in sorted(self.message_counts)},
+            'total_messages': self.total_messages,
+            'duration': self.duration,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'output_format': self.output_format,
+            'outputs': [{'path': path, 'size': size} for path, size in self.outputs.items()],
+            'output_size': sum(self.outputs.values()),
+        }
+
+    def save(self, path: str):
+        """
+        Write the summary as a JSON manifest.
+
+        Args:
+            path: Manifest file path
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write('\n')
@@ -0,0 +1,251 @@
+"""
+Synthetic ArduPilot DataFlash logs for tests and benchmarks.
+
+generate_log writes a valid .bin file of a chosen size: the FMT records of
+the generated types, a few PARM and MSG records, then IMU, GPS, ATT and BARO
+records (or any subset of them) at fixed rates with smoothly varying values.
+The records are built in bulk with the NumPy dtypes of dataflash.LogFormat and
+interleaved by TimeUS, so generating a log takes much less time than
+converting it.
+"""
+
+import numpy as np
+from typing import Dict, Any, Optional, List
+
+from .dataflash import LogFormat, FMT_FORMAT, HEAD1, HEAD2, HEADER_LENGTH
+
+
+# Message type -> (type ID, format characters, columns), as logged by ArduPilot 4.x
+SYNTHETIC_FORMATS = {
+    'PARM': (64, 'QNf', 'TimeUS,Name,Value'),
+    'MSG': (91, 'QZ', 'TimeUS,Message'),
+    'IMU': (130, 'QBffffffIIfBBHH', 'TimeUS,I,GyrX,GyrY,GyrZ,AccX,AccY,AccZ,EG,EA,T,GH,AH,GHz,AHz'),
+    'GPS': (131, 'QBBIHBcLLeffffB', 'TimeUS,I,Status,GMS,GWk,NSats,HDop,Lat,Lng,Alt,Spd,GCrs,VZ,Yaw,U'),
+    'ATT': (132, 'QccccCCffB', 'TimeUS,DesRoll,Roll,DesPitch,Pitch,DesYaw,Yaw,ErrRP,ErrYaw,AEKF'),
+    'BARO': (133, 'QBffcfIffB', 'TimeUS,I,Alt,Press,Temp,CRt,SMS,Offset,GndTemp,Health'),
+}
+
+# Messages per second of each generated type (per instance)
+DEFAULT_RATES = {'IMU': 400.0, 'ATT': 50.0, 'BARO': 20.0, 'GPS': 5.0}
+
+# Number of instances of multi-instance types
+DEFAULT_INSTANCES = {'IMU': 2, 'GPS': 1, 'BARO': 1}
+
+# Seconds of log generated per step; bounds the size of the temporary arrays
+GENERATE_STEP = 1.0
+
+# TimeUS of the first generated record (the time since boot at arming)
+START_TIME_US = 30000000
+
+GPS_WEEK = 2200
+GPS_START_MS = 300000000
+
+# Home position of the generated flight, in degrees and metres
+HOME_LAT = -35.3632621
+HOME_LNG = 149.1652374
+HOME_ALT = 584.0
+
+
+def synthetic_formats(types: Optional[List[str]] = None) -> Dict[str, LogFormat]:
+    """
+    Get the formats of generated message types.
+
+    Args:
+        types: Message types to generate (default: every type of SYNTHETIC_FORMATS)
+
+    Returns:
+        Dictionary mapping message type to its format, PARM and MSG first
+    """
+    names = ['PARM', 'MSG'] + [name for name in (types or SYNTHETIC_FORMATS)
+                               if name not in ('PARM', 'MSG')]
+    formats = {}
+    for name in names:
+        if name not in SYNTHETIC_FORMATS:
+            raise ValueError(f"Unknown synthetic message type '{name}', expected one of: "
+                             f"{', '.join(SYNTHETIC_FORMATS)}")
+        type_id, format, columns = SYNTHETIC_FORMATS[name]
+        length = HEADER_LENGTH + LogFormat(type_id, name, 0, format, columns.split(',')).dtype.itemsize
+        formats[name] = LogFormat(type_id, name, length, format, columns.split(','))
+    return formats
+
+
+def _record_bytes(fmt: LogFormat, values: Dict[str, Any], count: int) -> np.ndarray:
+    """
+    Encode records of one format.
+
+    Args:
+        fmt: Format of the records
+        values: Raw field values by column name (scaled fields already
+            multiplied out), arrays of count values or scalars
+        count: Number of records
+
+    Returns:
+        Array of shape (count, fmt.length) holding the encoded records
+    """
+    dtype = np.dtype([('head1', 'u1'), ('head2', 'u1'), ('type', 'u1')] + fmt.dtype.descr)
+    records = np.zeros(count, dtype=dtype)
+    records['head1'] = HEAD1
+    records['head2'] = HEAD2
+    records['type'] = fmt.type_id
+    for column, value in values.items():
+        records[f'f{fmt.column_index[column]}'] = value
+    return records.view(np.uint8).reshape(count, fmt.length)
+
+
+def _fmt_record(fmt: LogFormat) -> np.ndarray:
+    """Encode the FMT record defining a format."""
+    return _record_bytes(FMT_FORMAT, {
+        'Type': fmt.type_id,
+        'Length': fmt.length,
+        'Name': fmt.name.encode(),
+        'Format': fmt.format.encode(),
+        'Columns': ','.join(fmt.columns).encode(),
+    }, 1)
+
+
+def _interleave(blocks: List[tuple]) -> bytes:
+    """
+    Join blocks of records of several types into one stream ordered by TimeUS.
+
+    Args:
+        blocks: Tuples of (TimeUS array, encoded records array); records with
+            the same TimeUS keep the order of the blocks
+
+    Returns:
+        Encoded records in file order
+    """
+    times = np.concatenate([block[0] for block in blocks])
+    lengths = np.concatenate([np.full(len(block[0]), block[1].shape[1]) for block in blocks])
+    order = np.argsort(times, kind='stable')
+    starts = np.zeros(len(order), dtype=np.int64)
+    starts[order] = np.concatenate([[0], np.cumsum(lengths[order])[:-1]])
+    output = np.zeros(int(lengths.sum()), dtype=np.uint8)
+    first = 0
+    for _, records in blocks:
+        block_starts = starts[first:first + len(records)]
+        output[block_starts[:, None] + np.arange(records.shape[1])] = records
+        first += len(records)
+    return output.tobytes()
+
+
+def _type_values(name: str, times: np.ndarray, instance: int, rng: np.random.Generator) -> Dict[str, Any]:
+    """Generate smoothly varying field values of one type and instance."""
+    t = (times - START_TIME_US) * 1e-6
+    n = len(times)
+    noise = rng.standard_normal
+    if name == 'IMU':
+        return {
+            'TimeUS': times, 'I': instance,
+            'GyrX': 0.05 * np.sin(0.7 * t) + 0.002 * noise(n),
+            'GyrY': 0.05 * np.sin(0.5 * t + 1.0) + 0.002 * noise(n),
+            'GyrZ': 0.02 * np.sin(0.1 * t) + 0.002 * noise(n),
+            'AccX': 0.3 * np.sin(0.7 * t) + 0.05 * noise(n),
+            'AccY': 0.3 * np.cos(0.5 * t) + 0.05 * noise(n),
+            'AccZ': -9.80665 + 0.2 * np.sin(2.0 * t) + 0.05 * noise(n),
+            'EG': 0, 'EA': 0, 'T': 45.0 + 0.0001 * t + 0.01 * noise(n),
+            'GH': 1, 'AH': 1, 'GHz': 400, 'AHz': 400,
+        }
+    if name == 'GPS':
+        radius = 100.0 / 111320.0
+        return {
+            'TimeUS': times, 'I': instance, 'Status': 3,
+            'GMS': (GPS_START_MS + t * 1000).astype(np.int64) % (7 * 86400000),
+            'GWk': GPS_WEEK, 'NSats': 14, 'HDop': 70,
+            'Lat': np.round((HOME_LAT + radius * np.sin(0.05 * t)) * 1e7),
+            'Lng': np.round((HOME_LNG + radius * np.cos(0.05 * t)) * 1e7),
+            'Alt': np.round((HOME_ALT + 20.0 + 5.0 * np.sin(0.02 * t)) * 100),
+            'Spd': 5.0 + 0.1 * noise(n), 'GCrs': np.degrees(0.05 * t) % 360,
+            'VZ': 0.1 * np.cos(0.02 * t), 'Yaw': 0.0, 'U': 1,
+        }
+    if name == 'ATT':
+        roll = 15.0 * np.sin(0.7 * t)
+        pitch = 10.0 * np.sin(0.5 * t + 1.0)
+        yaw = np.degrees(0.05 * t) % 360
+        return {
+            'TimeUS': times,
+            'DesRoll': np.round(roll * 100), 'Roll': np.round((roll + 0.3 * noise(n)) * 100),
+            'DesPitch': np.round(pitch * 100), 'Pitch': np.round((pitch + 0.3 * noise(n)) * 100),
+            'DesYaw': np.round(yaw * 100), 'Yaw': np.round(yaw * 100),
+            'ErrRP': np.abs(0.01 * noise(n)), 'ErrYaw': np.abs(0.01 * noise(n)), 'AEKF': 3,
+        }
+    if name == 'BARO':
+        altitude = 20.0 + 5.0 * np.sin(0.02 * t) + 0.1 * noise(n)
+        return {
+            'TimeUS': times, 'I': instance, 'Alt': altitude,
+            'Press': 101325.0 - 12.0 * altitude, 'Temp': np.round((35.0 + 0.001 * t) * 100),
+            'CRt': 0.1 * np.cos(0.02 * t), 'SMS': (times // 1000) % (1 << 32),
+            'Offset': 0.0, 'GndTemp': 0.0, 'Health': 1,
+        }
+    raise ValueError(f"No values are generated for message type '{name}'")
+
+
+def generate_log(file_path: str, size: int, rates: Optional[Dict[str, float]] = None,
+                 instances: Optional[Dict[str, int]] = None, seed: int = 0) -> Dict[str, Any]:
+    """
+    Write a synthetic DataFlash log.
+
+    Args:
+        file_path: Output .bin file path
+        size: Approximate size of the log in bytes; generation stops after
+            the step that reaches it
+        rates: Messages per second of each generated type and instance,
+            e.g. {'IMU': 400, 'GPS': 5}; the keys choose the type mix
+            (default: DEFAULT_RATES)
+        instances: Number of instances of IMU, GPS and BARO
+            (default: DEFAULT_INSTANCES)
+        seed: Seed of the random noise added to the values
+
+    Returns:
+        Dictionary with the file size, duration in seconds and number of
+        messages of each type, FMT included
+    """
+    rates = dict(rates or DEFAULT_RATES)
+    instances = dict(DEFAULT_INSTANCES, **(instances or {}))
+    if any(rate <= 0 for rate in rates.values()):
+        raise ValueError(f"Message rates must be positive: {rates}")
+    formats = synthetic_formats(list(rates))
+    rng = np.random.default_rng(seed)
+    counts = {'FMT': len(formats) + 1}
+    counts.update({name: 0 for name in formats})
+
+    with open(file_path, 'wb') as f:
+        f.write(_fmt_record(FMT_FORMAT).tobytes())
+        for fmt in formats.values():
+            f.write(_fmt_record(fmt).tobytes())
+
+        parameters = [(b'LOG_BITMASK', 176126.0), (b'INS_ACCEL_FILTER', 20.0), (b'INS_GYRO_FILTER', 20.0)]
+        times = np.full(len(parameters), START_TIME_US, dtype=np.uint64)
+        f.write(_record_bytes(formats['PARM'], {'TimeUS': times,
+                                                'Name': [name for name, _ in parameters],
+                                                'Value': [value for _, value in parameters]},
+                              len(parameters)).tobytes())
+        f.write(_record_bytes(formats['MSG'], {'TimeUS': START_TIME_US,
+                                               'Message': b'ArduCopter V4.5.0 (synthetic)'}, 1).tobytes())
+        counts['PARM'] = len(parameters)
+        counts['MSG'] = 1
+        written = f.tell()
+
+        step_us = int(GENERATE_STEP * 1000000)
+        step_start = START_TIME_US
+        while written < size:
+            blocks = []
+            for name, rate in rates.items():
+                period = 1000000.0 / rate
+                first = int(np.ceil((step_start - START_TIME_US) / period))
+                last = int(np.ceil((step_start + step_us - START_TIME_US) / period))
+                times = (START_TIME_US + np.arange(first, last) * period).astype(np.uint64)
+                for instance in range(instances.get(name, 1)):
+                    # Instances are logged one after the other at each sample time
+                    values = _type_values(name, times, instance, rng)
+                    blocks.append((times, _record_bytes(formats[name], values, len(times))))
+                    counts[name] += len(times)
+            data = _interleave(blocks)
+            f.write(data)
+            written += len(data)
+            step_start += step_us
+
+    return {
+        'file_size': written,
+        'duration': (step_start - START_TIME_US) / 1000000,
+        'message_counts': {name: count for name, count in counts.items() if count},
+    }
@@ -0,0 +1,281 @@
+"""
+Watch-folder conversion of ArduPilot binary log files.
+
+A FolderWatcher polls a directory for .bin files, waits until the size and
+modification time of a file have stopped changing, and converts it with
+BinToCsvConverter.convert in a bounded pool of worker processes. An asyncio
+scheduler runs the polling, a bounded queue between polling and conversion,
+and the workers; when the queue is full, polling waits, so a burst of new
+logs never piles up more than the queue size of pending conversions.
+"""
+
+import os
+import json
+import time
+import signal
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
+
+from .converter import BinToCsvConverter
+from .writers import OUTPUT_EXTENSIONS
+from .compression import LOG_EXTENSIONS, strip_compression
+
+
+# Seconds between two scans of the watched directory
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Seconds a file's size and modification time must stay unchanged before it is converted
+DEFAULT_SETTLE_TIME = 5.0
+
+# Largest number of files waiting for a worker
+DEFAULT_QUEUE_SIZE = 100
+
+# Seconds between two statistics reports
+DEFAULT_STATS_INTERVAL = 60.0
+
+# Extensions of the log files picked up by the watcher, plain or compressed
+WATCH_EXTENSIONS = LOG_EXTENSIONS
+
+
+class FolderWatcher:
+    """Convert the logs that appear in a directory as they are finished."""
+
+    def __init__(self, converter: BinToCsvConverter, watch_dir: str, output_dir: str,
+                 options: Optional[Dict[str, Any]] = None, workers: int = 1,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 settle_time: float = DEFAULT_SETTLE_TIME,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 recursive: bool = False,
+                 status_file: Optional[str] = None,
+                 stats_interval: float = DEFAULT_STATS_INTERVAL):
+        """
+        Initialize the watcher.
+
+        Args:
+            converter: Converter whose settings the workers use
+            watch_dir: Directory to watch for .bin files
+            output_dir: Directory receiving the outputs; subdirectories of
+                watch_dir are mirrored when watching recursively
+            options: Keyword arguments of BinToCsvConverter.convert
+            workers: Number of worker processes
+            poll_interval: Seconds between two scans of watch_dir
+            settle_time: Seconds a file must stay unchanged before it is converted
+            queue_size: Largest number of files waiting for a worker
+            recursive: If True, also watch the subdirectories of watch_dir
+            status_file: Optional JSON file rewritten with the statistics at
+                every report
+            stats_interval: Seconds between two statistics reports
+        """
+        self.converter = converter
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.options = dict(options or {})
+        self.options.setdefault('output_format', 'csv')
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.queue_size = queue_size
+        self.recursive = recursive
+        self.status_file = status_file
+        self.stats_interval = stats_interval
+        self.logger = converter.logger
+
+        self.converted = 0
+        self.failed = 0
+        self.bytes_converted = 0
+        self.in_progress = 0
+        self.queue = None
+        self._started = time.monotonic()
+        self._stopping = False
+        # Path -> (size, mtime_ns) and time the file was first seen with it
+        self._candidates = {}
+        # Path -> (size, mtime_ns) of the version converted, or that failed
+        self._done = {}
+        self._queued = set()
+
+    def output_path(self, input_file: str) -> str:
+        """Output path of a watched file."""
+        relative = os.path.relpath(input_file, self.watch_dir)
+        base_name = os.path.splitext(strip_compression(relative))[0]
+        return os.path.join(self.output_dir, base_name + OUTPUT_EXTENSIONS[self.options['output_format']])
+
+    def _list_files(self) -> List[str]:
+        """List the log files in the watched directory."""
+        paths = []
+        for root, dirs, files in os.walk(self.watch_dir):
+            if not self.recursive:
+                dirs[:] = []
+            else:
+                # Never descend into the output or cache directories
+                dirs[:] = [name for name in dirs if not name.startswith('.')
+                           and os.path.abspath(os.path.join(root, name)) != os.path.abspath(self.output_dir)]
+            paths.extend(os.path.join(root, name) for name in sorted(files)
+                         if name.lower().endswith(WATCH_EXTENSIONS))
+        return paths
+
+    def _is_converted(self, input_file: str, stat: os.stat_result) -> bool:
+        """True if the output of a file exists and is newer than the file."""
+        output_path = self.output_path(input_file)
+        return os.path.exists(output_path) and os.stat(output_path).st_mtime_ns >= stat.st_mtime_ns
+
+    def scan(self) -> List[str]:
+        """
+        Scan the watched directory once.
+
+        Returns:
+            Files that have stopped changing and still need converting
+        """
+        now = time.monotonic()
+        ready = []
+        seen = set()
+        for path in self._list_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            seen.add(path)
+            if path in self._queued or self._done.get(path) == signature:
+                continue
+            if path not in self._done and path not in self._candidates and self._is_converted(path, stat):
+                self._done[path] = signature
+                continue
+
+            candidate = self._candidates.get(path)
+            if candidate is None or candidate[0] != signature:
+                self._candidates[path] = (signature, now)
+            elif now - candidate[1] >= self.settle_time and stat.st_size > 0:
+                del self._candidates[path]
+                ready.append(path)
+
+        for path in list(self._candidates):
+            if path not in seen:
+                del self._candidates[path]
+        return ready
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the current statistics of the watcher.
+
+        Returns:
+            Dictionary with the queue depth, files settling, in progress,
+            converted and failed, and the throughput since the start
+        """
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'settling': len(self._candidates),
+            'in_progress': self.in_progress,
+            'converted': self.converted,
+            'failed': self.failed,
+            'bytes_converted': self.bytes_converted,
+            'uptime': round(elapsed, 1),
+            'files_per_minute': round(self.converted * 60 / elapsed, 3),
+            'mb_per_second': round(self.bytes_converted / (1024 * 1024) / elapsed, 3),
+        }
+
+    def report(self):
+        """Log the statistics and write the status file."""
+        stats = self.stats()
+        self.logger.info(f"Watch: {stats['queue_depth']} queued, {stats['in_progress']} converting, "
+                         f"{stats['settling']} settling, {stats['converted']} converted, "
+                         f"{stats['failed']} failed, {stats['files_per_minute']} files/min, "
+                         f"{stats['mb_per_second']} MB/s")
+        if self.status_file:
+            try:
+                temp_path = self.status_file + '.tmp'
+                with open(temp_path, 'w') as f:
+                    json.dump(stats, f, indent=2)
+                    f.write('\n')
+                os.replace(temp_path, self.status_file)
+            except OSError as e:
+                self.logger.warning(f"Could not write status file {self.status_file}: {e}")
+
+    def stop(self):
+        """Stop scanning; files already queued are still converted."""
+        if not self._stopping:
+            self.logger.info("Stopping watch, finishing queued files")
+        self._stopping = True
+
+    async def run(self, once: bool = False):
+        """
+        Watch and convert until stopped.
+
+        Args:
+            once: If True, return once every file found has been converted
+                instead of watching for new files
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.queue = asyncio.Queue(self.queue_size)
+        self._started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        self.logger.info(f"Watching {self.watch_dir} with {self.workers} workers, "
+                         f"writing to {self.output_dir}")
+        with self.converter.worker_pool(self.workers) as executor:
+            tasks = [asyncio.create_task(self._work(executor)) for _ in range(self.workers)]
+            tasks.append(asyncio.create_task(self._report_periodically()))
+            try:
+                await self._poll(once)
+                await self.queue.join()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self.report()
+
+    async def _poll(self, once: bool):
+        """Scan the directory and queue finished files, waiting while the queue is full."""
+        while not self._stopping:
+            for path in self.scan():
+                self._queued.add(path)
+                self.logger.debug(f"Queued {path}")
+                await self.queue.put(path)
+                if self._stopping:
+                    return
+            if once and not self._candidates:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def _work(self, executor):
+        """Convert queued files one at a time in a worker process."""
+        while True:
+            path = await self.queue.get()
+            self.in_progress += 1
+            try:
+                success, signature = await self._convert(executor, path)
+            finally:
+                self.in_progress -= 1
+                self._queued.discard(path)
+                self.queue.task_done()
+            self._done[path] = signature
+            if success:
+                self.converted += 1
+                self.bytes_converted += signature[0]
+            else:
+                self.failed += 1
+
+    async def _convert(self, executor, path: str) -> Tuple[bool, Tuple[int, int]]:
+        """Convert one file, returning its success and the converted version."""
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_size, stat.st_mtime_ns)
+            output_path = self.output_path(path)
+            if os.path.dirname(output_path):
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            future = self.converter.submit_convert(executor, path, output_path, self.options)
+            return await asyncio.wrap_future(future), signature
+        except Exception as e:
+            self.logger.error(f"Error processing {path}: {e}")
+            return False, self._done.get(path, (0, 0))
+
+    async def _report_periodically(self):
+        """Report the statistics every stats_interval seconds."""
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            self.report()
@@ -0,0 +1,927 @@
+"""
+Incremental output writers for ArduPilot bin to CSV conversion.
+
+This module provides writers that append messages to their output files in
+small batches while a log is being parsed, so memory does not grow with the
+length of the log. CSV output can be compressed as it is written (see
+compression.py). Besides CSV, messages can be written to Parquet, Feather
+(Arrow IPC) and HDF5 tables whose column types follow the FMT definitions.
+The same column types keep the DataFrames built from messages compact
+(see typed_frame), and CSV chunks are formatted in bulk from them
+(see csvformat.py).
+"""
+
+import os
+import array
+import shutil
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+from .dataflash import FORMAT_TO_DTYPE, INTEGER_FORMATS, STRING_FORMATS, LogFormat
+from .compression import open_output, compressed_path
+from .csvformat import write_csv, write_header
+
+
+# Number of messages buffered before a streamed chunk is written
+DEFAULT_CHUNK_SIZE = 100000
+
+# Maximum number of output files kept open at the same time
+DEFAULT_MAX_OPEN_FILES = 64
+
+# Number of messages buffered per message type before they are written
+DEFAULT_TYPE_BUFFER_SIZE = 5000
+
+OUTPUT_FORMATS = ('csv', 'parquet', 'feather', 'hdf5')
+
+OUTPUT_EXTENSIONS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'hdf5': '.h5',
+}
+
+FORMAT_NAMES = {
+    'csv': 'CSV',
+    'parquet': 'Parquet',
+    'feather': 'Feather',
+    'hdf5': 'HDF5',
+}
+
+# Key of the table in HDF5 files holding messages of several types
+HDF5_KEY = 'messages'
+
+# Buffer size used when appending part files
+PART_COPY_SIZE = 4 * 1024 * 1024
+
+# Column kinds that are not NumPy dtypes
+BYTES_COLUMN = 'bytes'
+ARRAY_COLUMN = 'array'
+OBJECT_COLUMN = 'object'
+
+# Column types of scaled fields, whose raw integers are multiplied on decode.
+# float32 cannot hold centi-units (c, C, e, E) or 1e-7 degrees (L) exactly.
+SCALED_FORMAT_DTYPES = {
+    'c': 'float64',
+    'C': 'float64',
+    'e': 'float64',
+    'E': 'float64',
+    'L': 'float64',
+}
+
+
+def column_union(formats: Iterable[LogFormat]) -> Tuple[List[str], List[str]]:
+    """
+    Work out the columns of a table holding messages of several formats.
+
+    Args:
+        formats: Message formats in definition order
+
+    Returns:
+        Tuple of (column names, integer columns to write as floats). Integer
+        fields missing from some formats are written as floats, as pandas
+        does for the same table built in one piece.
+    """
+    columns = ['timestamp', 'message_type']
+    formats = list(formats)
+    kinds = {}
+    for fmt in formats:
+        for i, column in enumerate(fmt.columns):
+            if column not in kinds:
+                columns.append(column)
+                kinds[column] = set()
+            char = fmt.format[i] if i < len(fmt.format) else None
+            kinds[column].add(char in INTEGER_FORMATS if char else False)
+
+    float_columns = []
+    for column, integer in kinds.items():
+        present_in_all = all(column in fmt.columns for fmt in formats)
+        if integer == {True} and not present_in_all:
+            float_columns.append(column)
+    return columns, float_columns
+
+
+def type_columns(fmt: LogFormat) -> List[str]:
+    """Columns of a table holding messages of a single format."""
+    return ['timestamp', 'message_type'] + list(dict.fromkeys(fmt.columns))
+
+
+def field_dtype(fmt: LogFormat, index: int) -> str:
+    """
+    Column type of one field of a format, as written to columnar outputs.
+
+    Integer fields keep their FMT width, float fields their precision and
+    scaled fields take their SCALED_FORMAT_DTYPES type. Strings are 'U<size>' with the FMT field
+    size; FILE data and int16 arrays use the BYTES_COLUMN and ARRAY_COLUMN kinds.
+
+    Args:
+        fmt: Message format
+        index: Field index
+
+    Returns:
+        NumPy dtype string or column kind
+    """
+    if index >= len(fmt.format):
+        return OBJECT_COLUMN
+    char = fmt.format[index]
+    dtype, multiplier = FORMAT_TO_DTYPE[char]
+    if char == 'a':
+        return ARRAY_COLUMN
+    if char in STRING_FORMATS:
+        if char == 'Z' and fmt.name == 'FILE':
+            return BYTES_COLUMN
+        return f'U{np.dtype(dtype).itemsize}'
+    if char in SCALED_FORMAT_DTYPES:
+        return SCALED_FORMAT_DTYPES[char]
+    if multiplier is not None:
+        return 'float64'
+    return np.dtype(dtype).name
+
+
+def column_dtypes(formats: Iterable[LogFormat]) -> Dict[str, str]:
+    """
+    Work out the column types of a table holding messages of several formats.
+
+    Args:
+        formats: Message formats in definition order
+
+    Returns:
+        Dictionary mapping column name to NumPy dtype string or column kind.
+        Numeric columns missing from some formats become floats so they can
+        hold NaN; columns mixing strings and numbers become OBJECT_COLUMN.
+    """
+    formats = list(formats)
+    kinds = {'timestamp': ['float64'], 'message_type': ['U4']}
+    for fmt in formats:
+        for column, index in fmt.column_index.items():
+            kinds.setdefault(column, []).append(field_dtype(fmt, index))
+
+    dtypes = {'timestamp': 'float64', 'message_type': 'U4'}
+    for column, column_kinds in kinds.items():
+        if column in dtypes:
+            continue
+        present_in_all = all(column in fmt.column_index for fmt in formats)
+        unique = set(column_kinds)
+        if all(kind.startswith('U') for kind in unique):
+            dtypes[column] = f'U{max(int(kind[1:]) for kind in unique)}'
+        elif len(unique) == 1 and (present_in_all or unique & {BYTES_COLUMN, ARRAY_COLUMN}):
+            dtypes[column] = column_kinds[0]
+        elif not unique & {BYTES_COLUMN, ARRAY_COLUMN, OBJECT_COLUMN} and \
+                not any(kind.startswith('U') for kind in unique):
+            dtype = np.result_type(*unique)
+            if not present_in_all and dtype.kind in 'iu':
+                dtype = np.dtype('float64')
+            dtypes[column] = dtype.name
+        else:
+            dtypes[column] = OBJECT_COLUMN
+    return dtypes
+
+
+def typed_column(values: List[Any], kind: Optional[str] = None) -> pd.Series:
+    """
+    Build a column of message values with a compact type.
+
+    The values are first typed as pandas would type them, then narrowed to
+    kind if that keeps every value: integers to a smaller integer type,
+    floats to float32. Values that do not fit kind (e.g. aggregated means of
+    integer fields) keep the type pandas gives them.
+
+    Args:
+        values: Values of one field, None where a message lacks it
+        kind: Column type from column_dtypes, or None to keep the inferred type
+
+    Returns:
+        Column of the values
+    """
+    column = pd.Series(values)
+    if kind is None or kind in (BYTES_COLUMN, ARRAY_COLUMN, OBJECT_COLUMN) or kind.startswith('U'):
+        return column
+    dtype = np.dtype(kind)
+    if column.dtype.kind in 'iu' and dtype.kind in 'iu' and column.dtype != dtype:
+        limits = np.iinfo(dtype)
+        if len(column) == 0 or (column.min() >= limits.min and column.max() <= limits.max):
+            return column.astype(dtype)
+    elif column.dtype.kind == 'f' and dtype.kind == 'f' and dtype.itemsize < column.dtype.itemsize:
+        values = column.to_numpy()
+        narrowed = values.astype(dtype)
+        if np.array_equal(narrowed, values, equal_nan=True):
+            return pd.Series(narrowed)
+    return column
+
+
+def typed_frame(messages: List[Dict[str, Any]], columns: Optional[List[str]] = None,
+                dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Build a DataFrame of messages with compact column types.
+
+    Unlike pd.DataFrame(messages), each column is typed from the FMT
+    definitions with typed_column, e.g. uint8 for B fields and float32 for f
+    fields, instead of int64, float64 or object.
+
+    Args:
+        messages: Message dictionaries from BinFileParser.parse_messages
+        columns: Columns of the frame (default: the message keys in order of
+            first appearance, as pd.DataFrame(messages) orders them)
+        dtypes: Column types from column_dtypes; columns missing here keep
+            the types pandas infers
+
+    Returns:
+        DataFrame with one row per message
+    """
+    if columns is None:
+        columns = list(dict.fromkeys(key for message in messages for key in message))
+    dtypes = dtypes or {}
+    data = {column: typed_column([message.get(column) for message in messages], dtypes.get(column))
+            for column in columns}
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def _arrow_type(pa, kind: str):
+    """Arrow type of a column kind from column_dtypes."""
+    if kind.startswith('U') or kind == OBJECT_COLUMN:
+        return pa.string()
+    if kind == BYTES_COLUMN:
+        return pa.binary()
+    if kind == ARRAY_COLUMN:
+        return pa.list_(pa.int16())
+    return pa.from_numpy_dtype(np.dtype(kind))
+
+
+def output_extension(output_format: str, compression: Optional[str] = None) -> str:
+    """
+    File extension of an output format, e.g. '.csv' or '.csv.gz'.
+
+    Args:
+        output_format: One of OUTPUT_FORMATS
+        compression: Compression of CSV output, one of COMPRESSIONS, or None
+
+    Returns:
+        Extension of the output files
+    """
+    return compressed_path(OUTPUT_EXTENSIONS[output_format], compression)
+
+
+def _import_pyarrow(output_format: str):
+    """Import pyarrow, explaining which output format needs it."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(f"pyarrow is required for {FORMAT_NAMES[output_format]} output "
+                          f"(pip install pyarrow)") from None
+    return pyarrow
+
+
+def widen_csv(path: str, columns: List[str], float_columns: Optional[List[str]] = None,
+              chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Rewrite a CSV table with more columns, as if written with them from the start.
+
+    Values are copied as text; new columns are left empty and integer columns
+    that became float columns are written as floats.
+
+    Args:
+        path: CSV file with a header row
+        columns: New columns of the table, a superset of the current ones
+        float_columns: Integer columns written as floats in the new table
+        chunk_size: Number of rows rewritten at a time
+    """
+    temp_path = path + '.tmp'
+    header = True
+    with open(temp_path, 'w', newline='') as output:
+        for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+            chunk = chunk.reindex(columns=columns, fill_value='')
+            for column in float_columns or []:
+                chunk[column] = pd.to_numeric(chunk[column]).astype('float64')
+            chunk.to_csv(output, index=False, header=header)
+            header = False
+        if header:
+            pd.DataFrame(columns=columns).to_csv(output, index=False)
+    os.replace(temp_path, path)
+
+
+class CsvWriter:
+    """Write messages of several types to one CSV table in fixed-size chunks."""
+
+    def __init__(self, path: str, columns: List[str], float_columns: Optional[List[str]] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, header: bool = True,
+                 append: bool = False, compression: Optional[str] = None,
+                 compress_level: Optional[int] = None, dtypes: Optional[Dict[str, str]] = None,
+                 float_precision: Optional[Dict[str, int]] = None):
+        """
+        Initialize the writer.
+
+        The file is created when the first chunk is written.
+
+        Args:
+            path: Output CSV file path
+            columns: Columns of the table
+            float_columns: Integer columns written as floats
+            chunk_size: Number of messages buffered before a chunk is written
+            header: If True, write the header row before the first chunk
+            append: If True, add rows to an existing file written with the
+                same columns instead of replacing it; the header is only
+                written if the file is empty
+            compression: Compress the file with one of COMPRESSIONS as it is written
+            compress_level: Compression level (default: DEFAULT_COMPRESS_LEVELS)
+            dtypes: Column types from column_dtypes used to build the chunks;
+                columns missing here keep the types pandas infers
+            float_precision: Decimals float columns are rounded to by 'TYPE.Field', 'Field'
+                or '*' (see csvformat.field_precision); None writes floats unrounded
+        """
+        self.path = path
+        self.columns = columns
+        self.float_columns = float_columns or []
+        self.dtypes = dtypes or {}
+        self.float_precision = float_precision
+        self.chunk_size = chunk_size
+        self.header = header
+        self.append = append
+        self.compression = compression
+        self.compress_level = compress_level
+        self.count = 0
+        self._buffer = []
+        self._file = None
+
+    def write(self, message: Dict[str, Any]):
+        """
+        Buffer a message and write the chunk when it is full.
+
+        Args:
+            message: Message dictionary from BinFileParser.parse_messages
+        """
+        self._buffer.append(message)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered messages."""
+        if not self._buffer:
+            return
+        df = typed_frame(self._buffer, self.columns, self.dtypes)
+        if self.float_columns:
+            df[self.float_columns] = df[self.float_columns].astype('float64')
+        write_csv(self._open(), df, header=False, float_precision=self.float_precision)
+        self.count += len(self._buffer)
+        self._buffer = []
+
+    def append_part(self, part_path: str):
+        """
+        Append the rows of a header-less CSV part written with the same columns.
+
+        Args:
+            part_path: Part file path
+        """
+        self.flush()
+        output = self._open()
+        with open(part_path, 'r', newline='') as part:
+            shutil.copyfileobj(part, output, PART_COPY_SIZE)
+
+    def _open(self):
+        """Open the output file on first use, writing the header row."""
+        if self._file is None:
+            self._file = open_output(self.path, self.append, self.compression, self.compress_level)
+            if self.header and self._file.tell() == 0:
+                write_header(self._file, self.columns)
+        return self._file
+
+    def close(self):
+        """Write the remaining messages and close the file."""
+        try:
+            self.flush()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TableWriter:
+    """
+    Write messages to a typed columnar table in fixed-size chunks.
+
+    Subclasses write one chunk at a time to a specific file format.
+    """
+
+    output_format = None
+
+    def __init__(self, path: str, columns: List[str], dtypes: Optional[Dict[str, str]] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, key: str = HDF5_KEY):
+        """
+        Initialize the writer.
+
+        The file is created when the first chunk is written.
+
+        Args:
+            path: Output file path
+            columns: Columns of the table
+            dtypes: Column types from column_dtypes; columns missing here keep
+                the types pandas infers from the first chunk
+            chunk_size: Number of messages buffered before a chunk is written
+            key: Table name, used by formats holding several tables per file
+        """
+        self.path = path
+        self.columns = columns
+        self.dtypes = dtypes or {}
+        self.chunk_size = chunk_size
+        self.key = key
+        self.count = 0
+        self._buffer = []
+
+    def write(self, message: Dict[str, Any]):
+        """
+        Buffer a message and write the chunk when it is full.
+
+        Args:
+            message: Message dictionary from BinFileParser.parse_messages
+        """
+        self._buffer.append(message)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered messages."""
+        if not self._buffer:
+            return
+        self.write_frame(self._frame(self._buffer))
+        self.count += len(self._buffer)
+        self._buffer = []
+
+    def _frame(self, messages: List[Dict[str, Any]]) -> pd.DataFrame:
+        """Build a DataFrame of messages with the column types of the table."""
+        df = typed_frame(messages, self.columns, self.dtypes)
+        for column, kind in self.dtypes.items():
+            if column not in df:
+                continue
+            if kind == ARRAY_COLUMN:
+                df[column] = [list(value) if isinstance(value, array.array) else None
+                              for value in df[column]]
+            elif kind == OBJECT_COLUMN:
+                df[column] = [None if value is None or value != value else str(value)
+                              for value in df[column]]
+            elif kind != BYTES_COLUMN and not kind.startswith('U'):
+                df[column] = df[column].astype(kind)
+        return df
+
+    def write_frame(self, df: pd.DataFrame):
+        """
+        Write a chunk of rows.
+
+        Args:
+            df: DataFrame with the columns of the table
+        """
+        raise NotImplementedError
+
+    def append_part(self, part_path: str):
+        """
+        Append the rows of a part file written by the same kind of writer.
+
+        Args:
+            part_path: Part file path
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Write the remaining messages and close the file."""
+        try:
+            self.flush()
+        finally:
+            self._close()
+
+    def _close(self):
+        """Close the output file."""
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _ArrowWriter(TableWriter):
+    """Table writer converting chunks to Arrow tables with a fixed schema."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pa = _import_pyarrow(self.output_format)
+        self.schema = None
+        self._writer = None
+        if all(column in self.dtypes for column in self.columns):
+            self.schema = self.pa.schema([(column, _arrow_type(self.pa, self.dtypes[column]))
+                                          for column in self.columns])
+
+    def write_frame(self, df: pd.DataFrame):
+        table = self.pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self.write_table(table)
+
+    def write_table(self, table):
+        """
+        Write a chunk of rows as an Arrow table.
+
+        Args:
+            table: pyarrow.Table with the columns of the table
+        """
+        if self._writer is None:
+            if self.schema is None:
+                self.schema = table.schema
+            self._writer = self._open_writer(self.schema)
+        self._writer.write_table(table.cast(self.schema))
+
+    def _open_writer(self, schema):
+        """Open the format-specific Arrow writer."""
+        raise NotImplementedError
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class ParquetWriter(_ArrowWriter):
+    """Write messages to a Parquet file, one row group per chunk."""
+
+    output_format = 'parquet'
+
+    def _open_writer(self, schema):
+        return self.pa.parquet.ParquetWriter(self.path, schema)
+
+    def append_part(self, part_path: str):
+        self.flush()
+        part = self.pa.parquet.ParquetFile(part_path)
+        for group in range(part.num_row_groups):
+            self.write_table(part.read_row_group(group))
+
+
+class FeatherWriter(_ArrowWriter):
+    """Write messages to a Feather (Arrow IPC) file, one record batch per chunk."""
+
+    output_format = 'feather'
+
+    def _open_writer(self, schema):
+        options = self.pa.ipc.IpcWriteOptions(compression='lz4')
+        return self.pa.ipc.new_file(self.path, schema, options=options)
+
+    def append_part(self, part_path: str):
+        self.flush()
+        with self.pa.memory_map(part_path) as source:
+            reader = self.pa.ipc.open_file(source)
+            for batch in range(reader.num_record_batches):
+                self.write_table(self.pa.Table.from_batches([reader.get_batch(batch)]))
+
+
+class Hdf5Writer(TableWriter):
+    """Append messages to a table of an HDF5 file, one append per chunk."""
+
+    output_format = 'hdf5'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._store = None
+
+    def _frame(self, messages: List[Dict[str, Any]]) -> pd.DataFrame:
+        df = super()._frame(messages)
+        # PyTables stores fixed-width strings only
+        for column, kind in self.dtypes.items():
+            if kind in (BYTES_COLUMN, ARRAY_COLUMN) and column in df:
+                df[column] = [None if value is None else str(value) for value in df[column]]
+        return df
+
+    def write_frame(self, df: pd.DataFrame):
+        if self._store is None:
+            self._store = pd.HDFStore(self.path, mode='w')
+        sizes = {}
+        for column, kind in self.dtypes.items():
+            if kind.startswith('U'):
+                # Strings decoded as Latin-1 take up to 2 bytes per character in UTF-8
+                sizes[column] = 2 * int(kind[1:])
+            elif kind in (BYTES_COLUMN, ARRAY_COLUMN, OBJECT_COLUMN):
+                sizes[column] = 512
+        sizes = {column: size for column, size in sizes.items() if column in df}
+        self._store.append(self.key, df, format='table', index=False,
+                           min_itemsize=sizes or None)
+
+    def append_part(self, part_path: str):
+        self.flush()
+        with pd.HDFStore(part_path, mode='r') as part:
+            if self.key not in part:
+                return
+            for df in part.select(self.key, chunksize=self.chunk_size):
+                self.write_frame(df.reset_index(drop=True))
+
+    def _close(self):
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+
+TABLE_WRITERS = {
+    'parquet': ParquetWriter,
+    'feather': FeatherWriter,
+    'hdf5': Hdf5Writer,
+}
+
+
+def table_writer(output_format: str, path: str, formats: Iterable[LogFormat],
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, header: bool = True,
+                 key: str = HDF5_KEY, compression: Optional[str] = None,
+                 compress_level: Optional[int] = None,
+                 float_precision: Optional[Dict[str, int]] = None):
+    """
+    Create a writer for a table holding messages of the given formats.
+
+    Args:
+        output_format: One of OUTPUT_FORMATS
+        path: Output file path
+        formats: Message formats of the table in definition order
+        chunk_size: Number of messages buffered before a chunk is written
+        header: If True, start CSV output with a header row
+        key: Table name in HDF5 files
+        compression: Compression of CSV output, one of COMPRESSIONS
+        compress_level: Compression level of CSV output
+        float_precision: Decimals the float columns of CSV output are rounded to
+
+    Returns:
+        CsvWriter or TableWriter
+    """
+    formats = list(formats)
+    columns, float_columns = column_union(formats)
+    if output_format == 'csv':
+        return CsvWriter(path, columns, float_columns, chunk_size, header,
+                         compression=compression, compress_level=compress_level,
+                         dtypes=column_dtypes(formats), float_precision=float_precision)
+    if output_format not in TABLE_WRITERS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if compression is not None:
+        raise ValueError(f"Compression applies to CSV output, not {FORMAT_NAMES[output_format]}")
+    if float_precision:
+        raise ValueError(f"Float precision applies to CSV output, not {FORMAT_NAMES[output_format]}")
+    return TABLE_WRITERS[output_format](path, columns, column_dtypes(formats), chunk_size, key)
+
+
+class FilePool:
+    """LRU pool of open output files."""
+
+    def __init__(self, max_open_files: int = DEFAULT_MAX_OPEN_FILES, append: bool = False,
+                 compression: Optional[str] = None, compress_level: Optional[int] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            max_open_files: Maximum number of files kept open at the same time
+            append: If True, existing files are appended to rather than
+                truncated on their first request
+            compression: Compress the files with one of COMPRESSIONS; a file
+                evicted and reopened gets a new gzip member, xz stream or zstd frame
+            compress_level: Compression level (default: DEFAULT_COMPRESS_LEVELS)
+        """
+        if max_open_files < 1:
+            raise ValueError("max_open_files must be at least 1")
+        self.max_open_files = max_open_files
+        self.append = append
+        self.compression = compression
+        self.compress_level = compress_level
+        self._open = OrderedDict()
+        self._created = set()
+
+    def get(self, path: str):
+        """
+        Get an open text file for appending to path.
+
+        The first request for a path truncates the file unless the pool
+        appends; files evicted from the pool are reopened in append mode.
+
+        Args:
+            path: Output file path
+
+        Returns:
+            Open text file
+        """
+        handle = self._open.get(path)
+        if handle is not None:
+            self._open.move_to_end(path)
+            return handle
+
+        while len(self._open) >= self.max_open_files:
+            _, oldest = self._open.popitem(last=False)
+            oldest.close()
+
+        append = self.append or path in self._created
+        handle = open_output(path, append, self.compression, self.compress_level)
+        self._created.add(path)
+        self._open[path] = handle
+        return handle
+
+    def close(self):
+        """Close every open file."""
+        while self._open:
+            _, handle = self._open.popitem(last=False)
+            handle.close()
+
+
+class SeparateCsvWriter:
+    """Write messages to one CSV file per message type, incrementally."""
+
+    def __init__(self, output_dir: str, columns_by_type: Optional[Dict[str, List[str]]] = None,
+                 buffer_size: int = DEFAULT_TYPE_BUFFER_SIZE,
+                 max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+                 header: bool = True, append: bool = False,
+                 compression: Optional[str] = None, compress_level: Optional[int] = None,
+                 dtypes_by_type: Optional[Dict[str, Dict[str, str]]] = None,
+                 float_precision: Optional[Dict[str, int]] = None):
+        """
+        Initialize the writer.
+
+        Args:
+            output_dir: Directory receiving one <TYPE>.csv file per message type
+            columns_by_type: Columns of each message type; types missing here use
+                the keys of their first message
+            buffer_size: Number of messages buffered per type before writing
+            max_open_files: Maximum number of output files kept open at once
+            header: If True, start each file with a header row
+            append: If True, add rows to existing files instead of replacing
+                them; a header is only written to empty files
+            compression: Compress the files with one of COMPRESSIONS, adding
+                its extension to the file names (<TYPE>.csv.gz)
+            compress_level: Compression level (default: DEFAULT_COMPRESS_LEVELS)
+            dtypes_by_type: Column types of each message type from column_dtypes;
+                types missing here keep the types pandas infers
+            float_precision: Decimals float columns are rounded to by 'TYPE.Field', 'Field'
+                or '*' (see csvformat.field_precision); None writes floats unrounded
+        """
+        self.output_dir = output_dir
+        self.columns_by_type = dict(columns_by_type or {})
+        self.dtypes_by_type = dict(dtypes_by_type or {})
+        self.float_precision = float_precision
+        self.buffer_size = buffer_size
+        self.header = header
+        self.extension = output_extension('csv', compression)
+        self.pool = FilePool(max_open_files, append, compression, compress_level)
+        self.counts = {}
+        self._buffers = {}
+
+    def path(self, msg_type: str) -> str:
+        """Output file of a message type."""
+        return os.path.join(self.output_dir, f"{msg_type}{self.extension}")
+
+    def write(self, message: Dict[str, Any]):
+        """
+        Buffer a message and write its type's buffer when it is full.
+
+        Args:
+            message: Message dictionary from BinFileParser.parse_messages
+        """
+        msg_type = message['message_type']
+        buffer = self._buffers.get(msg_type)
+        if buffer is None:
+            buffer = self._buffers[msg_type] = []
+            if msg_type not in self.columns_by_type:
+                self.columns_by_type[msg_type] = list(message.keys())
+        buffer.append(message)
+        if len(buffer) >= self.buffer_size:
+            self.flush(msg_type)
+
+    def flush(self, msg_type: str):
+        """
+        Write the buffered messages of one type.
+
+        Args:
+            msg_type: Message type to flush
+        """
+        buffer = self._buffers.get(msg_type)
+        if not buffer:
+            return
+        written = self.counts.get(msg_type, 0)
+        df = typed_frame(buffer, self.columns_by_type[msg_type], self.dtypes_by_type.get(msg_type))
+        output = self.pool.get(self.path(msg_type))
+        write_csv(output, df, header=(self.header and written == 0 and output.tell() == 0),
+                  float_precision=self.float_precision, message_type=msg_type)
+        self.counts[msg_type] = written + len(buffer)
+        self._buffers[msg_type] = []
+
+    def close(self):
+        """Write all remaining buffers and close the output files."""
+        try:
+            for msg_type in list(self._buffers):
+                self.flush(msg_type)
+        finally:
+            self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SeparateTableWriter:
+    """Write messages to one columnar table file per message type, incrementally."""
+
+    def __init__(self, output_dir: str, output_format: str,
+                 formats_by_type: Optional[Dict[str, LogFormat]] = None,
+                 buffer_size: int = DEFAULT_TYPE_BUFFER_SIZE):
+        """
+        Initialize the writer.
+
+        Unlike CSV files, columnar files cannot be reopened for appending, so
+        the file of every message type seen stays open until close.
+
+        Args:
+            output_dir: Directory receiving one file per message type
+            output_format: One of the TABLE_WRITERS formats
+            formats_by_type: Formats of each message type; types missing here use
+                the keys of their first message and inferred column types
+            buffer_size: Number of messages buffered per type before writing
+        """
+        if output_format not in TABLE_WRITERS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.formats_by_type = dict(formats_by_type or {})
+        self.buffer_size = buffer_size
+        self.counts = {}
+        self._writers = {}
+
+    def path(self, msg_type: str) -> str:
+        """Output file of a message type."""
+        return os.path.join(self.output_dir, f"{msg_type}{OUTPUT_EXTENSIONS[self.output_format]}")
+
+    def write(self, message: Dict[str, Any]):
+        """
+        Buffer a message and write its type's chunk when it is full.
+
+        Args:
+            message: Message dictionary from BinFileParser.parse_messages
+        """
+        msg_type = message['message_type']
+        writer = self._writers.get(msg_type)
+        if writer is None:
+            fmt = self.formats_by_type.get(msg_type)
+            if fmt is not None:
+                writer = table_writer(self.output_format, self.path(msg_type), [fmt],
+                                      self.buffer_size, key=msg_type)
+            else:
+                writer = TABLE_WRITERS[self.output_format](self.path(msg_type), list(message.keys()),
+                                                           chunk_size=self.buffer_size, key=msg_type)
+            self._writers[msg_type] = writer
+        writer.write(message)
+        self.counts[msg_type] = self.counts.get(msg_type, 0) + 1
+
+    def close(self):
+        """Write all remaining buffers and close the output files."""
+        errors = []
+        for writer in self._writers.values():
+            try:
+                writer.close()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def separate_writer(output_format: str, output_dir: str, formats_by_type: Dict[str, LogFormat],
+                    buffer_size: int = DEFAULT_TYPE_BUFFER_SIZE,
+                    max_open_files: int = DEFAULT_MAX_OPEN_FILES, header: bool = True,
+                    compression: Optional[str] = None, compress_level: Optional[int] = None,
+                    float_precision: Optional[Dict[str, int]] = None):
+    """
+    Create a writer of one output file per message type.
+
+    Args:
+        output_format: One of OUTPUT_FORMATS
+        output_dir: Directory receiving the files
+        formats_by_type: Formats of each message type, keyed by name
+        buffer_size: Number of messages buffered per type before writing
+        max_open_files: Maximum number of CSV files kept open at once
+        header: If True, start each CSV file with a header row
+        compression: Compression of CSV files, one of COMPRESSIONS
+        compress_level: Compression level of CSV files
+        float_precision: Decimals the float columns of CSV files are rounded to
+
+    Returns:
+        SeparateCsvWriter or SeparateTableWriter
+    """
+    if output_format == 'csv':
+        columns_by_type = {name: type_columns(fmt) for name, fmt in formats_by_type.items()}
+        dtypes_by_type = {name: column_dtypes([fmt]) for name, fmt in formats_by_type.items()}
+        return SeparateCsvWriter(output_dir, columns_by_type, buffer_size, max_open_files, header,
+                                 compression=compression, compress_level=compress_level,
+                                 dtypes_by_type=dtypes_by_type, float_precision=float_precision)
+    if compression is not None:
+        raise ValueError(f"Compression applies to CSV output, not {FORMAT_NAMES[output_format]}")
+    if float_precision:
+        raise ValueError(f"Float precision applies to CSV output, not {FORMAT_NAMES[output_format]}")
+    return SeparateTableWriter(output_dir, output_format, formats_by_type, buffer_size)